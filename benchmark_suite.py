@@ -0,0 +1,204 @@
+#
+# Benchmark suite - times the main matrix operations on synthetic
+# topologies (see topologies.py) of increasing size, recording the time
+# taken and the peak memory allocated by each, and checks the times
+# against a baseline saved by an earlier run
+#
+# Usage: python benchmark_suite.py [--sizes 10,100,1000,10000]
+#            [--topologies ring,star,...] [--operations fill,may_see,...]
+#            [--save results.json] [--baseline results.json]
+#            [--threshold 1.5] [--no-memory]
+#
+# Operations slower than cubic in the number of nodes, or whose inputs
+# grow quadratically, are only timed up to the size given in OPERATIONS.
+# Given a baseline, the run fails (with exit status 1) if any operation
+# took more than "threshold" times as long as in the baseline.  Times
+# shorter than MINIMUM_SECONDS are treated as MINIMUM_SECONDS, so that
+# timer noise in tiny cases does not fail the run.
+#
+
+import sys
+import gc
+import json
+import time
+import argparse
+import platform
+import tracemalloc
+import numpy
+from matrix import Matrix
+from mergers import path_union, conjoin_paths
+from semirings import MAX_MIN
+from ingest import ingest_links
+from topologies import TOPOLOGIES, topology_matrix
+
+# The numbers of nodes in the topologies timed by default
+BENCHMARK_SIZES = [10, 100, 1000, 10000]
+
+# Shorter times than this are not compared with the baseline
+MINIMUM_SECONDS = 0.01
+
+# By default, a run fails if an operation takes 50% longer than before
+DEFAULT_THRESHOLD = 1.5
+
+# Each of the following functions prepares an operation on the named
+# kind of topology with the given number of nodes, and returns a
+# function of no arguments that performs it
+
+# Fill a generic matrix from a list of cells
+def fill_case(kind, size):
+    cells = topology_matrix(kind, size, 'int8').get_contents()
+    matrix = Matrix(list(range(size)))
+    return lambda: matrix.fill(cells)
+
+# Find the widest paths in a typed matrix of bandwidths
+def closure_numeric_case(kind, size):
+    matrix = topology_matrix(kind, size, 'int32')
+    return lambda: matrix.closure(semiring = MAX_MIN)
+
+# Find the protocols available between nodes in a matrix of strings
+def closure_strings_case(kind, size):
+    matrix = topology_matrix(kind, size, paths = True)
+    return lambda: matrix.closure(path_union, conjoin_paths, '')
+
+# Count the two-hop paths in a typed matrix
+def multiply_case(kind, size):
+    matrix = topology_matrix(kind, size, 'int32')
+    multiplier = matrix.copy()
+    return lambda: matrix.multiply_matrices(multiplier)
+
+# Join the topologies of the two halves of the nodes, which share a node
+def join_case(kind, size):
+    links = [(source, destination, None) for source, destination in TOPOLOGIES[kind](size)]
+    middle = size // 2
+    halves = []
+    for headings in [list(range(0, middle + 1)), list(range(middle, size))]:
+        nodes = set(headings)
+        half_links = [link for link in links if link[0] in nodes and link[1] in nodes]
+        halves.append(ingest_links(lambda: iter(half_links), headings, symmetric = True))
+    return lambda: halves[0].join_matrices(halves[1], max)
+
+# Find what node 0 may see in a sparse topology (including calculating
+# its reachability index), writing the result into a typed matrix
+def may_see_case(kind, size):
+    topology = topology_matrix(kind, size, sparse = True)
+    visible = Matrix(list(range(size)), 0, 'int8')
+    return lambda: topology.may_see([0], out = visible)
+
+# Find what node 0 should see in a sparse topology, similarly
+def should_see_case(kind, size):
+    topology = topology_matrix(kind, size, sparse = True)
+    visible = Matrix(list(range(size)), 0, 'int8')
+    return lambda: topology.should_see([0], out = visible)
+
+# The operations, with the largest number of nodes each is timed for
+OPERATIONS = {'fill': (fill_case, 1000),
+              'closure_numeric': (closure_numeric_case, 1000),
+              'closure_strings': (closure_strings_case, 100),
+              'multiply_matrices': (multiply_case, 1000),
+              'join_matrices': (join_case, 1000),
+              'may_see': (may_see_case, 10000),
+              'should_see': (should_see_case, 1000)}
+
+# Return the key under which a case's results are recorded
+def case_key(operation, kind, size):
+    return '%s/%s/%d' % (operation, kind, size)
+
+# Time one case and, if "memory" is True, perform it again to find the
+# peak memory it allocates (which is not done while timing, since
+# tracing allocations slows everything down).  Only the operation
+# itself is measured, not its preparation.
+def measure(prepare, kind, size, memory = True):
+    run = prepare(kind, size)
+    gc.collect()
+    start = time.perf_counter()
+    run()
+    result = {'seconds': time.perf_counter() - start}
+    if memory:
+        run = prepare(kind, size)
+        gc.collect()
+        tracemalloc.start()
+        run()
+        result['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result
+
+# Time each of the operations on each kind of topology at each size
+# (up to the operation's limit), returning a dictionary of the results
+# keyed by case_key.  "report", if given, is called with the key and
+# result of each case as it finishes.
+def run_benchmarks(sizes = BENCHMARK_SIZES, kinds = None, operations = None, memory = True, report = None):
+    if kinds is None:
+        kinds = sorted(TOPOLOGIES)
+    if operations is None:
+        operations = sorted(OPERATIONS)
+    results = {}
+    for operation in operations:
+        assert operation in OPERATIONS, 'Unknown operation ' + str(operation) + ' in "run_benchmarks"'
+        prepare, largest = OPERATIONS[operation]
+        for kind in kinds:
+            for size in sizes:
+                if size > largest:
+                    continue
+                key = case_key(operation, kind, size)
+                results[key] = measure(prepare, kind, size, memory)
+                if report is not None:
+                    report(key, results[key])
+    return results
+
+# Return the cases that took more than "threshold" times as long as in a
+# baseline (ignoring cases missing from either), as a list of (key,
+# baseline time, time) tuples
+def compare_results(results, baseline, threshold = DEFAULT_THRESHOLD, minimum = MINIMUM_SECONDS):
+    regressions = []
+    for key in sorted(results):
+        if not key in baseline:
+            continue
+        seconds = max(results[key]['seconds'], minimum)
+        baseline_seconds = max(baseline[key]['seconds'], minimum)
+        if seconds > baseline_seconds * threshold:
+            regressions.append((key, baseline[key]['seconds'], results[key]['seconds']))
+    return regressions
+
+# Write results to a JSON file, with a note of the platform they were
+# obtained on
+def save_results(results, path):
+    document = {'python': platform.python_version(), 'numpy': numpy.__version__,
+                'machine': platform.machine(), 'results': results}
+    with open(path, 'w') as output:
+        json.dump(document, output, indent = 1, sort_keys = True)
+
+# Return the results saved in a JSON file
+def load_results(path):
+    with open(path) as source:
+        return json.load(source)['results']
+
+# Print a case's results as a line of a table
+def print_result(key, result):
+    operation, kind, size = key.split('/')
+    line = '%-18s %-15s %6s %10.4f' % (operation, kind, size, result['seconds'])
+    if 'peak_bytes' in result:
+        line += ' %10.2f' % (result['peak_bytes'] / 1e6)
+    print(line)
+    sys.stdout.flush()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Time matrix operations on synthetic topologies')
+    parser.add_argument('--sizes', default = ','.join([str(size) for size in BENCHMARK_SIZES]))
+    parser.add_argument('--topologies', default = ','.join(sorted(TOPOLOGIES)))
+    parser.add_argument('--operations', default = ','.join(sorted(OPERATIONS)))
+    parser.add_argument('--save', help = 'file to save the results to, as a new baseline')
+    parser.add_argument('--baseline', help = 'file of earlier results to compare with')
+    parser.add_argument('--threshold', type = float, default = DEFAULT_THRESHOLD)
+    parser.add_argument('--no-memory', dest = 'memory', action = 'store_false')
+    arguments = parser.parse_args()
+    print('%-18s %-15s %6s %10s %10s' % ('operation', 'topology', 'size', 'seconds', 'peak MB'))
+    results = run_benchmarks([int(size) for size in arguments.sizes.split(',')], arguments.topologies.split(','),
+                             arguments.operations.split(','), arguments.memory, print_result)
+    if arguments.save:
+        save_results(results, arguments.save)
+    if arguments.baseline:
+        regressions = compare_results(results, load_results(arguments.baseline), arguments.threshold)
+        for key, baseline_seconds, seconds in regressions:
+            print('SLOWER: %s took %.4fs (baseline %.4fs)' % (key, seconds, baseline_seconds))
+        if regressions:
+            sys.exit(1)
@@ -0,0 +1,54 @@
+# Compare the running times of the two closure methods (Warshall's
+# algorithm and repeated squaring, see Matrix.closure) on random
+# digraphs of increasing size, for a few semirings and cell types.
+#
+# Usage: python closure_benchmark.py [largest size]
+
+import sys
+import time
+import numpy
+from matrix import Matrix
+from semirings import BOOLEAN, MIN_PLUS, MAX_MIN
+
+# Return a random matrix with about "degree" links from each node, each
+# holding a value between 1 and 9 (or True), with empty cells holding
+# the semiring's zero
+def random_matrix(size, degree, semiring, dtype, seed = 0):
+    generator = numpy.random.default_rng(seed)
+    linked = generator.random((size, size)) < float(degree) / size
+    if dtype == bool:
+        contents = linked
+    else:
+        contents = numpy.where(linked, generator.integers(1, 10, (size, size)), semiring.zero)
+    matrix = Matrix(list(range(size)), semiring.zero, dtype)
+    matrix.fill(contents.ravel().tolist())
+    return matrix
+
+# Return the time taken to close a copy of the matrix with each method
+def time_methods(matrix, semiring):
+    times = []
+    for method in ['warshall', 'squaring']:
+        copy = matrix.copy()
+        start = time.perf_counter()
+        copy.closure(semiring = semiring, method = method)
+        times.append(time.perf_counter() - start)
+    return times
+
+if __name__ == '__main__':
+    largest = 800
+    if len(sys.argv) > 1:
+        largest = int(sys.argv[1])
+    cases = [('boolean', BOOLEAN, bool), ('boolean', BOOLEAN, None),
+             ('min-plus', MIN_PLUS, 'float64'), ('max-min', MAX_MIN, 'int32')]
+    print('%-10s %-8s %6s %10s %10s' % ('semiring', 'cells', 'size', 'warshall', 'squaring'))
+    size = 25
+    while size <= largest:
+        for name, semiring, dtype in cases:
+            if dtype is None and size > largest // 4:
+                # Generic cells are far slower, so only small sizes are timed
+                continue
+            matrix = random_matrix(size, 3, semiring, dtype)
+            warshall, squaring = time_methods(matrix, semiring)
+            cells = 'generic' if dtype is None else numpy.dtype(dtype).name
+            print('%-10s %-8s %6d %10.4f %10.4f' % (name, cells, size, warshall, squaring))
+        size *= 2
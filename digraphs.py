@@ -0,0 +1,187 @@
+#
+# Enumeration of small digraphs, for exhaustive studies of what
+# observers can see in every possible topology of a given size
+#
+# Each digraph with N nodes is produced as an integer adjacency bitmask
+# in which bit i * N + j is set if there is a link from node i to node
+# j, i.e., the cells in the order "fill" expects them (see
+# digraph_matrix).  Each digraph is produced exactly once: either every
+# labelled digraph, or one representative of each isomorphism class of
+# unlabelled digraphs.
+#
+# Unlabelled digraphs are found by Read's "orderly" method.  The
+# possible links are put in a fixed order, and a digraph's code is the
+# binary number formed by reading off its links in that order.  A
+# digraph is "canonical" if no relabelling of its nodes gives a larger
+# code.  Removing the last link from a canonical digraph always leaves a
+# canonical digraph, so every canonical digraph is found exactly once by
+# starting from the empty digraph and repeatedly adding a link after the
+# last one, keeping only the canonical results.
+#
+
+from itertools import combinations
+from matrix import Matrix
+from reachability import mask_row
+
+# Return the possible links of a digraph with the given number of
+# nodes, in order.  Each is a list of the (row, column) cells it sets:
+# one cell normally, or both directions of an undirected link if
+# "symmetric" is True.  The links among the first k nodes all come
+# before any link to or from node k, so a partial relabelling of the
+# first k nodes fixes the start of the code (see is_canonical).
+def link_positions(size, symmetric = False, loops = False):
+    positions = []
+    for node in range(size):
+        if loops:
+            positions.append([(node, node)])
+        for other in range(node):
+            if symmetric:
+                positions.append([(other, node), (node, other)])
+            else:
+                positions.append([(other, node)])
+                positions.append([(node, other)])
+    return positions
+
+# Return the adjacency bitmask of each link position
+def position_masks(size, positions):
+    masks = []
+    for cells in positions:
+        mask = 0
+        for row, column in cells:
+            mask |= 1 << (row * size + column)
+        masks.append(mask)
+    return masks
+
+# Return True if no relabelling of the nodes of a digraph gives a larger
+# code (see above).  Relabellings are built up one node at a time, and
+# abandoned as soon as the part of the code they fix is smaller than
+# the digraph's own.
+def is_canonical(mask, size, positions):
+    # The positions involving each node and the nodes before it
+    blocks = [[] for node in range(size)]
+    for cells in positions:
+        row, column = cells[0]
+        blocks[max(row, column)].append((row, column))
+    relabelling = [0] * size
+    used = [False] * size
+
+    # Try every choice of the original node to become node "depth" (and
+    # the nodes after it), returning False if any gives a larger code
+    def search(depth):
+        for node in range(size):
+            if used[node]:
+                continue
+            relabelling[depth] = node
+            comparison = 0
+            for row, column in blocks[depth]:
+                relabelled = mask >> (relabelling[row] * size + relabelling[column]) & 1
+                original = mask >> (row * size + column) & 1
+                if relabelled != original:
+                    comparison = relabelled - original
+                    break
+            if comparison > 0:
+                return False
+            if comparison == 0 and depth + 1 < size:
+                used[node] = True
+                larger_found = not search(depth + 1)
+                used[node] = False
+                if larger_found:
+                    return False
+        return True
+
+    return search(0)
+
+# Return True if every node of a digraph can be reached from the first
+# one, following links in either direction (if "strongly" is False) or
+# only forwards (if "strongly" is True) and, if strongly, the first node
+# can be reached from every other one
+def is_connected(mask, size, strongly = False):
+    if size == 0:
+        return True
+    successors = [[column for column in range(size) if mask >> (row * size + column) & 1]
+                  for row in range(size)]
+    predecessors = [[row for row in range(size) if mask >> (row * size + column) & 1]
+                    for column in range(size)]
+    if strongly:
+        directions = [successors, predecessors]
+    else:
+        directions = [[successors[node] + predecessors[node] for node in range(size)]]
+    for neighbours in directions:
+        reached = set([0])
+        frontier = [0]
+        while frontier:
+            node = frontier.pop()
+            for neighbour in neighbours[node]:
+                if not neighbour in reached:
+                    reached.add(neighbour)
+                    frontier.append(neighbour)
+        if len(reached) < size:
+            return False
+    return True
+
+# Return True if a digraph passes the connectivity filters
+def wanted(mask, size, connected, strongly_connected):
+    if strongly_connected and not is_connected(mask, size, True):
+        return False
+    if connected and not is_connected(mask, size):
+        return False
+    return True
+
+# Generate the adjacency bitmask of every labelled digraph with the given
+# number of nodes, in order of the number of links.  "symmetric" gives
+# undirected graphs (each link in both directions), "loops" allows links
+# from a node to itself, the number of links (counting an undirected link
+# once) can be limited, and "connected" or "strongly_connected" keep only
+# digraphs that are weakly or strongly connected.
+def labelled_digraphs(size, min_links = 0, max_links = None, symmetric = False, loops = False,
+                      connected = False, strongly_connected = False):
+    masks = position_masks(size, link_positions(size, symmetric, loops))
+    if max_links is None or max_links > len(masks):
+        max_links = len(masks)
+    for link_count in range(min_links, max_links + 1):
+        for chosen in combinations(masks, link_count):
+            mask = 0
+            for position_mask in chosen:
+                mask |= position_mask
+            if wanted(mask, size, connected, strongly_connected):
+                yield mask
+
+# Generate the adjacency bitmask of one digraph from each isomorphism
+# class of digraphs with the given number of nodes, using the orderly
+# method (see above).  The options are as for labelled_digraphs.
+def unlabelled_digraphs(size, min_links = 0, max_links = None, symmetric = False, loops = False,
+                        connected = False, strongly_connected = False):
+    positions = link_positions(size, symmetric, loops)
+    masks = position_masks(size, positions)
+    if max_links is None or max_links > len(masks):
+        max_links = len(masks)
+    # Each entry is a canonical digraph, its number of links and the
+    # position of its last link
+    to_visit = [(0, 0, -1)]
+    while to_visit:
+        mask, link_count, last = to_visit.pop()
+        if link_count >= min_links and wanted(mask, size, connected, strongly_connected):
+            yield mask
+        if link_count == max_links:
+            continue
+        children = []
+        for position in range(last + 1, len(masks)):
+            child = mask | masks[position]
+            if is_canonical(child, size, positions):
+                children.append((child, link_count + 1, position))
+        # (Visit the children in order of the position of their last link)
+        to_visit.extend(reversed(children))
+
+# Return a Matrix holding the digraph with the given adjacency bitmask,
+# with 1 for each link and 0 elsewhere
+def digraph_matrix(mask, headings):
+    matrix = Matrix(headings)
+    matrix.fill(mask_row(mask, len(headings) ** 2))
+    return matrix
+
+# For each of a sequence of adjacency bitmasks, yield the bitmask and
+# what each of the given sets of observers may see in that digraph, as a
+# stacked boolean array (see Matrix.may_see_many)
+def may_see_digraphs(masks, headings, observer_sets):
+    for mask in masks:
+        yield mask, digraph_matrix(mask, headings).may_see_many(observer_sets, stacked = True)
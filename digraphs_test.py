@@ -0,0 +1,32 @@
+# Tests of the digraph enumeration
+
+from digraphs import labelled_digraphs, unlabelled_digraphs, digraph_matrix, may_see_digraphs
+
+print('Numbers of digraphs with 1 to 4 nodes, labelled and unlabelled:')
+print([len(list(labelled_digraphs(size))) for size in range(1, 4)])
+print([len(list(unlabelled_digraphs(size))) for size in range(1, 5)])
+print('')
+
+print('Numbers of connected undirected graphs with 1 to 5 nodes:')
+print([len(list(unlabelled_digraphs(size, symmetric = True, connected = True))) for size in range(1, 6)])
+print('')
+
+print('Strongly connected digraphs with 3 nodes and at most 4 links:')
+for mask in unlabelled_digraphs(3, max_links = 4, strongly_connected = True):
+    print(digraph_matrix(mask, ['A', 'B', 'C']))
+    print('')
+
+print('Links that A and B may see in each connected 3-node digraph with 2 links:')
+for mask, visible in may_see_digraphs(unlabelled_digraphs(3, 2, 2, connected = True),
+                                      ['A', 'B', 'C'], [['A'], ['B']]):
+    print(mask, [int(seen.sum()) for seen in visible])
+print('')
+
+# Correct answer:
+#     [1, 4, 64]
+#     [1, 3, 16, 218]
+#     [1, 1, 2, 6, 21]
+#     A<->B plus A<->C, A<->B plus A->C->B, and the cycle A->B->C->A
+#     6 [2, 1]    (A->B and A->C)
+#     66 [3, 2]   (C->A->B)
+#     130 [1, 2]  (A->B and C->B)
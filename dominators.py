@@ -0,0 +1,108 @@
+# Dominators - In a digraph with a distinguished root node, a node X
+# "dominates" node Y if every path from the root to Y goes through X.
+# Each node reachable from the root (other than the root itself) has
+# a unique "immediate dominator", its closest strict dominator, and
+# these form the "dominator tree", in which the nodes dominated by X
+# are exactly X's descendants.  The observability analyses use this
+# to find the flows that can only be routed via an observer.
+#
+# Nodes are identified by their row/column numbers in a Matrix, and a
+# digraph is given by the list of successors of each node, and the
+# list of predecessors of each node.
+
+# Return the immediate dominator of each node reachable from the root
+# (None for unreachable nodes; the root is its own immediate dominator),
+# using the Lengauer-Tarjan algorithm with path compression, which takes
+# O(E log N) time.  Explicit stacks are used throughout so that long
+# chains do not exhaust Python's recursion limit.
+def immediate_dominators(successors, predecessors, root):
+    # Number the reachable nodes in depth-first order, recording the
+    # (number of the) parent of each in the depth-first spanning tree
+    number = [-1] * len(successors)
+    vertex = []
+    parent = []
+    to_visit = [(root, -1)]
+    while to_visit:
+        node, parent_number = to_visit.pop()
+        if number[node] >= 0:
+            continue
+        number[node] = len(vertex)
+        vertex.append(node)
+        parent.append(parent_number)
+        for successor in successors[node]:
+            if number[successor] < 0:
+                to_visit.append((successor, number[node]))
+    # The rest of the calculation works on depth-first numbers
+    count = len(vertex)
+    semi = list(range(count))
+    label = list(range(count))
+    ancestor = [-1] * count
+    idom = [0] * count
+    bucket = [[] for node in range(count)]
+
+    # Return the node with the smallest semidominator on the path from
+    # v up to the root of its tree in the forest built so far,
+    # compressing the path as a side effect
+    def evaluate(v):
+        if ancestor[v] < 0:
+            return v
+        path = []
+        u = v
+        while ancestor[ancestor[u]] >= 0:
+            path.append(u)
+            u = ancestor[u]
+        for w in reversed(path):
+            a = ancestor[w]
+            if semi[label[a]] < semi[label[w]]:
+                label[w] = label[a]
+            ancestor[w] = ancestor[a]
+        return label[v]
+
+    # Calculate semidominators, and implicitly immediate dominators, in
+    # reverse depth-first order
+    for w in range(count - 1, 0, -1):
+        for predecessor in predecessors[vertex[w]]:
+            v = number[predecessor]
+            if v >= 0:
+                u = evaluate(v)
+                if semi[u] < semi[w]:
+                    semi[w] = semi[u]
+        bucket[semi[w]].append(w)
+        ancestor[w] = parent[w]
+        for v in bucket[parent[w]]:
+            u = evaluate(v)
+            if semi[u] < semi[v]:
+                idom[v] = u
+            else:
+                idom[v] = parent[w]
+        bucket[parent[w]] = []
+    # Make the implicit immediate dominators explicit, in depth-first order
+    for w in range(1, count):
+        if idom[w] != semi[w]:
+            idom[w] = idom[idom[w]]
+    # Translate the result back to node numbers
+    dominators = [None] * len(successors)
+    dominators[root] = root
+    for w in range(1, count):
+        dominators[vertex[w]] = vertex[idom[w]]
+    return dominators
+
+# Given the immediate dominators of each node, return the list of
+# children of each node in the dominator tree
+def dominator_children(dominators):
+    children = [[] for node in dominators]
+    for node, dominator in enumerate(dominators):
+        if dominator is not None and dominator != node:
+            children[dominator].append(node)
+    return children
+
+# Return a list of the nodes strictly dominated by the given one, i.e.,
+# its descendants in the dominator tree
+def dominated_by(children, node):
+    dominated = []
+    to_visit = list(children[node])
+    while to_visit:
+        descendant = to_visit.pop()
+        dominated.append(descendant)
+        to_visit.extend(children[descendant])
+    return dominated
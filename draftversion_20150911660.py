@@ -1,7 +1,8 @@
 t__author__ = 'n7404808'
 
 from matrix import Matrix
-from networkx import nx
+from digraphs import labelled_digraphs
+from reachability import mask_row
 import sys
 import csv
 
@@ -11,7 +12,7 @@ import csv
 
 
 
-print 'two nodes --------------------------------------------------------'
+print('two nodes --------------------------------------------------------')
 # output everything to file
 # e = open('flux_capacitor20150827200.csv','w')
 f = open('this_graph_20150910226.csv','w')
@@ -26,34 +27,23 @@ flux_capacitor = Matrix(headers)
 # f.write('\n')
 
 # now do all combinations of graphs
-# start with four nodes
-for node_1 in xrange(len(headers)*len(headers)):
-    for node_2 in xrange(len(headers)*len(headers)):
-        for node_3 in xrange(len(headers)*len(headers)):
-            for node_4 in xrange(len(headers)*len(headers)):
-                this_graph = []
-                for x_index in xrange(len(headers)*len(headers)):
-                    if x_index == node_1 or x_index == node_2 or x_index == node_3 or x_index == node_4:
-                        this_graph.append(1)
-                    else:
-                        this_graph.append(0)
-                        # print this_graph
+# start with four nodes, with one to four links (each distinct set of
+# links is produced once, as an adjacency bitmask)
+for this_mask in labelled_digraphs(len(headers), 1, 4, loops = True):
+    this_graph = mask_row(this_mask, len(headers) * len(headers))
+    # print this_graph
 
-                        f.write(str(this_graph))
-                        f.write('\n\n')
+    f.write(str(this_graph))
+    f.write('\n\n')
 
-                flux_capacitor.fill(this_graph)
-                g.write(str(flux_capacitor))
-                g.write('\n\n')
-                # print
-                # print flux_capacitor
-                # print
-G = nx.Graph()
-G.add_nodes_from (self.get_headings())
-for row in self.get_headings():
-    for col in self.get_headings():
-        if self.get_cell(row, col) == 1:
-            G.add_edge(row, col)
+    flux_capacitor.fill(this_graph)
+    flux_capacitor.write(g)
+    g.write('\n')
+    # print
+    # print flux_capacitor
+    # print
+# (the last topology as an undirected NetworkX graph)
+G = flux_capacitor.to_networkx(directed = False)
                 # print 'What A may see:'
                 # print flux_capacitor.may_see(['A'])
                 # print
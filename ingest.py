@@ -0,0 +1,184 @@
+#
+# Ingest - building topologies from files of links
+#
+# Links can be read from:
+#
+#     edge lists       one link per line, "source destination [content]",
+#                      with "#" starting a comment
+#     link tables      CSV files with a column for each end of the link
+#                      and, optionally, one for its content (read with
+#                      pandas)
+#     YAML topologies  one or more YAML documents, each with an optional
+#                      list of "nodes" and the "links" between them,
+#                      given either as a list of [source, destination,
+#                      content] entries (the content is optional) or
+#                      mappings with those keys, or as a mapping from
+#                      each source to a list of its destinations (read
+#                      with PyYAML)
+#
+# Each file is read a chunk of links at a time and the links are written
+# straight into the matrix's cells, so neither the file nor a list of
+# every cell (as "fill" expects) is ever held in memory.  If the headings
+# are not given, the file is read twice: once to find the nodes (in order
+# of first appearance) and once to fill in the links.
+#
+
+from itertools import islice
+from matrix import Matrix
+from sparse_matrix import SparseMatrix
+
+# The number of links read from a file at a time
+INGEST_CHUNK_SIZE = 100000
+
+# The options of ingest_links that load_link_table passes on to it
+# (any others are for pandas.read_csv)
+INGEST_OPTIONS = ['default_content', 'symmetric', 'chunk_size']
+
+# Generate the links in an iterable in lists of at most "chunk_size"
+def link_chunks(links, chunk_size):
+    links = iter(links)
+    while True:
+        chunk = list(islice(links, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+# Generate the links in an edge list file as (source, destination,
+# content) tuples, the content being converted by "content_type" (or
+# None if not given).  Fields are separated by whitespace unless a
+# delimiter is given.
+def read_edge_list(path, delimiter = None, content_type = int):
+    with open(path) as source:
+        for line in source:
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            fields = line.split(delimiter)
+            if delimiter is not None:
+                fields = [field.strip() for field in fields]
+            assert len(fields) in [2, 3], 'Badly formed link "' + line + '" in "read_edge_list"'
+            content = None
+            if len(fields) == 3:
+                content = content_type(fields[2])
+            yield fields[0], fields[1], content
+
+# Generate the links in a CSV link table as (source, destination,
+# content) tuples, reading "chunk_size" rows at a time.  The content is
+# None if no content column is given, or if the link's content is blank.
+# Other options are passed to pandas.read_csv.
+def read_link_table(path, source = 'source', destination = 'destination', content = None,
+                    chunk_size = INGEST_CHUNK_SIZE, **options):
+    import pandas
+    columns = [source, destination] + ([content] if content is not None else [])
+    chunks = pandas.read_csv(path, usecols = columns, chunksize = chunk_size,
+                             dtype = {source: str, destination: str}, **options)
+    for chunk in chunks:
+        sources = chunk[source].tolist()
+        destinations = chunk[destination].tolist()
+        if content is None:
+            contents = [None] * len(sources)
+        else:
+            contents = [None if pandas.isna(value) else value for value in chunk[content].tolist()]
+        for link in zip(sources, destinations, contents):
+            yield link
+
+# Generate the nodes (as (node, None, None) tuples) and the links of a
+# YAML topology file, loading one document at a time
+def read_yaml_topology(path):
+    import yaml
+    with open(path) as source:
+        for document in yaml.safe_load_all(source):
+            if document is None:
+                continue
+            for node in document.get('nodes', []):
+                yield node, None, None
+            links = document.get('links', [])
+            if isinstance(links, dict):
+                for node, destinations in links.items():
+                    for destination in destinations or []:
+                        yield node, destination, None
+                continue
+            for link in links:
+                if isinstance(link, dict):
+                    yield link['source'], link['destination'], link.get('content')
+                else:
+                    assert len(link) in [2, 3], 'Badly formed link ' + str(link) + ' in "read_yaml_topology"'
+                    yield link[0], link[1], link[2] if len(link) == 3 else None
+
+# Return the nodes named in a sequence of links, in order of first
+# appearance
+def link_headings(links):
+    headings = []
+    seen = set()
+    for link in links:
+        for node in link[:2]:
+            if node is not None and not node in seen:
+                seen.add(node)
+                headings.append(node)
+    return headings
+
+# Return a matrix holding the links generated by "read_links" (a
+# function of no arguments, such as "lambda: read_edge_list(path)"),
+# each link's cell holding its content or, if it has none, "content".
+# If "symmetric" is True each link is also added in the reverse
+# direction (e.g., for undirected links between interfaces).  If
+# "sparse" is True a SparseMatrix is returned, otherwise a Matrix (with
+# the given dtype, if any).  Links to or from a node missing from the
+# given headings are an error.
+def ingest_links(read_links, headings = None, sparse = False, dtype = None, default_content = 0,
+                 content = 1, symmetric = False, chunk_size = INGEST_CHUNK_SIZE):
+    if headings is None:
+        headings = link_headings(read_links())
+    if sparse:
+        assert dtype is None, 'Sparse matrices cannot be typed in "ingest_links"'
+        matrix = SparseMatrix(headings, default_content)
+    else:
+        matrix = Matrix(headings, default_content, dtype)
+    index = matrix.index
+    for chunk in link_chunks(read_links(), chunk_size):
+        cells = []
+        for source, destination, link_content in chunk:
+            if destination is None:
+                continue
+            assert source in index and destination in index, \
+                'Link ' + str(source) + ' -> ' + str(destination) + ' has a nonexistent node in "ingest_links"'
+            if link_content is None:
+                link_content = content
+            cells.append((source, destination, link_content))
+            if symmetric:
+                cells.append((destination, source, link_content))
+        if sparse:
+            for source, destination, link_content in cells:
+                matrix.set_cell(source, destination, link_content)
+        elif cells:
+            # Write each chunk of cells by position, in one step if typed
+            rows = [index[source] for source, destination, link_content in cells]
+            columns = [index[destination] for source, destination, link_content in cells]
+            contents = [link_content for source, destination, link_content in cells]
+            if dtype is None:
+                for row, column, link_content in zip(rows, columns, contents):
+                    matrix.contents[row][column] = link_content
+            else:
+                matrix.contents[rows, columns] = contents
+    return matrix
+
+# Return a matrix holding the links in an edge list file (see
+# read_edge_list and ingest_links)
+def load_edge_list(path, headings = None, sparse = False, dtype = None, delimiter = None, content_type = int,
+                   **options):
+    return ingest_links(lambda: read_edge_list(path, delimiter, content_type), headings, sparse, dtype, **options)
+
+# Return a matrix holding the links in a CSV link table (see
+# read_link_table and ingest_links).  The options named in INGEST_OPTIONS
+# are passed to ingest_links and the rest to pandas.read_csv.
+def load_link_table(path, headings = None, sparse = False, dtype = None, source = 'source',
+                    destination = 'destination', content = None, **options):
+    ingest_options = dict([(name, options.pop(name)) for name in INGEST_OPTIONS if name in options])
+    chunk_size = ingest_options.get('chunk_size', INGEST_CHUNK_SIZE)
+    return ingest_links(lambda: read_link_table(path, source, destination, content, chunk_size, **options),
+                        headings, sparse, dtype, **ingest_options)
+
+# Return a matrix holding the nodes and links in a YAML topology file
+# (see read_yaml_topology and ingest_links)
+def load_yaml_topology(path, headings = None, sparse = False, dtype = None, **options):
+    return ingest_links(lambda: read_yaml_topology(path), headings, sparse, dtype, **options)
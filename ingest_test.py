@@ -0,0 +1,92 @@
+# Tests of the topology ingest functions
+
+import os
+import shutil
+import tempfile
+from ingest import load_edge_list, load_link_table, load_yaml_topology
+
+directory = tempfile.mkdtemp()
+
+print('An edge list, dense and sparse:')
+path = os.path.join(directory, 'links.txt')
+with open(path, 'w') as output:
+    output.write('# Hub and spokes\n'
+                 'A C\n'
+                 'B C\n'
+                 'C A\n'
+                 'C B\n'
+                 'C D  # uplink\n'
+                 'D C\n')
+topology = load_edge_list(path, chunk_size = 4)
+print(topology)
+sparse = load_edge_list(path, sparse = True)
+print(sparse.get_link_count(), sparse.get_contents() == topology.get_contents())
+print(topology.may_see(['A']).get_contents() == sparse.may_see(['A']).get_contents())
+print('')
+
+print('A CSV table of undirected links with bandwidths, as a typed matrix:')
+path = os.path.join(directory, 'links.csv')
+with open(path, 'w') as output:
+    output.write('interface,peer,bandwidth,notes\n'
+                 'W,X,100,core\n'
+                 'W,Y,10,\n'
+                 'X,Z,100,core\n'
+                 'Y,Z,1,backup\n')
+bandwidths = load_link_table(path, ['W', 'X', 'Y', 'Z'], dtype = 'int32', source = 'interface',
+                             destination = 'peer', content = 'bandwidth', symmetric = True, chunk_size = 3)
+print(bandwidths)
+print('')
+
+print('A YAML topology in three documents, with an isolated node:')
+path = os.path.join(directory, 'topology.yaml')
+with open(path, 'w') as output:
+    output.write('nodes: [A, B, C, D, E]\n'
+                 'links:\n'
+                 '  B: [A, C, D]\n'
+                 '  C: [B]\n'
+                 '---\n'
+                 'links:\n'
+                 '  - [D, E]\n'
+                 '  - {source: E, destination: D, content: 1}\n'
+                 '---\n'
+                 'nodes: [F]\n')
+topology = load_yaml_topology(path)
+print(topology)
+print(topology.may_see(['C']).get_cell('B', 'E'))
+print('')
+
+print('A semicolon-separated table with a blank bandwidth:')
+path = os.path.join(directory, 'semicolons.csv')
+with open(path, 'w') as output:
+    output.write('source;destination;bandwidth\n'
+                 'P;Q;100\n'
+                 'Q;R;\n')
+bandwidths = load_link_table(path, dtype = 'int32', content = 'bandwidth', symmetric = True, sep = ';')
+print(bandwidths)
+print('')
+shutil.rmtree(directory)
+
+# Correct answer:
+#     (Nodes in order of first appearance)
+#                 |           A|           C|           B|           D|
+#                A|           0|           1|           0|           0|
+#                C|           1|           0|           1|           1|
+#                B|           0|           1|           0|           0|
+#                D|           0|           1|           0|           0|
+#     6 True
+#     True
+#
+#                 |           W|           X|           Y|           Z|
+#                W|           0|         100|          10|           0|
+#                X|         100|           0|           0|         100|
+#                Y|          10|           0|           0|           1|
+#                Z|           0|         100|           1|           0|
+#
+#     (The third topology in visibility_test.py, with an isolated node F)
+#     1
+#
+#     (The blank bandwidth is taken to be 1)
+#                 |           P|           Q|           R|
+#                P|           0|         100|           0|
+#                Q|         100|           0|           1|
+#                R|           0|           1|           0|
@@ -0,0 +1,293 @@
+#
+# Instrumentation - counting and timing the hot paths of the matrix
+# operations, to find where the time goes in a slow analysis
+#
+# While instrumentation is enabled (see enable_instrumentation and the
+# "instrumented" context manager), calls of the following are counted:
+#
+#     closure        closures calculated (of either kind of matrix)
+#     copy           matrices copied
+#     get_cell       cells read with get_cell
+#     set_cell       cells written with set_cell (including those written
+#                    by the operations on sparse matrices)
+#     merger         calls of the operators given to closure, add_matrix,
+#                    multiply_matrices, join_matrices and join_many
+#
+# and the time taken by each phase of the observer analyses (may_see,
+# should_see and must_see, and placement.py's searches) is recorded:
+#
+#     reachability   calculating the closure of the physical topology
+#                    (the reachability index)
+#     sources        finding the nodes that can reach each observer
+#     destinations   finding the nodes each observer can reach
+#     via_observer   combining them into the flows seen via the observers
+#                    (including should_see's dominator trees)
+#     result         writing the result into a matrix
+#
+# A phase's time excludes that of the other phases it calls, so the
+# times add up to the time spent in the analyses.  Calls made from
+# within a call of the same name (e.g., a sparse matrix's closure
+# falling back on the dense one) are not counted again.
+#
+# Instrumentation works by replacing the methods concerned with counting
+# and timing versions when it is enabled, and restoring the originals
+# when it is disabled, so it costs nothing at all when not in use.
+#
+# Operators are only counted when they are applied one cell at a time.
+# When a call would process a matrix's cells in a single vectorised
+# step (see array_path), its operators are left as they are, so that it
+# still does, and no calls of them are counted.
+#
+
+import sys
+import time
+import inspect
+from contextlib import contextmanager
+from matrix import Matrix
+from sparse_matrix import SparseMatrix
+from reachability import ReachabilityIndex, DynamicReachabilityIndex
+from semirings import Semiring, VECTORISED_OPERATIONS
+
+# The calls counted and the phases timed, in the order they are reported
+COUNTED_CALLS = ['closure', 'copy', 'get_cell', 'set_cell', 'merger']
+TIMED_PHASES = ['reachability', 'sources', 'destinations', 'via_observer', 'result']
+
+# The methods whose calls are counted, by class
+COUNTED_METHODS = [(Matrix, ['closure', 'copy', 'get_cell', 'set_cell']),
+                   (SparseMatrix, ['closure', 'copy', 'get_cell', 'set_cell'])]
+
+# The methods whose operators are counted, by class
+MERGING_METHODS = [(Matrix, ['closure', 'add_matrix', 'multiply_matrices', 'join_matrices', 'join_many']),
+                   (SparseMatrix, ['closure', 'join_matrices', 'join_many'])]
+
+# The names of those methods' operator arguments
+OPERATOR_PARAMETERS = ['add_alt_path', 'join_hops', 'operation', 'addition', 'multiplication', 'merger']
+
+# The methods timed, by class, with the phase each belongs to
+TIMED_METHODS = [(ReachabilityIndex, [('__init__', 'reachability'), ('calculate', 'reachability'),
+                                      ('can_reach_indices', 'sources'), ('get_reachable_mask', 'destinations'),
+                                      ('may_see_masks', 'via_observer'), ('should_see_masks', 'via_observer'),
+                                      ('must_see_masks', 'via_observer')]),
+                 (DynamicReachabilityIndex, [('may_see_masks', 'via_observer')]),
+                 (Matrix, [('rows_matrix', 'result'), ('mask_matrix', 'result')])]
+
+# Return True if a call of one of the MERGING_METHODS, with the given
+# arguments (by parameter name), will process the cells in a single
+# vectorised step, so that its operators are never called on single
+# cells.  This is only ever the case for a Matrix whose cells are typed
+# or can be gathered into an array (see Matrix.semiring_array), and
+# whose operators have NumPy equivalents.
+def array_path(method_name, arguments):
+    matrix = arguments['self']
+    if isinstance(matrix, SparseMatrix) or method_name == 'join_matrices':
+        return False
+    if method_name == 'add_matrix':
+        return matrix.dtype is not None and arguments['operation'] in VECTORISED_OPERATIONS
+    if method_name == 'join_many':
+        return matrix.dtype is not None and arguments['merger'] in VECTORISED_OPERATIONS and \
+               not None in [other.dtype for other in arguments['matrices']]
+    semiring = arguments['semiring']
+    if semiring is None and method_name == 'closure':
+        semiring = Semiring(arguments['add_alt_path'], arguments['join_hops'], arguments['empty_cell'])
+    elif semiring is None:
+        semiring = Semiring(arguments['addition'], arguments['multiplication'], arguments['zero_value'])
+    if matrix.semiring_array(semiring) is None:
+        return False
+    return method_name == 'closure' or arguments['multiplier'].semiring_array(semiring) is not None
+
+class Instrumentation:
+
+    # Constructor - starts with nothing counted or timed.  "callback", if
+    # given, is called with the name of each call as it is counted (and
+    # None), and with the name of each phase as it finishes (and the
+    # seconds it took, excluding the other phases it called).
+    def __init__(self, callback = None):
+        self.callback = callback
+        # The names of the calls and phases under way
+        self.active = set()
+        # The phases under way, innermost last, each with its start time
+        # and the time spent in the phases it called
+        self.stack = []
+        self.reset()
+
+    # Discard the counts and times so far
+    def reset(self):
+        self.counts = dict([(name, 0) for name in COUNTED_CALLS])
+        self.phases = dict([(name, {'calls': 0, 'seconds': 0.0}) for name in TIMED_PHASES])
+
+    # Count a call
+    def count(self, name):
+        self.counts[name] += 1
+        if self.callback is not None:
+            self.callback(name, None)
+
+    # Record the start of a phase
+    def start_phase(self, name):
+        self.stack.append([name, time.perf_counter(), 0.0])
+
+    # Record the end of the innermost phase under way
+    def finish_phase(self):
+        name, start, nested = self.stack.pop()
+        elapsed = time.perf_counter() - start
+        self.phases[name]['calls'] += 1
+        self.phases[name]['seconds'] += elapsed - nested
+        if self.stack:
+            self.stack[-1][2] += elapsed
+        if self.callback is not None:
+            self.callback(name, elapsed - nested)
+
+    # Return the counts and times so far, as a dictionary with the count
+    # of each kind of call under "counts" and, under "phases", each
+    # phase's number of calls and total seconds
+    def report(self):
+        return {'counts': dict(self.counts),
+                'phases': dict([(name, dict(phase)) for name, phase in self.phases.items()])}
+
+    # Return a version of an operator whose calls are counted, unless it
+    # is already counted
+    def counted_operator(self, operator):
+        if getattr(operator, 'instrumented', False):
+            return operator
+        def counted(*arguments):
+            self.count('merger')
+            return operator(*arguments)
+        counted.instrumented = True
+        return counted
+
+    # Return a version of a semiring whose operators are counted (see
+    # counted_operator)
+    def counted_semiring(self, semiring):
+        return Semiring(self.counted_operator(semiring.addition), self.counted_operator(semiring.multiplication),
+                        semiring.zero, semiring.name, semiring.absorbing)
+
+    # Return a method's arguments with the operators (see
+    # OPERATOR_PARAMETERS) and any semiring replaced by counted versions,
+    # unless the call will process the cells in a single vectorised step
+    # (see array_path)
+    def counted_arguments(self, method_name, signature, arguments, options):
+        bound = signature.bind(*arguments, **options)
+        bound.apply_defaults()
+        if method_name == 'join_many':
+            # (The matrices are looked at before the call)
+            bound.arguments['matrices'] = list(bound.arguments['matrices'])
+        if array_path(method_name, bound.arguments):
+            return bound.args, bound.kwargs
+        for parameter, value in bound.arguments.items():
+            if parameter in OPERATOR_PARAMETERS:
+                bound.arguments[parameter] = self.counted_operator(value)
+            elif parameter == 'semiring' and value is not None:
+                bound.arguments[parameter] = self.counted_semiring(value)
+        return bound.args, bound.kwargs
+
+    # Return a version of a method that counts its calls under the given
+    # name (if any) and, if "merging" is True, the calls of its operators
+    def counting_method(self, method, name, merging):
+        signature = inspect.signature(method) if merging else None
+        def counting(*arguments, **options):
+            if name in self.active:
+                return method(*arguments, **options)
+            if name is not None:
+                self.active.add(name)
+                self.count(name)
+            try:
+                if merging:
+                    arguments, options = self.counted_arguments(method.__name__, signature, arguments, options)
+                return method(*arguments, **options)
+            finally:
+                self.active.discard(name)
+        return counting
+
+    # Return a version of a method that times its calls as the named phase
+    def timing_method(self, method, name):
+        def timing(*arguments, **options):
+            if name in self.active:
+                return method(*arguments, **options)
+            self.active.add(name)
+            self.start_phase(name)
+            try:
+                return method(*arguments, **options)
+            finally:
+                self.finish_phase()
+                self.active.discard(name)
+        return timing
+
+    # Return a list of (class, method name, replacement) tuples giving
+    # the counting and timing versions of the instrumented methods
+    def replacements(self):
+        counted = {}
+        for cls, names in COUNTED_METHODS:
+            for name in names:
+                counted[(cls, name)] = name
+        merging = set()
+        for cls, names in MERGING_METHODS:
+            for name in names:
+                merging.add((cls, name))
+        replacements = []
+        for cls, name in sorted(set(counted) | merging, key = lambda key: (key[0].__name__, key[1])):
+            replacements.append((cls, name, self.counting_method(cls.__dict__[name], counted.get((cls, name)),
+                                                                 (cls, name) in merging)))
+        for cls, phases in TIMED_METHODS:
+            for name, phase in phases:
+                replacements.append((cls, name, self.timing_method(cls.__dict__[name], phase)))
+        return replacements
+
+# The instrumentation in use, if it is enabled, and the original methods
+# it replaced, as (class, method name, method) tuples
+current_instrumentation = []
+replaced_methods = []
+
+# Start counting and timing the hot paths (see above), returning the
+# Instrumentation that records them
+def enable_instrumentation(callback = None):
+    assert not current_instrumentation, 'Instrumentation is already enabled in "enable_instrumentation"'
+    instrumentation = Instrumentation(callback)
+    for cls, name, replacement in instrumentation.replacements():
+        replaced_methods.append((cls, name, cls.__dict__[name]))
+        setattr(cls, name, replacement)
+    current_instrumentation.append(instrumentation)
+    return instrumentation
+
+# Stop counting and timing, restoring the original methods, and return
+# the final report (see Instrumentation.report)
+def disable_instrumentation():
+    assert current_instrumentation, 'Instrumentation is not enabled in "disable_instrumentation"'
+    while replaced_methods:
+        cls, name, method = replaced_methods.pop()
+        setattr(cls, name, method)
+    return current_instrumentation.pop().report()
+
+# Return True if instrumentation is enabled
+def instrumentation_enabled():
+    return bool(current_instrumentation)
+
+# Return the report so far (see Instrumentation.report)
+def instrumentation_report():
+    assert current_instrumentation, 'Instrumentation is not enabled in "instrumentation_report"'
+    return current_instrumentation[0].report()
+
+# Enable instrumentation for the duration of a "with" statement, giving
+# the Instrumentation, e.g.
+#
+#     with instrumented() as instrumentation:
+#         topology.should_see(observers)
+#     print_report(instrumentation.report())
+@contextmanager
+def instrumented(callback = None):
+    instrumentation = enable_instrumentation(callback)
+    try:
+        yield instrumentation
+    finally:
+        disable_instrumentation()
+
+# Print a report as a table of counts, followed by one of the phases'
+# calls and times (and their share of the total time)
+def print_report(report, output = None):
+    if output is None:
+        output = sys.stdout
+    for name in COUNTED_CALLS:
+        output.write('%-14s %10d\n' % (name, report['counts'][name]))
+    total = sum([phase['seconds'] for phase in report['phases'].values()])
+    for name in TIMED_PHASES:
+        phase = report['phases'][name]
+        share = 100.0 * phase['seconds'] / total if total > 0 else 0.0
+        output.write('%-14s %10d %10.4fs %5.1f%%\n' % (name, phase['calls'], phase['seconds'], share))
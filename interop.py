@@ -0,0 +1,136 @@
+#
+# Interop - moving topologies between matrices, NetworkX graphs and
+# SciPy sparse arrays
+#
+# Conversions work on whole arrays of link positions and contents at a
+# time rather than visiting each cell, so NetworkX's and SciPy's own
+# algorithms can be used alongside the observer analyses without the
+# conversions dominating the running time.  A link is any cell not equal
+# to the "empty" value.  NetworkX and SciPy are only imported when a
+# conversion needs them.
+#
+# The observer analyses (may_see, should_see and must_see) are also
+# provided as functions that accept a topology in any of these forms.
+#
+
+import numpy
+from matrix import Matrix
+from sparse_matrix import SparseMatrix
+
+# Return the positions (as arrays of row and column numbers) and
+# contents of the links in a matrix, in row order
+def matrix_links(matrix, empty_cell = 0):
+    if isinstance(matrix, SparseMatrix):
+        index = matrix.index
+        rows = []
+        columns = []
+        contents = []
+        for row in matrix.headings:
+            for column, content in matrix.links[row].items():
+                if content != empty_cell:
+                    rows.append(index[row])
+                    columns.append(index[column])
+                    contents.append(content)
+        return numpy.array(rows, dtype = numpy.intp), numpy.array(columns, dtype = numpy.intp), numpy.asarray(contents)
+    if matrix.dtype is not None:
+        cells = matrix.contents
+    else:
+        cells = numpy.asarray(matrix.contents)
+        assert matrix.get_size() == 0 or cells.dtype.kind in 'biuf', \
+            'Cells must be numbers to be converted in "matrix_links"'
+    cells = cells.reshape(matrix.get_size(), matrix.get_size())
+    rows, columns = numpy.nonzero(cells != empty_cell)
+    return rows, columns, cells[rows, columns]
+
+# Return a matrix's links as a SciPy sparse array (in compressed sparse
+# row format unless another is given), with the links' contents as its
+# entries
+def to_scipy_sparse(matrix, empty_cell = 0, format = 'csr'):
+    from scipy import sparse
+    rows, columns, contents = matrix_links(matrix, empty_cell)
+    size = matrix.get_size()
+    return sparse.coo_array((contents, (rows, columns)), shape = (size, size)).asformat(format)
+
+# Return a matrix holding the entries of a square SciPy sparse array (or
+# any array SciPy can convert), with the given headings (by default the
+# row numbers).  The result is a generic Matrix unless a dtype is given,
+# or a SparseMatrix if "sparse" is True; cells with no entry are empty.
+def from_scipy_sparse(array, headings = None, sparse = False, dtype = None):
+    from scipy.sparse import coo_array
+    array = coo_array(array)
+    size = array.shape[0]
+    assert array.shape == (size, size), 'Array is not square in "from_scipy_sparse"'
+    if headings is None:
+        headings = list(range(size))
+    assert len(headings) == size, 'Number of headings does not match array size in "from_scipy_sparse"'
+    array.sum_duplicates()
+    if sparse:
+        assert dtype is None, 'Sparse matrices cannot be typed in "from_scipy_sparse"'
+        matrix = SparseMatrix(list(headings))
+        for row, column, content in zip(array.row.tolist(), array.col.tolist(), array.data.tolist()):
+            matrix.set_cell(headings[row], headings[column], content)
+        return matrix
+    if dtype is None:
+        matrix = Matrix(list(headings))
+        cells = numpy.zeros((size, size), dtype = array.dtype)
+        cells[array.row, array.col] = array.data
+        matrix.contents = cells.tolist()
+        return matrix
+    matrix = Matrix(list(headings), 0, dtype)
+    matrix.contents[array.row, array.col] = array.data
+    return matrix
+
+# Return a NetworkX graph with a node for each of a matrix's headings
+# and an edge for each link, whose content is given as the edge's
+# "weight" attribute (or no attribute if "weight" is None).  The graph
+# is directed unless "directed" is False.
+def to_networkx(matrix, empty_cell = 0, directed = True, weight = 'weight'):
+    import networkx
+    graph = networkx.DiGraph() if directed else networkx.Graph()
+    headings = matrix.get_headings()
+    graph.add_nodes_from(headings)
+    rows, columns, contents = matrix_links(matrix, empty_cell)
+    sources = [headings[row] for row in rows.tolist()]
+    destinations = [headings[column] for column in columns.tolist()]
+    if weight is None:
+        graph.add_edges_from(zip(sources, destinations))
+    else:
+        graph.add_weighted_edges_from(zip(sources, destinations, contents.tolist()), weight)
+    return graph
+
+# Return a matrix holding a NetworkX graph's edges, with a heading for
+# each node (in the graph's order unless headings are given).  Each
+# edge's cell holds its "weight" attribute (or 1 if it has none, or if
+# "weight" is None); undirected edges fill the cells in both directions.
+# The options are as for from_scipy_sparse.
+def from_networkx(graph, headings = None, weight = 'weight', sparse = False, dtype = None):
+    import networkx
+    if headings is None:
+        headings = list(graph.nodes())
+    array = networkx.to_scipy_sparse_array(graph, nodelist = headings, weight = weight, format = 'coo')
+    return from_scipy_sparse(array, headings, sparse, dtype)
+
+# Return a topology given as a Matrix, a NetworkX graph or a SciPy
+# sparse array as a Matrix, whose cells are 1 for each link (or as a
+# SparseMatrix if "sparse" is True, which is better for large graphs)
+def topology_matrix(topology, sparse = False):
+    if isinstance(topology, Matrix):
+        return topology
+    dtype = None if sparse else 'int8'
+    if hasattr(topology, 'adj') and hasattr(topology, 'nodes'):
+        return from_networkx(topology, weight = None, sparse = sparse, dtype = dtype)
+    from scipy.sparse import coo_array
+    return from_scipy_sparse((coo_array(topology) != 0).astype(numpy.int8), sparse = sparse, dtype = dtype)
+
+# The observer analyses (see Matrix) for a topology in any of the forms
+# accepted by topology_matrix.  (A NetworkX graph's nodes are used as
+# the headings, so the observers are named by their nodes.)
+
+def may_see(topology, observers, sparse = False):
+    return topology_matrix(topology, sparse).may_see(observers)
+
+def should_see(topology, observers, sparse = False):
+    return topology_matrix(topology, sparse).should_see(observers)
+
+def must_see(topology, observers, sparse = False):
+    return topology_matrix(topology, sparse).must_see(observers)
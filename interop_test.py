@@ -0,0 +1,77 @@
+# Tests of the NetworkX and SciPy conversions
+
+import networkx
+from matrix import Matrix
+from sparse_matrix import SparseMatrix
+from interop import to_scipy_sparse, from_scipy_sparse, may_see, must_see
+
+headers = ['A', 'B', 'C', 'D']
+topology = Matrix(headers)
+topology.fill([0, 0, 1, 0,
+               0, 0, 1, 0,
+               1, 1, 0, 1,
+               0, 0, 1, 0])
+
+print('The topology as a NetworkX graph:')
+graph = topology.to_networkx()
+print(sorted(graph.nodes()), sorted(graph.edges()))
+print(sorted(topology.to_networkx(directed = False).edges()))
+print('')
+
+print('The topology as a SciPy sparse array, and back:')
+array = topology.to_scipy_sparse()
+print(array.format, array.nnz)
+print(Matrix.from_scipy_sparse(array, headers).get_contents() == topology.get_contents())
+print(SparseMatrix.from_scipy_sparse(array, headers).get_link_count())
+print('')
+
+print('A weighted undirected NetworkX graph as a typed matrix:')
+graph = networkx.Graph()
+graph.add_nodes_from(['W', 'X', 'Y', 'Z'])
+graph.add_edge('W', 'X', weight = 100)
+graph.add_edge('W', 'Y', weight = 10)
+graph.add_edge('X', 'Z', weight = 100)
+graph.add_edge('Y', 'Z', weight = 1)
+bandwidths = Matrix.from_networkx(graph, dtype = 'int32')
+print(bandwidths)
+print(sorted(bandwidths.to_networkx().edges(data = 'weight')) ==
+      sorted(graph.to_directed().edges(data = 'weight')))
+print('')
+
+print('The bandwidths through SciPy and back, from dense and sparse matrices:')
+array = to_scipy_sparse(bandwidths, format = 'coo')
+print(array.format, array.nnz, array.sum())
+round_trip = from_scipy_sparse(array, bandwidths.get_headings(), dtype = 'int32')
+print(round_trip.get_contents() == bandwidths.get_contents())
+sparse = from_scipy_sparse(array, bandwidths.get_headings(), sparse = True)
+print((to_scipy_sparse(sparse) != array.tocsr()).nnz)
+print('')
+
+print('What W and Z must see, given the NetworkX graph:')
+print(must_see(graph, ['W', 'Z']))
+print(may_see(graph, ['W'], sparse = True).get_contents() == may_see(graph, ['W']).get_contents())
+print(SparseMatrix.from_networkx(graph).get_link_count())
+print('')
+
+# Correct answer:
+#     ['A', 'B', 'C', 'D'] [('A', 'C'), ('B', 'C'), ('C', 'A'), ('C', 'B'), ('C', 'D'), ('D', 'C')]
+#     [('A', 'C'), ('B', 'C'), ('C', 'D')]
+#
+#     csr 6
+#     True
+#     6
+#
+#                 |           W|           X|           Y|           Z|
+#                W|           0|         100|          10|           0|
+#                X|         100|           0|           0|         100|
+#                Y|          10|           0|           0|           1|
+#                Z|           0|         100|           1|           0|
+#     True
+#
+#     coo 8 422
+#     True
+#     0
+#
+#     (As for W and Z in visibility_test.py)
+#     True
+#     8
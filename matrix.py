@@ -3,41 +3,189 @@
 # Matrix - A class for square matrices with arbitrary types for
 # indices and arbitrary types for cells.  Matrix objects are
 # mutable so operations are performed in place.
+#
+# By default cells are held in a list of Python lists, which allows
+# any type of content (strings, protocol sets, etc.).  If a NumPy
+# "dtype" is given the cells are instead held in a single contiguous
+# array of that type, which is far more compact for numerical and
+# 0/1 matrices and allows whole-matrix operations to be vectorised.
+
+import io
+import numpy
+from operator import add, mul
+from reachability import ReachabilityIndex, DynamicReachabilityIndex, mask_row, masks_array
+from semirings import Semiring, VECTORISED_OPERATIONS
+
+# The algorithms available for calculating a closure (see Matrix.closure)
+CLOSURE_METHODS = ['auto', 'warshall', 'squaring']
+
+# The width of columns when a matrix is printed (see Matrix.write)
+COLUMN_WIDTH = 12
+
+# The number of distinct typed cells whose formatting is remembered
+# while a matrix is written
+FORMATTED_CELLS = 4096
+
+# Return a label or cell's contents as a string fitting the column width,
+# keeping the end of any longer string (or in full if the width is None)
+def format_cell(content, column_width = COLUMN_WIDTH):
+    text = str(content)
+    if column_width is None:
+        return text
+    return text[max(len(text) - column_width, 0):].rjust(column_width)
+
+# Map each of a list of headings to its position, checking that the
+# headings are unique
+def index_headings(headings):
+    index = {}
+    for position, heading in enumerate(headings):
+        assert not heading in index, "Duplicate heading:" + str(heading)
+        index[heading] = position
+    return index
+
 class Matrix:
 
     # Functions corresponding to arithmetic primitives
     from operator import add, mul
 
     # Constructor - creates the matrix and fills all cells with a default value
-    def __init__(self, headings = ['default'], default_content = 0):
-        # Check uniqueness of headings
-        for heading in headings:
-            assert headings.count(heading) == 1, "Duplicate heading:" + str(heading)
-        # Map headings to indices
+    # (if a dtype such as 'int8', 'float64' or bool is given the cells are
+    # stored in a typed array, otherwise any Python objects can be stored)
+    def __init__(self, headings = ['default'], default_content = 0, dtype = None):
+        # Check uniqueness of headings and map headings to indices
+        self.index = index_headings(headings)
         self.headings = headings
+        # No reachability index has been calculated yet, and none is to
+        # be maintained as cells change
+        self.reachability = None
+        self.incremental = False
+        # The cells are not shared with a copy (see copy)
+        self.shared = False
         # Initialise the matrix
-        # (Note that [[default_content] * len(headings)] * len(headings) aliases the
-        #  mutable list rows!)
-        self.contents = [[default_content for row in headings] for column in headings]
+        if dtype is None:
+            # (Note that [[default_content] * len(headings)] * len(headings) aliases the
+            #  mutable list rows!)
+            self.dtype = None
+            self.contents = [[default_content for row in headings] for column in headings]
+        else:
+            self.dtype = numpy.dtype(dtype)
+            self.contents = numpy.full((len(headings), len(headings)), default_content, dtype = self.dtype)
 
     # Setter - populates the matrix from a single-dimension list of contents
     def fill(self, contents):
         # Confirm that sufficient contents have been provided
         assert len(contents) == len(self.headings) ** 2, "Number of cells does not match matrix size in 'fill'"
         # Copy the list of contents into the matrix
-        position = 0
-        for row in self.headings:
-            for column in self.headings:
-                self.set_cell(row, column, contents[position])
-                position += 1
+        self.reachability = None
+        size = len(self.headings)
+        if self.dtype is None:
+            self.contents = [list(contents[start:start + size]) for start in range(0, size * size, size)]
+            self.shared = False
+        else:
+            self.own_contents()
+            self.contents[...] = numpy.asarray(contents, dtype = self.dtype).reshape(size, size)
 
     # Setter - updates a particular cell
     def set_cell(self, row = 'default', column = 'default', content = 0):
-        self.contents[self.headings.index(row)][self.headings.index(column)] = content        
+        row_index = self.index[row]
+        column_index = self.index[column]
+        if self.incremental and self.reachability is not None:
+            self.reachability.set_link(row_index, column_index, content != self.reachability.empty_cell)
+        else:
+            self.reachability = None
+        if self.shared:
+            self.own_contents()
+        self.contents[row_index][column_index] = content
 
-    # Getter - returns (an alias to?) a particular cell's contents
+    # Getter - returns (an alias to?) a particular cell's contents (typed
+    # cells are returned as plain Python values)
     def get_cell(self, row = 'default', column = 'default'):
-        return self.contents[self.headings.index(row)][self.headings.index(column)]
+        if self.dtype is None:
+            return self.contents[self.index[row]][self.index[column]]
+        return self.contents.item(self.index[row], self.index[column])
+
+    # Setter - replaces the row/column headings with an equal number of
+    # new (unique) headings, leaving the cells unchanged
+    def set_headings(self, headings):
+        assert len(headings) == len(self.headings), "Number of headings does not match matrix size in 'set_headings'"
+        self.index = index_headings(headings)
+        self.headings = headings
+        self.reachability = None
+
+    # Getter - returns the row/column number of a particular heading
+    def get_index(self, heading):
+        return self.index[heading]
+
+    # The following accessors address rows and columns by number rather
+    # than by heading, so that loops over the whole matrix avoid looking
+    # up labels for each cell
+
+    # Getter - returns a copy of the numbered row as a list
+    def get_row(self, row_index):
+        if self.dtype is None:
+            return list(self.contents[row_index])
+        return self.contents[row_index].tolist()
+
+    # Setter - replaces the numbered row with a list of contents
+    def set_row(self, row_index, contents):
+        assert len(contents) == len(self.headings), "Number of cells does not match matrix size in 'set_row'"
+        self.reachability = None
+        self.own_contents()
+        if self.dtype is None:
+            self.contents[row_index] = list(contents)
+        else:
+            self.contents[row_index] = contents
+
+    # Getter - returns a copy of the numbered column as a list
+    def get_column(self, column_index):
+        if self.dtype is None:
+            return [row[column_index] for row in self.contents]
+        return self.contents[:, column_index].tolist()
+
+    # Setter - overwrites a rectangular block of cells, given as a list
+    # of rows, whose top left-hand corner is at the numbered row and column
+    def set_block(self, row_index, column_index, block):
+        assert row_index + len(block) <= len(self.headings), "Block does not fit in the matrix in 'set_block'"
+        self.reachability = None
+        self.own_contents()
+        for offset, contents in enumerate(block):
+            assert column_index + len(contents) <= len(self.headings), "Block does not fit in the matrix in 'set_block'"
+            if self.dtype is None:
+                self.contents[row_index + offset][column_index:column_index + len(contents)] = contents
+            else:
+                self.contents[row_index + offset, column_index:column_index + len(contents)] = contents
+
+    # Getter - returns, for each row, a list of the numbers of the columns
+    # whose cells are not equal to the "empty" value (i.e., the successors
+    # of each node if the matrix represents a digraph)
+    def get_successors(self, empty_cell = 0):
+        if self.dtype is None:
+            return [[column_index for column_index, cell in enumerate(row) if cell != empty_cell]
+                    for row in self.contents]
+        return [numpy.flatnonzero(row != empty_cell).tolist() for row in self.contents]
+
+    # Getter - returns the reachability index of the digraph represented
+    # by this matrix, calculating it only if the matrix has changed since
+    # it was last requested
+    def get_reachability(self, empty_cell = 0):
+        if self.reachability is None or self.reachability.empty_cell != empty_cell:
+            if self.incremental:
+                self.reachability = DynamicReachabilityIndex(self, empty_cell)
+            else:
+                self.reachability = ReachabilityIndex(self, empty_cell)
+        return self.reachability
+
+    # Setter - switches incremental maintenance of the reachability index
+    # on or off.  While it is on, changing a single cell with "set_cell"
+    # updates the index (and the remembered "may see" results that are
+    # affected) rather than discarding it, which is far quicker than a
+    # recalculation when links come and go one at a time in a large
+    # topology.  Other changes still discard the index.
+    def maintain_reachability(self, maintain = True, empty_cell = 0):
+        self.incremental = maintain
+        self.reachability = None
+        if maintain:
+            self.get_reachability(empty_cell)
 
     # Getter - returns the square matrix's dimension
     def get_size(self):
@@ -47,59 +195,202 @@ class Matrix:
     def get_headings(self):
         return list(self.headings)
 
+    # Getter - returns the type of the matrix's cells (None for arbitrary
+    # Python objects)
+    def get_dtype(self):
+        return self.dtype
+
     # Getter - returns a copy of the matrix's contents as a single-dimension list
     def get_contents(self):
-        return list(sum(self.contents, []))
+        if self.dtype is None:
+            return [cell for row in self.contents for cell in row]
+        return self.contents.ravel().tolist()
 
     # Create a copy of the current matrix (because Matrix objects are
     # mutable the assignment "new_matrix = old_matrix" creates an
     # alias, not a copy, so you need "new_matrix = old_matrix.copy()" to
-    # create a separate copy)
+    # create a separate copy).  The copy shares this matrix's cells until
+    # either of them is changed, when the one being changed first takes
+    # its own copy of the cells (see own_contents), so copying a matrix
+    # that is only read costs nothing however large it is.  A cached
+    # reachability index is shared too, unless it is being maintained as
+    # cells change.
     def copy(self):
-        new_copy = Matrix(self.get_headings())
-        new_copy.fill(self.get_contents())
+        new_copy = Matrix([])
+        new_copy.headings = self.get_headings()
+        new_copy.index = dict(self.index)
+        new_copy.dtype = self.dtype
+        new_copy.contents = self.contents
+        new_copy.shared = self.shared = True
+        if not self.incremental:
+            new_copy.reachability = self.reachability
         return new_copy
 
+    # Make sure this matrix's cells are not shared with a copy (see copy)
+    # before they are changed
+    def own_contents(self):
+        if not self.shared:
+            return
+        if self.dtype is None:
+            self.contents = [list(row) for row in self.contents]
+        else:
+            self.contents = self.contents.copy()
+        self.shared = False
+
+    # Save the matrix to a file in a compact binary format, replacing any
+    # existing file (see matrix_files.py, and load to read it back).
+    # 0/1 matrices are packed eight cells to a byte unless "packed" is False.
+    def save(self, path, packed = None):
+        from matrix_files import save_matrix
+        save_matrix(self, path, packed)
+
+    # Create a matrix holding the numbered matrix (by default the first) in
+    # a matrix file, e.g. "Matrix.load(path)" (see matrix_files.load_matrix,
+    # which maps typed cells straight from the file unless "mmap" is
+    # False).  SparseMatrix.load gives a SparseMatrix instead, holding
+    # the cells that are not 0.
+    @classmethod
+    def load(cls, path, record = 0, mmap = True):
+        from matrix_files import load_matrix
+        matrix = load_matrix(path, record, mmap)
+        if cls is not Matrix:
+            return matrix.to_sparse()
+        return matrix
+
+    # Create a NetworkX graph (directed unless "directed" is False) with an
+    # edge for each link, holding its content as the "weight" attribute
+    # (see interop.py, whose from_networkx converts a graph to a matrix)
+    def to_networkx(self, empty_cell = 0, directed = True, weight = 'weight'):
+        from interop import to_networkx
+        return to_networkx(self, empty_cell, directed, weight)
+
+    # Create a SciPy sparse array (CSR unless another format is given)
+    # holding the links' contents (see interop.py, whose
+    # from_scipy_sparse converts an array to a matrix)
+    def to_scipy_sparse(self, empty_cell = 0, format = 'csr'):
+        from interop import to_scipy_sparse
+        return to_scipy_sparse(self, empty_cell, format)
+
+    # Create a matrix holding a NetworkX graph's edges, e.g.
+    # "Matrix.from_networkx(graph)" (see interop.from_networkx for the
+    # options); SparseMatrix.from_networkx gives a SparseMatrix
+    @classmethod
+    def from_networkx(cls, graph, headings = None, weight = 'weight', dtype = None):
+        from interop import from_networkx
+        return from_networkx(graph, headings, weight, cls is not Matrix, dtype)
+
+    # Create a matrix holding the entries of a square SciPy sparse array
+    # (see interop.from_scipy_sparse for the options); similarly,
+    # SparseMatrix.from_scipy_sparse gives a SparseMatrix
+    @classmethod
+    def from_scipy_sparse(cls, array, headings = None, dtype = None):
+        from interop import from_scipy_sparse
+        return from_scipy_sparse(array, headings, cls is not Matrix, dtype)
+
+    # Create a SparseMatrix holding the same cells as this one, storing
+    # only the cells not equal to the "empty" value
+    def to_sparse(self, empty_cell = 0):
+        from sparse_matrix import SparseMatrix
+        sparse = SparseMatrix(self.get_headings(), empty_cell)
+        for index in range(self.get_size()):
+            sparse.set_row(index, self.get_row(index))
+        return sparse
+
     # "Add" corresponding cells from another equal-sized matrix,
     # using an arbitrary binary function to "add" the cells
     def add_matrix(self, summand, operation = add):
         # Check type correctness of parameter
         assert isinstance(summand, Matrix), "Summand is not a matrix in 'add_matrix'"
         assert summand.get_size() == self.get_size(), "Different size matrices in 'add_matrix'"
-        # Create a mapping between this matrix's headings and those of the summand
-        summand_headings = summand.get_headings()
-        mapping = dict([(self.get_headings()[index], summand_headings[index]) for index in range(self.get_size())])
-        # "Add" corresponding cells using the given operator
-        for row in self.get_headings():
-            for column in self.get_headings():
-                self.set_cell(row, column,
-                              operation(self.get_cell(row, column),
-                                        summand.get_cell(mapping[row], mapping[column])))        
+        self.reachability = None
+        # Typed matrices are "added" in a single vectorised step if the
+        # operator has a NumPy equivalent (cells correspond by position)
+        if self.dtype is not None and operation in VECTORISED_OPERATIONS:
+            if summand.dtype is not None:
+                summand_contents = summand.contents
+            else:
+                # (Generic and sparse summands are gathered row by row)
+                summand_contents = numpy.asarray([summand.get_row(index) for index in range(summand.get_size())])
+            self.own_contents()
+            self.contents[...] = VECTORISED_OPERATIONS[operation](self.contents, summand_contents)
+            return
+        # "Add" corresponding cells using the given operator (the summand's
+        # cells correspond to this matrix's by position, not by heading)
+        for index in range(self.get_size()):
+            self.set_row(index, [operation(cell, summand_cell)
+                                 for cell, summand_cell in zip(self.get_row(index), summand.get_row(index))])
+
+    # Return the cells as a NumPy array if the semiring's operators can be
+    # applied to them in vectorised form, otherwise None.  Typed cells are
+    # used as they stand; generic cells only if they are all integers (or
+    # booleans) and the operators only ever select one of their arguments,
+    # so that no result can overflow a fixed-size integer.
+    def semiring_array(self, semiring):
+        if not semiring.vectorised:
+            return None
+        if self.dtype is not None:
+            return self.contents
+        if not semiring.selective:
+            return None
+        contents = numpy.asarray(self.contents)
+        if contents.ndim == 2 and contents.dtype.kind in 'biu':
+            return contents
+        return None
+
+    # Check that this matrix's cells can hold a semiring's zero (the value
+    # of its empty cells), as typed integer cells cannot hold MIN_PLUS's
+    # infinite zero (so shortest paths need a float dtype, with empty
+    # cells holding infinity)
+    def check_semiring(self, semiring, method_name):
+        if self.dtype is None or self.dtype.kind not in 'biu':
+            return
+        zero = numpy.asarray(semiring.zero)
+        assert zero.dtype.kind in 'biu' or (zero.dtype.kind == 'f' and float(zero).is_integer()), \
+            'Semiring zero ' + str(semiring.zero) + ' cannot be held in ' + str(self.dtype) + \
+            ' cells in "' + method_name + '"'
+
+    # Replace this matrix's contents with an array calculated from them
+    def set_array(self, contents):
+        if self.dtype is None:
+            self.set_block(0, 0, contents.tolist())
+        else:
+            self.set_block(0, 0, contents)
 
     # Multiply this matrix (the multiplicand) by another equal-sized
     # matrix, using arbitrary "addition" and "multiplication" operators.
     # Recall that a cell's value in the result, given a row "a, b, c" from
     # the multiplicand and column "x, y, z" from the multiplier equals
-    # "a*x + b*y + c*z".
-    def multiply_matrices(self, multiplier, addition = add, multiplication = mul, zero_value = 0):
+    # "a*x + b*y + c*z".  The operators and zero value may be given as a
+    # Semiring instead (see semirings.py), and if they have NumPy
+    # equivalents the multiplication is vectorised where possible.  The
+    # zero must be the value of both matrices' empty cells (see
+    # check_semiring).
+    def multiply_matrices(self, multiplier, addition = add, multiplication = mul, zero_value = 0, semiring = None):
         # Check type correctness of parameter
         assert isinstance(multiplier, Matrix), "Multiplier is not a matrix in 'multiply_matrices'"
         assert multiplier.get_size() == self.get_size(), "Different size matrices in 'multiply_matrices'"
-        # Create a mapping between this matrix's headings and those of the summand
-        multiplier_headings = multiplier.get_headings()
-        mapping = dict([(self.get_headings()[index], multiplier_headings[index]) for index in range(self.get_size())])
-        # Create a new matrix to hold the result
-        result = Matrix(self.get_headings(), zero_value)
-        # "Multiply" the matrices using the given operators
-        for rowA in self.get_headings():
-            for columnB in self.get_headings():
-                for rowB in self.get_headings():
-                    result.set_cell(rowA, columnB,
-                                    addition(result.get_cell(rowA, columnB),
-                                             multiplication(self.get_cell(rowA, rowB),
-                                                            multiplier.get_cell(mapping[rowB], mapping[columnB]))))
-        # Replace this matrix's contents with the result
-        self.fill(result.get_contents())
+        if semiring is None:
+            semiring = Semiring(addition, multiplication, zero_value)
+        self.check_semiring(semiring, 'multiply_matrices')
+        multiplier.check_semiring(semiring, 'multiply_matrices')
+        # The multiplier's rows and columns correspond to this matrix's by
+        # position, not by heading
+        size = self.get_size()
+        multiplicand_array = self.semiring_array(semiring)
+        multiplier_array = multiplier.semiring_array(semiring)
+        if multiplicand_array is not None and multiplier_array is not None:
+            self.set_array(semiring.multiply_arrays(multiplicand_array, multiplier_array))
+            return
+        # Otherwise "multiply" the matrices one cell at a time
+        self.set_block(0, 0, semiring.multiply_lists([self.get_row(index) for index in range(size)],
+                                                     [multiplier.get_row(index) for index in range(size)]))
+
+    # The cell type of a matrix joined from this one and another: joining
+    # two typed matrices gives a typed result, anything else is generic
+    def joined_dtype(self, other_matrix):
+        if self.dtype is None or other_matrix.dtype is None:
+            return None
+        return numpy.result_type(self.dtype, other_matrix.dtype)
 
     # "Join" this matrix to another to create a larger matrix, assuming the
     # headings of the two matrices are disjoint.
@@ -110,22 +401,23 @@ class Matrix:
     def join_disjoint_matrices(self, other_matrix, default = 0):
         # Check type correctness of parameter
         assert isinstance(other_matrix, Matrix), "Parameter is not a matrix in 'join_disjoint_matrices'"
-        for heading in self.get_headings():
-            assert not (heading in other_matrix.get_headings()), "Headings must be disjoint in 'join_disjoint_matrices'"
+        for heading in self.headings:
+            assert not (heading in other_matrix.index), "Headings must be disjoint in 'join_disjoint_matrices'"
         # Create a new matrix full of default values
-        result = Matrix(self.get_headings() + other_matrix.headings, default)
-        # Insert the original cells from this matrix
-        for row in self.get_headings():
-            for column in self.get_headings():
-                result.set_cell(row, column, self.get_cell(row, column))
-        # Insert the original cells from the other matrix
-        for row in other_matrix.get_headings():
-            for column in other_matrix.get_headings():
-                result.set_cell(row, column, other_matrix.get_cell(row, column))                              
+        result = Matrix(self.get_headings() + other_matrix.get_headings(), default,
+                        self.joined_dtype(other_matrix))
+        # Insert the original cells from this matrix in the top left-hand
+        # corner and those from the other matrix in the bottom right-hand one
+        size = self.get_size()
+        result.set_block(0, 0, [self.get_row(index) for index in range(size)])
+        result.set_block(size, size, [other_matrix.get_row(index) for index in range(other_matrix.get_size())])
         # Replace this matrix's guts with the result
-        self.headings = result.get_headings()
-        self.contents = [['dummy' for row in self.get_headings()] for column in self.get_headings()]
-        self.fill(result.get_contents())
+        self.headings = result.headings
+        self.index = result.index
+        self.reachability = None
+        self.dtype = result.dtype
+        self.contents = result.contents
+        self.shared = False
 
     # "Join" this matrix to another to create a larger matrix; headings do
     # not need to be disjoint, but a function needs to be provided for
@@ -136,30 +428,98 @@ class Matrix:
         # Create the new heading list, preserving the original order of
         # the headings
         new_headings = self.get_headings()
-        for heading in other_matrix.get_headings():
-            if not heading in new_headings:
+        for heading in other_matrix.headings:
+            if not heading in self.index:
                 new_headings += [heading]
         # Create a new matrix full of default values
-        result = Matrix(new_headings, default)
-        # Insert the original cells that only appear in this matrix
-        for row in self.get_headings():
-            for column in self.get_headings():
-                if not (row in other_matrix.get_headings() and column in other_matrix.get_headings()):
-                    result.set_cell(row, column, self.get_cell(row, column))
-        # Insert the original cells that only appear in the other matrix
-        for row in other_matrix.get_headings():
-            for column in other_matrix.get_headings():
-                if not (row in self.get_headings() and column in self.get_headings()):
-                    result.set_cell(row, column, other_matrix.get_cell(row, column))                              
-        # Merge the cells that appear in both matrices
-        for row in self.get_headings():
-            for column in self.get_headings():
-                if row in other_matrix.get_headings() and column in other_matrix.get_headings():
-                    result.set_cell(row, column, merger(self.get_cell(row, column), other_matrix.get_cell(row, column)))                              
+        result = Matrix(new_headings, default, self.joined_dtype(other_matrix))
+        # Insert the original cells from this matrix in the top left-hand
+        # corner
+        result.set_block(0, 0, [self.get_row(index) for index in range(self.get_size())])
+        # Insert the original cells from the other matrix, merging the
+        # cells that appear in both matrices
+        positions = [result.index[heading] for heading in other_matrix.headings]
+        shared = [heading in self.index for heading in other_matrix.headings]
+        for row_index, row_position in enumerate(positions):
+            result_row = result.get_row(row_position)
+            for column_index, cell in enumerate(other_matrix.get_row(row_index)):
+                column_position = positions[column_index]
+                if shared[row_index] and shared[column_index]:
+                    result_row[column_position] = merger(result_row[column_position], cell)
+                else:
+                    result_row[column_position] = cell
+            result.set_row(row_position, result_row)
+        # Replace this matrix's guts with the result
+        self.headings = result.headings
+        self.index = result.index
+        self.reachability = None
+        self.dtype = result.dtype
+        self.contents = result.contents
+        self.shared = False
+
+    # "Join" this matrix to each of a list of others in turn, with the same
+    # result as calling join_matrices for each, but building the result
+    # only once.  The headings are put in order of first appearance, and
+    # each matrix's cells are copied or merged straight into place: a
+    # cell is copied from the first matrix in which both its row and
+    # column headings have appeared (if that matrix holds the cell) and
+    # merged with the cell from each later matrix holding it.
+    def join_many(self, matrices, merger = add, default = 0):
+        matrices = [self] + list(matrices)
+        for matrix in matrices:
+            assert isinstance(matrix, Matrix), "Parameter is not a matrix in 'join_many'"
+        # Number the matrices and find the one in which each heading first
+        # appears
+        headings = []
+        first = {}
+        for number, matrix in enumerate(matrices):
+            for heading in matrix.headings:
+                if not heading in first:
+                    first[heading] = number
+                    headings.append(heading)
+        dtype = self.dtype
+        for matrix in matrices:
+            if dtype is None or matrix.dtype is None:
+                dtype = None
+                break
+            dtype = numpy.result_type(dtype, matrix.dtype)
+        # Create a new matrix full of default values and insert the cells
+        result = Matrix(headings, default, dtype)
+        for number, matrix in enumerate(matrices):
+            positions = [result.index[heading] for heading in matrix.headings]
+            firsts = [first[heading] for heading in matrix.headings]
+            if dtype is not None:
+                # Typed cells are copied or merged a block at a time, if
+                # possible
+                copied = numpy.maximum.outer(firsts, firsts) == number
+                block_index = numpy.ix_(positions, positions)
+                if copied.all():
+                    result.contents[block_index] = matrix.contents
+                    continue
+                if merger in VECTORISED_OPERATIONS:
+                    merged = VECTORISED_OPERATIONS[merger](result.contents[block_index], matrix.contents)
+                    result.contents[block_index] = numpy.where(copied, matrix.contents, merged)
+                    continue
+            for row_index, row_position in enumerate(positions):
+                if dtype is None:
+                    result_row = result.contents[row_position]
+                else:
+                    result_row = result.get_row(row_position)
+                for column_index, cell in enumerate(matrix.get_row(row_index)):
+                    column_position = positions[column_index]
+                    if max(firsts[row_index], firsts[column_index]) == number:
+                        result_row[column_position] = cell
+                    else:
+                        result_row[column_position] = merger(result_row[column_position], cell)
+                if dtype is not None:
+                    result.set_row(row_position, result_row)
         # Replace this matrix's guts with the result
-        self.headings = result.get_headings()
-        self.contents = [['dummy' for row in new_headings] for column in new_headings]
-        self.fill(result.get_contents())
+        self.headings = result.headings
+        self.index = result.index
+        self.reachability = None
+        self.dtype = result.dtype
+        self.contents = result.contents
+        self.shared = False
 
     # Calculate the transitive closure of this matrix, assuming that there
     # are distinguished empty cells and that populated cells can be "added".
@@ -167,32 +527,83 @@ class Matrix:
     # its dreadful time efficiency of O(N^3).  Whereas a standard transitive
     # closure calculation doesn't distinguish a direct link between nodes i
     # j and an indirect one via node k, here we provide two distinct node
-    # "addition" operators so that we can see the difference.
-    def closure(self, add_alt_path = max, join_hops = max, empty_cell = 0):
-        # Create a new matrix to hold the previous result
-        previous = self.copy()
-        # Create a new matrix to hold the next result
-        next_matrix = self.copy()       
+    # "addition" operators so that we can see the difference.  (If only
+    # reachability is needed, get_reachability is far quicker.)  The
+    # operators and empty value may be given as a Semiring instead (see
+    # semirings.py), whose zero must be the value of the empty cells (see
+    # check_semiring), and if they have NumPy equivalents the closure is
+    # vectorised where possible.  With method 'squaring' the closure is
+    # instead found by repeatedly squaring the matrix (see
+    # Semiring.close_by_squaring), which takes about log2(N) matrix
+    # multiplications but is only equivalent for semirings in which
+    # going round a cycle never gives a better path.  By default ('auto')
+    # whichever is quicker for the matrix is used, which is Warshall's
+    # algorithm except for boolean arrays (see closure_benchmark.py).  If
+    # more than one worker process is allowed, large typed matrices are
+    # closed in parallel where that gives the same result (see parallel.py).
+    def closure(self, add_alt_path = max, join_hops = max, empty_cell = 0, semiring = None, method = 'auto',
+                workers = None):
+        assert method in CLOSURE_METHODS, 'Unknown method ' + str(method) + ' in "closure"'
+        if semiring is None:
+            semiring = Semiring(add_alt_path, join_hops, empty_cell)
+        self.check_semiring(semiring, 'closure')
+        contents = self.semiring_array(semiring)
+        if method == 'auto':
+            if contents is not None and semiring.prefers_squaring(contents):
+                method = 'squaring'
+            else:
+                method = 'warshall'
+        if method == 'squaring':
+            if contents is None:
+                contents = [self.get_row(index) for index in range(self.get_size())]
+                self.set_block(0, 0, semiring.close_by_squaring(contents))
+            else:
+                self.set_array(semiring.close_by_squaring(contents))
+            return
+        if contents is not None:
+            from parallel import use_parallel, parallel_close
+            if use_parallel(contents, semiring, workers):
+                self.set_array(parallel_close(contents, semiring, workers))
+            elif self.dtype is None:
+                # (The array was made from the cells, so can be closed in place)
+                self.set_array(semiring.close_array(contents, True))
+            else:
+                # Typed cells are closed where they are
+                self.own_contents()
+                self.reachability = None
+                semiring.close_array(self.contents, True)
+            return
+        add_alt_path = semiring.addition
+        join_hops = semiring.multiplication
+        empty_cell = semiring.zero
+        # Work on the rows as lists, addressed by number
+        size = self.get_size()
+        next_rows = [self.get_row(index) for index in range(size)]
         # Create k successive hops in the closure (extend k if you want longer cycles
         # to appear in the cells, although this won't populate more cells)
-        for k in self.get_headings():
-            previous_matrix = next_matrix.copy()
-            for i in self.get_headings():
-                for j in self.get_headings():
-                    # Insert existing direct paths from i to j
-                    if previous_matrix.get_cell(i, j) != empty_cell:
-                        next_matrix.set_cell(i, j, previous_matrix.get_cell(i, j))
+        for k in range(size):
+            # The paths via k are built from the previous hop's paths to and
+            # from k, so only row and column k of the previous hop are kept
+            # (existing direct paths from i to j are carried over because
+            # the rows are updated in place)
+            previous_k = list(next_rows[k])
+            previous_column_k = [row[k] for row in next_rows]
+            for i in range(size):
+                previous_ik = previous_column_k[i]
+                if previous_ik == empty_cell:
+                    continue
+                next_i = next_rows[i]
+                for j in range(size):
                     # Add indirect paths from i to j via k
-                    if previous_matrix.get_cell(i, k) != empty_cell and previous_matrix.get_cell(k, j) != empty_cell:
-                        if next_matrix.get_cell(i, j) != empty_cell:
+                    if previous_k[j] != empty_cell:
+                        if next_i[j] != empty_cell:
                             # There is more than one path between i and j
-                            next_matrix.set_cell(i, j, add_alt_path(next_matrix.get_cell(i, j),
-                                                                    join_hops(previous_matrix.get_cell(i, k), previous_matrix.get_cell(k, j))))
+                            next_i[j] = add_alt_path(next_i[j], join_hops(previous_ik, previous_k[j]))
                         else:
                             # This is the first path found between i and j
-                            next_matrix.set_cell(i, j, join_hops(previous_matrix.get_cell(i, k), previous_matrix.get_cell(k, j)))
+                            next_i[j] = join_hops(previous_ik, previous_k[j])
         # Replace this matrix's contents with the result
-        self.fill(next_matrix.get_contents())
+        self.set_block(0, 0, next_rows)
 
 
     # Assuming this matrix M represents a digraph, and given the name
@@ -202,20 +613,9 @@ class Matrix:
     # "empty" value means there is a link from node X to Y.
     def reachable_from(self, source, empty_cell = 0):
         # Confirm that the source node exists
-        assert source in self.get_headings(), 'Node ' + str(source) + 'does not exist in method "reachable_from"' 
-        # Create a copy of this matrix, so that we can mess about with
-        # the graph without corrupting this one
-        new_graph = self.copy()
-        # Calculate the transitive closure
-        new_graph.closure(empty_cell = empty_cell)
-        # Accumulate the list of reachable nodes
-        reachable = []
-        for destination in self.get_headings():
-            if destination != source:
-                if new_graph.get_cell(source, destination) != empty_cell:
-                    reachable += [destination]
-        # Return the result      
-        return reachable
+        assert source in self.index, 'Node ' + str(source) + 'does not exist in method "reachable_from"'
+        # Look up the reachable nodes in the (cached) transitive closure
+        return self.get_reachability(empty_cell).reachable_from(source)
 
 
     # Assuming this matrix M represents a digraph, and given the name
@@ -225,109 +625,64 @@ class Matrix:
     # "empty" value means there is a link from node X to Y.
     def can_reach(self, destination, empty_cell = 0):
         # Confirm that the destination node exists
-        assert destination in self.get_headings(), 'Node ' + str(destination) + 'does not exist in method "reachable_from"' 
-        # Create a copy of this matrix, so that we can mess about with
-        # the graph without corrupting this one
-        new_graph = self.copy()
-        # Calculate the transitive closure
-        new_graph.closure(empty_cell = empty_cell)
-        # Accumulate the list of nodes that can reach the destination
-        reaches = []
-        for source in self.get_headings():
-            if source != destination:
-                if new_graph.get_cell(source, destination) != empty_cell:
-                    reaches += [source]
-        # Return the result      
-        return reaches   
+        assert destination in self.index, 'Node ' + str(destination) + 'does not exist in method "reachable_from"'
+        # Look up the nodes that can reach the destination in the
+        # (cached) transitive closure
+        return self.get_reachability(empty_cell).can_reach(destination)
 
 
     # Assuming this matrix is a digraph representing the physical topology of
     # a network, and given a list of "observer" nodes, return a matrix
     # representing the logical topology potentially visible by these
     # observers (assuming all nodes send messsages to all other nodes while
-    # the observers are watching).
+    # the observers are watching).  The result contains links from each
+    # node that can reach an observer to the observer, and from each
+    # observer to the nodes it can reach.  A link between a source and a
+    # destination on either side of an observer is only added if there is
+    # no other way to get from the source to the destination in the
+    # original graph, i.e., if the observer dominates the destination in
+    # the dominator tree rooted at the source [and there is no link
+    # between the source and destination in the graph under
+    # construction?]  <---- INCOMPLETE!!!!
+    # (If a matrix of the same size is given as "out", it is overwritten
+    # with the result instead of creating a new one; see rows_matrix.)
     #
     # THIS DRAFT VERSION IS LIMITED TO NUMERICAL INPUT MATRICES ONLY!
     #
-    def should_see(self, observers, empty_cell = 0):
+    def should_see(self, observers, empty_cell = 0, out = None):
         # Confirm that all the observers actually exist
         for observer in observers:
-            assert observer in self.get_headings(), 'Observer ' + str(observer) + ' nonexistent in "can_see"'
-        # Create a new matrix to hold the result
-        visible = Matrix(self.get_headings())
-        # Calculate who can send to each observer and add it to the result
-        for observer in observers:
-            sources = self.can_reach(observer)
-            # Create a matrix in which each source leads to the observer
-            sends_to_observer = Matrix(self.get_headings())
-            for source in sources:
-                sends_to_observer.set_cell(source, observer, 1)
-            # Add this matrix to the result
-            visible.add_matrix(sends_to_observer, max)
-        # Calculate who each observer can send to and add it to the result
-        for observer in observers:
-            destinations = self.reachable_from(observer)
-            # Create a matrix in which the observer sends to each source
-            observer_sends_to = Matrix(self.get_headings())
-            for destination in destinations:
-                observer_sends_to.set_cell(observer, destination, 1)
-            # Add this matrix to the result
-            visible.add_matrix(observer_sends_to, max)
-        # Calculate who can send to someone else via each observer and add it to the result
-        for observer in observers:
-            # Create the closure of the current physical topology
-            # excluding the observer
-            no_observer = self.copy()
-            for row in no_observer.get_headings():
-                for column in no_observer.get_headings():
-                    no_observer.set_cell(row, observer, empty_cell)
-                    no_observer.set_cell(observer, column, empty_cell)
-            no_observer.closure()
-            # Create a matrix to hold links that go via the observer
-            goes_via_observer = Matrix(self.get_headings())
-            # Add direct links between sources and destinations that
-            # could be routed via the observer
-            for source in self.can_reach(observer):
-                for destination in self.reachable_from(observer):
-                    # Exclude the observer itself as an endpoint
-                    if (source != observer) and (destination != observer):
-                        # Exclude nodes indirectly sending to themselves
-                        if source != destination:
-                            # Only add a link via the observer if there is
-                            # no other way to get from the source to the
-                            # destination in the original graph [and there
-                            # is no link between the source and destination in
-                            # the graph under construction?]  <---- INCOMPLETE!!!!
-                            if not (destination in no_observer.reachable_from(source)):
-##                                and \
-##                               (visible.get_cell(source, destination) == empty_cell and \
-##                                goes_via_observer.get_cell(source, destination) == empty_cell):
-                                goes_via_observer.set_cell(source, destination, 1)
-            # Add this matrix to the result
-            visible.add_matrix(goes_via_observer, max)
-        # Return the result
-        return visible
+            assert observer in self.index, 'Observer ' + str(observer) + ' nonexistent in "can_see"'
+        # Calculate the transitive closure of the physical topology once
+        reachability = self.get_reachability(empty_cell)
+        # Create a new matrix to hold the result, or overwrite the one given
+        rows = reachability.should_see_masks([self.index[observer] for observer in observers])
+        return self.rows_matrix(rows, out)
 
 
     # Assuming this matrix is a digraph representing the physical topology of
     # a network, and given a list of "observer" nodes, return a matrix
     # representing the logical topology that inevitably must be visible
     # to these observers.  This consists of all paths between sources and
-    # destinations that must go via an observer.  This produces the
-    # smallest possible logical topology.
+    # destinations that must go via an observer, whichever route is taken
+    # (including all flows to and from the observers themselves).  The
+    # observers are considered jointly, so a flow is included if every
+    # route crosses at least one of them, even if no single observer lies
+    # on every route.  This produces the smallest possible logical topology.
+    # (If a matrix of the same size is given as "out", it is overwritten
+    # with the result instead of creating a new one; see rows_matrix.)
     #
     # THIS FUNCTION IS LIMITED TO NUMERICAL INPUT MATRICES ONLY!
     #
-    def must_see(self, observers, empty_cell = 0):
+    def must_see(self, observers, empty_cell = 0, out = None):
         # Confirm that all the observers actually exist
         for observer in observers:
-            assert observer in self.get_headings(), 'Observer ' + str(observer) + ' nonexistent in "can_see"'
-        # Create a new matrix to hold the result
-        visible = Matrix(self.get_headings())
-        # Do the calculation
-        pass
-        # Return the result
-        return visible    
+            assert observer in self.index, 'Observer ' + str(observer) + ' nonexistent in "can_see"'
+        # Calculate the transitive closure of the physical topology once
+        reachability = self.get_reachability(empty_cell)
+        # Create a new matrix to hold the result, or overwrite the one given
+        rows = reachability.must_see_masks([self.index[observer] for observer in observers])
+        return self.rows_matrix(rows, out)
 
 
     # Assuming this matrix is a digraph representing the physical topology of
@@ -335,80 +690,148 @@ class Matrix:
     # representing the entire logical topology potentially visible by these
     # observers.  It assumed that if a message COULD be sent via an
     # observer then it will be, no matter how convoluted the path.  This
-    # will produce the largest possible logical topology.
+    # will produce the largest possible logical topology.  The result
+    # contains links from each node that can reach an observer to the
+    # observer, from each observer to the nodes it can reach, and between
+    # the nodes on either side of an observer (but nodes indirectly
+    # sending to themselves are excluded <- ASSUMPTION!).
+    # (If a matrix of the same size is given as "out", it is overwritten
+    # with the result instead of creating a new one; see rows_matrix.)
     #
     # THIS FUNCTION IS LIMITED TO NUMERICAL INPUT MATRICES ONLY!
     #
-    def may_see(self, observers, empty_cell = 0):
+    def may_see(self, observers, empty_cell = 0, out = None):
         # Confirm that all the observers actually exist
         for observer in observers:
-            assert observer in self.get_headings(), 'Observer ' + str(observer) + ' nonexistent in "can_see"'
-        # Create a new matrix to hold the result
-        visible = Matrix(self.get_headings())
-        # Calculate who can send to each observer and add it to the result
-        for observer in observers:
-            sources = self.can_reach(observer)
-            # Create a matrix in which each source leads to the observer
-            sends_to_observer = Matrix(self.get_headings())
-            for source in sources:
-                sends_to_observer.set_cell(source, observer, 1)
-            # Add this matrix to the result
-            visible.add_matrix(sends_to_observer, max)
-        # Calculate who each observer can send to and add it to the result
-        for observer in observers:
-            destinations = self.reachable_from(observer)
-            # Create a matrix in which the observer sends to each source
-            observer_sends_to = Matrix(self.get_headings())
-            for destination in destinations:
-                observer_sends_to.set_cell(observer, destination, 1)
-            # Add this matrix to the result
-            visible.add_matrix(observer_sends_to, max)
-        # Calculate who can send to someone else via each observer and add it to the result
-        for observer in observers:
-            # Create a matrix to hold links that go via the observer
-            goes_via_observer = Matrix(self.get_headings())
-            # Add direct links between sources and destinations that
-            # could be routed via the observer
-            for source in self.can_reach(observer):
-                for destination in self.reachable_from(observer):
-                    # Exclude the observer itself as an endpoint 
-                    if (source != observer) and (destination != observer):
-                        # Exclude nodes indirectly sending to themselves <- ASSUMPTION!
-                        if source != destination:
-                            goes_via_observer.set_cell(source, destination, 1)
-            # Add this matrix to the result
-            visible.add_matrix(goes_via_observer, max)
-        # Return the result
-        return visible
+            assert observer in self.index, 'Observer ' + str(observer) + ' nonexistent in "can_see"'
+        # Calculate the transitive closure of the physical topology once
+        reachability = self.get_reachability(empty_cell)
+        # Create a new matrix to hold the result, or overwrite the one given
+        rows = reachability.may_see_masks([self.index[observer] for observer in observers])
+        return self.rows_matrix(rows, out)
+
+
+    # Evaluate "may_see" for each of many sets of observers.  The physical
+    # topology's closure, and each observer's sources and destinations,
+    # are calculated just once for the whole batch.  By default the
+    # results are returned lazily, as a generator of 0/1 matrices (of type
+    # int8), one for each set; if "stacked" is True they are returned
+    # instead as a single boolean array indexed by set, row and column.
+    def may_see_many(self, observer_sets, empty_cell = 0, stacked = False):
+        # Confirm that all the observers actually exist
+        observer_sets = [list(observers) for observers in observer_sets]
+        for observers in observer_sets:
+            for observer in observers:
+                assert observer in self.index, 'Observer ' + str(observer) + ' nonexistent in "may_see_many"'
+        # Calculate the transitive closure of the physical topology once
+        reachability = self.get_reachability(empty_cell)
+        size = self.get_size()
+        results = (reachability.may_see_masks([self.index[observer] for observer in observers])
+                   for observers in observer_sets)
+        if stacked:
+            stack = numpy.zeros((len(observer_sets), size, size), dtype = bool)
+            for position, rows in enumerate(results):
+                stack[position] = masks_array(rows, size)
+            return stack
+        return (self.mask_matrix(rows) for rows in results)
+
+    # Create a 0/1 matrix, with the same headings as this one, from a list
+    # of row bitmasks, row by row.  Alternatively, an existing matrix of
+    # the same size can be given as "out" to be overwritten with the
+    # result (and given this matrix's headings), so a series of results
+    # can be produced without creating a new matrix for each.
+    def rows_matrix(self, rows, out = None):
+        size = self.get_size()
+        if out is None:
+            visible = Matrix(self.get_headings())
+            for row_index, row in enumerate(rows):
+                if row:
+                    visible.set_row(row_index, mask_row(row, size))
+            return visible
+        assert out.get_size() == size, 'Output matrix is the wrong size in "rows_matrix"'
+        if out.headings != self.headings:
+            out.set_headings(self.get_headings())
+        if out.dtype is not None:
+            # (Typed cells are overwritten in a single step)
+            out.reachability = None
+            out.own_contents()
+            out.contents[...] = masks_array(list(rows), size)
+        else:
+            for row_index, row in enumerate(rows):
+                out.set_row(row_index, mask_row(row, size))
+        return out
+
+    # Create a 0/1 matrix, with the same headings as this one, from a list
+    # of row bitmasks
+    def mask_matrix(self, rows):
+        result = Matrix(self.get_headings(), 0, 'int8')
+        if self.get_size() > 0:
+            result.contents[...] = masks_array(rows, self.get_size())
+        return result
         
     
+    # Getter - returns the numbers and contents of the cells in the
+    # numbered row that are not equal to the "empty" value
+    def get_populated(self, row_index, empty_cell = 0):
+        if self.dtype is None:
+            return [(column_index, cell) for column_index, cell in enumerate(self.contents[row_index])
+                    if cell != empty_cell]
+        row = self.contents[row_index]
+        columns = numpy.flatnonzero(row != empty_cell)
+        return list(zip(columns.tolist(), row[columns].tolist()))
+
+    # Write a printable representation of the matrix to a file object, a
+    # row at a time, with columns "column_width" characters wide (longer
+    # labels and contents are cut short, keeping their ends; if the width
+    # is None they are written in full).  "rows" and "columns" select a
+    # window of the matrix, as ranges (or lists) of row and column
+    # numbers.  If "sparse" is True only the cells not equal to
+    # "empty_cell" are written, one per line, after their row and column
+    # labels.
+    def write(self, output, rows = None, columns = None, column_width = COLUMN_WIDTH, sparse = False,
+              empty_cell = 0):
+        whole_row = columns is None
+        if rows is None:
+            rows = range(self.get_size())
+        if columns is None:
+            columns = range(self.get_size())
+        if sparse:
+            wanted = None if whole_row else set(columns)
+            for row_index in rows:
+                row_label = format_cell(self.headings[row_index], column_width)
+                for column_index, cell in self.get_populated(row_index, empty_cell):
+                    if wanted is None or column_index in wanted:
+                        output.write(row_label + '|' + format_cell(self.headings[column_index], column_width) +
+                                     '|' + format_cell(cell, column_width) + '|\n')
+            return
+        # Write the column headings
+        output.write(' ' * (column_width or 0) + '|' +
+                     ''.join([format_cell(self.headings[column_index], column_width) + '|'
+                              for column_index in columns]) + '\n')
+        # Write each row.  (Typed cells are formatted once for each distinct
+        # value, up to a limit, since large matrices usually hold few.)
+        formatted = {}
+        for row_index in rows:
+            row = self.get_row(row_index)
+            if not whole_row:
+                row = [row[column_index] for column_index in columns]
+            if self.dtype is None:
+                cells = [format_cell(cell, column_width) + '|' for cell in row]
+            else:
+                cells = []
+                for cell in row:
+                    text = formatted.get(cell)
+                    if text is None:
+                        text = format_cell(cell, column_width) + '|'
+                        if len(formatted) < FORMATTED_CELLS:
+                            formatted[cell] = text
+                    cells.append(text)
+            output.write(format_cell(self.headings[row_index], column_width) + '|' + ''.join(cells) + '\n')
+
     # Return a printable representation of the matrix, with fixed-width
-    # columns
+    # columns (see write)
     def __str__(self):
-        # Width of columns when matrix is printed (change for wider/narrower columns)
-        COLUMN_WIDTH = 12 
-        # Create the string representation of this matrix
-        to_print = '' 
-        # Create column heading
-        to_print += ' ' * COLUMN_WIDTH + '|'
-        for heading in self.headings:
-            # Format the column label to fit the column width
-            column_label = str(heading)
-            formatted_label = column_label[max(len(column_label) - COLUMN_WIDTH, 0):] 
-            to_print += formatted_label.rjust(COLUMN_WIDTH) + '|'
-        to_print += '\n'
-        # Create each row
-        for row in self.headings:
-            # Format the row label to fit the column width
-            row_label = str(row)
-            formatted_label = row_label[max(len(row_label) - COLUMN_WIDTH, 0):] 
-            to_print += formatted_label.rjust(COLUMN_WIDTH) + '|'
-            # Format each cell in the row to fit the column width
-            for column in self.headings:
-                cell_contents = str(self.get_cell(row, column))
-                formatted_cell = cell_contents[max(len(cell_contents) - COLUMN_WIDTH, 0):] 
-                to_print += formatted_cell.rjust(COLUMN_WIDTH) + '|'
-            to_print += '\n'            
-        # Return the string to display (dropping the last newline char)
-        return to_print[:-1]
-
+        output = io.StringIO()
+        self.write(output)
+        # (Dropping the last newline char)
+        return output.getvalue()[:-1]
@@ -0,0 +1,206 @@
+#
+# Matrix files - a compact binary format for saving matrices, such as
+# physical topologies and the results of observability analyses
+#
+# A file holds one or more matrices with the same headings and type of
+# cell, one after another as fixed-size "records", so they can be read
+# straight into (or mapped as) a NumPy array without any parsing.  The
+# file starts with:
+#
+#     MATRIX_MAGIC     8 bytes identifying the format
+#     header length    4 bytes (little-endian)
+#     header           JSON giving the headings, the type of the cells,
+#                      whether the matrices were "generic" (holding
+#                      Python numbers rather than a typed array) and
+#                      whether the cells are packed, padded with spaces
+#                      so the records start on a HEADER_ALIGNMENT boundary
+#
+# Each record holds one matrix's cells, row by row, either as an array of
+# the recorded type or, for 0/1 matrices, packed eight cells to a byte.
+# The number of records is worked out from the size of the file, so more
+# matrices can be appended to a file at any time without rewriting it,
+# and a record left incomplete by an interrupted append is ignored.
+#
+# Only non-empty matrices whose headings are strings or numbers, and
+# whose cells are numbers or booleans, can be saved.
+#
+
+import os
+import json
+import numpy
+from matrix import Matrix, index_headings
+
+# The first bytes of every matrix file
+MATRIX_MAGIC = b'MATRIX\x00\x01'
+
+# Records start at a multiple of this many bytes, so that mapped arrays
+# are aligned
+HEADER_ALIGNMENT = 64
+
+# Return a matrix's cells as a square NumPy array
+def matrix_cells(matrix):
+    size = matrix.get_size()
+    if matrix.dtype is not None and isinstance(matrix.contents, numpy.ndarray):
+        return matrix.contents
+    cells = numpy.asarray(matrix.get_contents())
+    assert cells.dtype.kind in 'biuf', 'Cells must be numbers to be saved in "matrix_cells"'
+    return cells.reshape(size, size)
+
+# Return True if an array of cells can be packed into bits, i.e., it is
+# boolean or holds only the integers 0 and 1
+def packable(cells):
+    if cells.dtype.kind == 'b':
+        return True
+    return cells.dtype.kind in 'iu' and bool(numpy.all((cells == 0) | (cells == 1)))
+
+# Return the number of bytes in each record of a file
+def record_bytes(header):
+    cells = len(header['headings']) ** 2
+    if header['packed']:
+        return (cells + 7) // 8
+    return cells * numpy.dtype(header['dtype']).itemsize
+
+# Return the bytes of a file's header, padded so the records are aligned
+def encode_header(header):
+    text = json.dumps(header).encode('utf-8')
+    padding = -(len(MATRIX_MAGIC) + 4 + len(text)) % HEADER_ALIGNMENT
+    text += b' ' * padding
+    return MATRIX_MAGIC + len(text).to_bytes(4, 'little') + text
+
+# Read a file's header, returning it and the offset of the first record
+def read_header(path):
+    with open(path, 'rb') as source:
+        magic = source.read(len(MATRIX_MAGIC))
+        assert magic == MATRIX_MAGIC, str(path) + ' is not a matrix file in "read_header"'
+        length = int.from_bytes(source.read(4), 'little')
+        header = json.loads(source.read(length).decode('utf-8'))
+    return header, len(MATRIX_MAGIC) + 4 + length
+
+# Return the number of complete records in a file
+def count_matrices(path):
+    header, offset = read_header(path)
+    return (os.path.getsize(path) - offset) // record_bytes(header)
+
+# Return the bytes of one record per matrix in a stack of square arrays
+def encode_records(cells, header):
+    if header['packed']:
+        flat = cells.reshape(len(cells), -1) != 0
+        return numpy.packbits(flat, axis = 1).tobytes()
+    return numpy.ascontiguousarray(cells, dtype = numpy.dtype(header['dtype'])).tobytes()
+
+# Append a stack of square arrays of cells (indexed by matrix, row and
+# column, such as that returned by Matrix.may_see_many) to a matrix file
+# as matrices with the given headings, creating the file if need be.  If
+# "packed" is None, new files are packed if the cells are all 0 or 1.
+# Matrices appended to an existing file must have the same headings and
+# type of cell as those already in it.
+def append_array(path, headings, cells, packed = None, generic = False):
+    cells = numpy.asarray(cells)
+    size = len(headings)
+    assert size > 0, 'Empty matrices cannot be saved in "append_array"'
+    assert cells.ndim == 3 and cells.shape[1:] == (size, size), 'Cells do not match the headings in "append_array"'
+    for heading in headings:
+        assert isinstance(heading, (str, int, float)), 'Heading ' + str(heading) + ' cannot be saved in "append_array"'
+    index_headings(headings)
+    if os.path.exists(path):
+        header, offset = read_header(path)
+        assert header['headings'] == list(headings), 'Headings differ from those in the file in "append_array"'
+        assert numpy.can_cast(cells.dtype, numpy.dtype(header['dtype']), 'same_kind'), \
+            'Cells of type ' + str(cells.dtype) + ' cannot be added to the file in "append_array"'
+        assert not header['packed'] or packable(cells), 'Cells are not all 0 or 1 in "append_array"'
+        count = count_matrices(path)
+        with open(path, 'r+b') as output:
+            # (Drop any incomplete record left by an interrupted append)
+            output.truncate(offset + count * record_bytes(header))
+            output.seek(0, os.SEEK_END)
+            output.write(encode_records(cells, header))
+        return
+    if packed is None:
+        packed = packable(cells)
+    assert not packed or packable(cells), 'Cells are not all 0 or 1 in "append_array"'
+    header = {'headings': list(headings), 'dtype': cells.dtype.str, 'generic': generic, 'packed': packed}
+    with open(path, 'wb') as output:
+        output.write(encode_header(header))
+        output.write(encode_records(cells, header))
+
+# Append matrices, all with the same headings, to a matrix file (see
+# append_array)
+def append_matrices(path, matrices, packed = None):
+    matrices = list(matrices)
+    if not matrices:
+        return
+    headings = matrices[0].get_headings()
+    for matrix in matrices:
+        assert matrix.get_headings() == headings, 'Matrices have different headings in "append_matrices"'
+    cells = numpy.stack([matrix_cells(matrix) for matrix in matrices])
+    append_array(path, headings, cells, packed, matrices[0].dtype is None)
+
+# Save a matrix to a new matrix file, replacing any existing file
+def save_matrix(matrix, path, packed = None):
+    if os.path.exists(path):
+        os.remove(path)
+    append_matrices(path, [matrix], packed)
+
+# Return the headings of the matrices in a file and their cells, as an
+# array indexed by matrix, row and column.  If "mmap" is True, unpacked
+# files are mapped into memory rather than read, so opening them takes
+# no time however large they are, and only the cells actually used are
+# read from the disk.  (The array is "copy on write": changing it does
+# not change the file.)
+def load_array(path, mmap = True):
+    header, offset = read_header(path)
+    headings = header['headings']
+    size = len(headings)
+    count = count_matrices(path)
+    dtype = numpy.dtype(header['dtype'])
+    if count == 0:
+        return headings, numpy.zeros((count, size, size), dtype = dtype)
+    if header['packed']:
+        shape = (count, record_bytes(header))
+        if mmap:
+            packed = numpy.memmap(path, numpy.uint8, 'r', offset, shape)
+        else:
+            packed = numpy.fromfile(path, numpy.uint8, shape[0] * shape[1], offset = offset).reshape(shape)
+        cells = numpy.unpackbits(packed, axis = 1, count = size * size)
+        return headings, cells.reshape(count, size, size).astype(dtype)
+    if mmap:
+        return headings, numpy.memmap(path, dtype, 'c', offset, (count, size, size))
+    return headings, numpy.fromfile(path, dtype, count * size * size, offset = offset).reshape(count, size, size)
+
+# Create a Matrix with the given headings holding a square array of cells
+# (converted to Python lists if "generic" is True)
+def array_matrix(headings, cells, generic = False):
+    matrix = Matrix([])
+    matrix.headings = list(headings)
+    matrix.index = index_headings(matrix.headings)
+    if generic:
+        matrix.dtype = None
+        matrix.contents = cells.tolist()
+    else:
+        matrix.dtype = cells.dtype
+        matrix.contents = cells
+    return matrix
+
+# Generate the matrices in a matrix file, in order (see load_array)
+def load_matrices(path, mmap = True):
+    header, offset = read_header(path)
+    headings, cells = load_array(path, mmap)
+    for record in cells:
+        yield array_matrix(headings, record, header['generic'])
+
+# Return the numbered matrix in a matrix file (by default the first)
+def load_matrix(path, record = 0, mmap = True):
+    header, offset = read_header(path)
+    count = count_matrices(path)
+    assert 0 <= record < count, 'Record ' + str(record) + ' nonexistent in "load_matrix"'
+    size = len(header['headings'])
+    dtype = numpy.dtype(header['dtype'])
+    start = offset + record * record_bytes(header)
+    if header['packed']:
+        packed = numpy.fromfile(path, numpy.uint8, record_bytes(header), offset = start)
+        cells = numpy.unpackbits(packed, count = size * size).reshape(size, size).astype(dtype)
+    elif mmap:
+        cells = numpy.memmap(path, dtype, 'c', start, (size, size))
+    else:
+        cells = numpy.fromfile(path, dtype, size * size, offset = start).reshape(size, size)
+    return array_matrix(header['headings'], cells, header['generic'])
@@ -0,0 +1,84 @@
+# Tests of the binary matrix files
+
+import os
+import shutil
+import tempfile
+from matrix import Matrix
+from sparse_matrix import SparseMatrix
+from matrix_files import load_matrix, load_matrices, load_array, append_matrices, append_array, count_matrices
+
+directory = tempfile.mkdtemp()
+headers = ['A', 'B', 'C', 'D']
+topology = Matrix(headers)
+topology.fill([0, 0, 1, 0,
+               0, 0, 1, 0,
+               1, 1, 0, 1,
+               0, 0, 1, 0])
+
+print('A generic 0/1 topology, saved packed and loaded back:')
+path = os.path.join(directory, 'topology.matrix')
+topology.save(path)
+print(os.path.getsize(path))
+loaded = load_matrix(path)
+print(loaded)
+print(loaded.get_dtype(), loaded.get_contents() == topology.get_contents())
+print('')
+
+print('A typed matrix of bandwidths, mapped into memory:')
+bandwidths = Matrix(headers, 0, 'float32')
+bandwidths.set_cell('A', 'C', 2.5)
+bandwidths.set_cell('C', 'D', 100)
+path = os.path.join(directory, 'bandwidths.matrix')
+bandwidths.save(path)
+loaded = load_matrix(path)
+print(loaded.get_dtype(), loaded.get_cell('A', 'C'), loaded.get_cell('C', 'D'))
+# (Changes to a mapped matrix do not change the file)
+loaded.set_cell('A', 'C', 5)
+print(loaded.get_cell('A', 'C'), load_matrix(path).get_cell('A', 'C'))
+print('')
+
+print('Batches of results appended to one file:')
+path = os.path.join(directory, 'results.matrix')
+append_matrices(path, [topology.may_see(['A'])])
+append_matrices(path, [topology.must_see(['A', 'B']), topology.should_see(['A', 'C'])])
+append_array(path, headers, topology.may_see_many([['B'], ['C']], stacked = True))
+print(count_matrices(path))
+print(load_matrix(path, 1))
+print([matrix.get_contents() == topology.must_see(['A', 'B']).get_contents()
+       for matrix in load_matrices(path)])
+headings, cells = load_array(path, mmap = False)
+print(headings, cells.shape, cells.dtype)
+print(Matrix.load(path, 1).get_contents() == load_matrix(path, 1).get_contents())
+print(SparseMatrix.load(path, 1).get_link_count())
+print('')
+
+print('An interrupted append leaves the earlier results readable:')
+with open(path, 'ab') as output:
+    output.write(b'\x01')
+print(count_matrices(path))
+append_matrices(path, [topology.may_see(['D'])])
+print(count_matrices(path), load_matrix(path, 5).get_contents() == topology.may_see(['D']).get_contents())
+print('')
+shutil.rmtree(directory)
+
+# Correct answer:
+#     130
+#                 |           A|           B|           C|           D|
+#                A|           0|           0|           1|           0|
+#                B|           0|           0|           1|           0|
+#                C|           1|           1|           0|           1|
+#                D|           0|           0|           1|           0|
+#     None True
+#
+#     float32 2.5 100.0
+#     5.0 2.5
+#
+#     5
+#     (What A and B must see)
+#     [False, True, False, False, False]
+#     ['A', 'B', 'C', 'D'] (5, 4, 4) int64
+#     True
+#     10
+#
+#     5
+#     6 True
@@ -3,31 +3,32 @@
 from matrix import Matrix
 from operator import mul, add
 from mergers import *
+from semirings import *
 
-print 'Filling ----------------------------------------------------------------'
+print('Filling ----------------------------------------------------------------')
 
 fred = Matrix(['Alpha', 'Beta', 'Gamma'], 'Omega')
-print
-print fred
+print()
+print(fred)
 
 fred.set_cell('Beta', 'Alpha', 'Zeta')
-print
-print fred
+print()
+print(fred)
 
 fred.fill([1, 2, 3, 4, 5, 6, 7, 8, 9])
-print
-print fred
-print
+print()
+print(fred)
+print()
 
-print 'Extracting -------------------------------------------------------------'
+print('Extracting -------------------------------------------------------------')
 
-print
-print fred.get_headings()
-print
-print fred.get_contents()
-print
+print()
+print(fred.get_headings())
+print()
+print(fred.get_contents())
+print()
 
-print 'Assigning versus copying -----------------------------------------------'
+print('Assigning versus copying -----------------------------------------------')
 
 original_matrix = Matrix(['a', 'b', 'c'], 'O')
 an_alias = original_matrix
@@ -35,62 +36,62 @@ a_copy = original_matrix.copy()
 
 original_matrix.set_cell('b', 'b', 'X') # change the original
 
-print
-print an_alias # the alias should also be changed
-print
-print a_copy # but the copy is unaffected
-print
+print()
+print(an_alias) # the alias should also be changed
+print()
+print(a_copy) # but the copy is unaffected
+print()
 
-print 'Addition of numerical matrices -----------------------------------------'
+print('Addition of numerical matrices -----------------------------------------')
 
 numbers_a = Matrix(['a', 'b', 'c', 'd'], 2)
 numbers_b = Matrix(['A', 'B', 'C', 'D'])
 numbers_a.set_cell('b', 'c', 200)
 numbers_b.fill(range(16))
-print
-print numbers_a
-print
-print numbers_b
+print()
+print(numbers_a)
+print()
+print(numbers_b)
 numbers_a.add_matrix(numbers_b)
-print
-print numbers_a
-print
+print()
+print(numbers_a)
+print()
 
-print 'Addition of string matrices --------------------------------------------'
+print('Addition of string matrices --------------------------------------------')
 
 strings_a = Matrix(['a', 'b', 'c', 'd'])
 strings_a.fill(list('Sixteen letters!'))
 strings_b = Matrix(['A', 'B', 'C', 'D'], 'o')
 strings_a.set_cell('b', 'd', 'AAA')
-print
-print strings_a
-print
-print strings_b
+print()
+print(strings_a)
+print()
+print(strings_b)
 strings_a.add_matrix(strings_b, protocol_union)
-print
-print strings_a
-print
+print()
+print(strings_a)
+print()
 
-print 'Multiplication ---------------------------------------------------------'
+print('Multiplication ---------------------------------------------------------')
 
 multiplicand = Matrix(['One', 'Two', 'Three'])
 multiplicand.fill([1, -3, -1,
                    0,  3,  2,
                    4, -4,  5])
-print
-print multiplicand
+print()
+print(multiplicand)
 
 multiplier = Matrix(['A', 'B', 'C'])
 multiplier.fill([-2,  1,  6,
                  -1,  0,  3,
                   2, -3,  4])
-print
-print multiplier
+print()
+print(multiplier)
 
 multiplicand.multiply_matrices(multiplier)
-print
-print multiplicand
-print
+print()
+print(multiplicand)
+print()
 
 ## Correct answer:
 ##     |  One|  Two|Three|
@@ -100,52 +101,69 @@ print
 
 # http://www.bluebit.gr/matrix-calculator/multiply.aspx
 
-print 'Joining disjoint matrices ----------------------------------------------'
+print('Joining disjoint matrices ----------------------------------------------')
 
 numbers = Matrix(['One', 'Two', 'Three'])
 numbers.fill(range(9, 0, -1))
-print
-print numbers
-print
+print()
+print(numbers)
+print()
 
 letters = Matrix(['AAA', 'BBB', 'CCC'])
 letters.fill(['a', 'b', 'c',
               'd', 'e', 'f',
               'g', 'h', 'i'])
-print letters
-print
+print(letters)
+print()
 
 numbers.join_disjoint_matrices(letters, '.')
-print numbers
-print
+print(numbers)
+print()
 
-print 'Joining overlapping matrices -------------------------------------------'
+print('Joining overlapping matrices -------------------------------------------')
 
 matrix_one = Matrix(['AA', 'BB', 'CC', 'DD'])
 matrix_one.fill(list('abcdefghijklmnop'))
-print
-print matrix_one
-print
+print()
+print(matrix_one)
+print()
 
 matrix_two = Matrix(['CC', 'DD', 'EE', 'FF'])
 matrix_two.fill(list('ZYXWVUTSRQPONMLK'))
-print matrix_two
-print
+print(matrix_two)
+print()
 
 matrix_one.join_matrices(matrix_two, default = '.')
-print matrix_one
-print
+print(matrix_one)
+print()
 
 matrix_three = Matrix(['FF', 'GG', 'HH'])
 matrix_three.fill(list('123456789'))
-print matrix_three
-print
+print(matrix_three)
+print()
 
 matrix_one.join_matrices(matrix_three, default = '.')
-print matrix_one
-print
+print(matrix_one)
+print()
 
-print 'Closure with numbers ---------------------------------------------------'
+print('Joining many matrices at once -------------------------------------------')
+
+# Example: the same joins in a single step (the result should be the
+# same as above)
+
+many = Matrix(['AA', 'BB', 'CC', 'DD'])
+many.fill(list('abcdefghijklmnop'))
+many.join_many([matrix_two, matrix_three], default = '.')
+print()
+print(many)
+print()
+print('Same as joining in turn:', many.get_contents() == matrix_one.get_contents())
+print()
+
+# Correct answer:
+#     Same as joining in turn: True
+
+print('Closure with numbers ---------------------------------------------------')
 
 a_graph = Matrix(['Node A', 'Node B', 'Node C', 'Node D'])
 a_graph.fill([0, 1, 0, 0,
@@ -153,14 +171,14 @@ a_graph.fill([0, 1, 0, 0,
               0, 0, 0, 0,
               1, 0, 1, 0])
 
-print
-print a_graph
+print()
+print(a_graph)
 
 a_graph.closure()
 
-print
-print a_graph
-print
+print()
+print(a_graph)
+print()
 
 # Correct answer:
 #     1, 1, 1, 1,
@@ -168,7 +186,7 @@ print
 #     0, 0, 0, 0,
 #     1, 1, 1, 1
 
-print 'Closure with strings ---------------------------------------------------'
+print('Closure with strings ---------------------------------------------------')
 
 #   A -w-> B
 #    ^     |
@@ -184,18 +202,18 @@ a_graph.fill(['',  'w',  '',  '',
               '',   '',  '',  '',
               'y',  '', 'z',  ''])
 
-print
-print a_graph
+print()
+print(a_graph)
 
 a_graph.closure(add_alt_path = path_union,
                 join_hops = conjoin_paths,
                 empty_cell = '')
 
-print
-print a_graph
-print
+print()
+print(a_graph)
+print()
 
-print 'A more complex closure with strings ------------------------------------'
+print('A more complex closure with strings ------------------------------------')
 
 #   A  -w-> B
 #    ^ \    |
@@ -212,19 +230,19 @@ a_graph.fill(['',  'w',  '', 'u',
               '',   '',  '',  '',
               'y',  '', 'z',  ''])
 
-print
-print a_graph
+print()
+print(a_graph)
 
 a_graph.closure(add_alt_path = path_union,
                 join_hops = conjoin_paths,
                 empty_cell = '')
 
-print
-print a_graph
-print
+print()
+print(a_graph)
+print()
 
 
-print 'A simpler closure with strings -----------------------------------------'
+print('A simpler closure with strings -----------------------------------------')
 
 a_graph = Matrix(['Node A', 'Node B', 'Node C', 'Node D'])
 a_graph.fill(['',  'w',  '', 'u',
@@ -232,18 +250,18 @@ a_graph.fill(['',  'w',  '', 'u',
               '',   '',  '',  '',
               'y',  '', 'z',  ''])
 
-print
-print a_graph
+print()
+print(a_graph)
 
 a_graph.closure(add_alt_path = path_union,
                 join_hops = conjoin_paths,
                 empty_cell = '')
 
-print
-print a_graph
-print
+print()
+print(a_graph)
+print()
 
-print 'Reachability with numbers ----------------------------------------------'
+print('Reachability with numbers ----------------------------------------------')
 
 # Example: A->B, B->D, D->C and C->B
 
@@ -254,20 +272,20 @@ a_graph.fill([0, 1, 0, 0,
               0, 1, 0, 0,
               0, 0, 1, 0])
 
-print
-print 'Reachable from A:', a_graph.reachable_from('Node A')
-print 'Reachable from B:', a_graph.reachable_from('Node B')
-print 'Reachable from C:', a_graph.reachable_from('Node C')
-print 'Reachable from D:', a_graph.reachable_from('Node D')
+print()
+print('Reachable from A:', a_graph.reachable_from('Node A'))
+print('Reachable from B:', a_graph.reachable_from('Node B'))
+print('Reachable from C:', a_graph.reachable_from('Node C'))
+print('Reachable from D:', a_graph.reachable_from('Node D'))
 
-print
-print 'Can reach A:', a_graph.can_reach('Node A')
-print 'Can reach B:', a_graph.can_reach('Node B')
-print 'Can reach C:', a_graph.can_reach('Node C')
-print 'Can reach D:', a_graph.can_reach('Node D')
-print
+print()
+print('Can reach A:', a_graph.can_reach('Node A'))
+print('Can reach B:', a_graph.can_reach('Node B'))
+print('Can reach C:', a_graph.can_reach('Node C'))
+print('Can reach D:', a_graph.can_reach('Node D'))
+print()
 
-print 'Reachability with strings ----------------------------------------------'
+print('Reachability with strings ----------------------------------------------')
 
 # Example: K->J, K->M, L->N, M->N, M->L
 
@@ -279,16 +297,314 @@ a_graph.set_cell('L', 'N', 'X')
 a_graph.set_cell('M', 'N', 'X')
 a_graph.set_cell('M', 'L', 'X')
 
-print
-print 'Reachable from K:', a_graph.reachable_from('K', 'O')
-print 'Reachable from J:', a_graph.reachable_from('J', 'O')
-print 'Reachable from L:', a_graph.reachable_from('L', 'O')
-print 'Reachable from M:', a_graph.reachable_from('M', 'O')
-print 'Reachable from N:', a_graph.reachable_from('N', 'O')
-
-print
-print 'Can reach K:', a_graph.can_reach('K', 'O')
-print 'Can reach J:', a_graph.can_reach('J', 'O')
-print 'Can reach L:', a_graph.can_reach('L', 'O')
-print 'Can reach M:', a_graph.can_reach('M', 'O')
-print 'Can reach N:', a_graph.can_reach('N', 'O')
+print()
+print('Reachable from K:', a_graph.reachable_from('K', 'O'))
+print('Reachable from J:', a_graph.reachable_from('J', 'O'))
+print('Reachable from L:', a_graph.reachable_from('L', 'O'))
+print('Reachable from M:', a_graph.reachable_from('M', 'O'))
+print('Reachable from N:', a_graph.reachable_from('N', 'O'))
+
+print()
+print('Can reach K:', a_graph.can_reach('K', 'O'))
+print('Can reach J:', a_graph.can_reach('J', 'O'))
+print('Can reach L:', a_graph.can_reach('L', 'O'))
+print('Can reach M:', a_graph.can_reach('M', 'O'))
+print('Can reach N:', a_graph.can_reach('N', 'O'))
+
+print('Typed storage ----------------------------------------------------------')
+
+typed_a = Matrix(['a', 'b', 'c'], 0, 'int32')
+typed_a.fill(range(9))
+typed_b = Matrix(['A', 'B', 'C'], 4, 'int32')
+print()
+print(typed_a)
+typed_a.add_matrix(typed_b, max)
+print()
+print(typed_a)
+typed_copy = typed_a.copy()
+typed_copy.add_matrix(typed_b)
+print()
+print(typed_copy)
+print()
+print(typed_a.get_contents())
+print()
+
+# Correct answer:
+#     [4, 4, 4, 4, 4, 5, 6, 7, 8]
+
+print('Accessing rows, columns and blocks by number ---------------------------')
+
+grid = Matrix(['a', 'b', 'c'])
+grid.fill(range(9))
+print()
+print(grid.get_row(1))
+print(grid.get_column(2))
+grid.set_row(0, ['x', 'y', 'z'])
+grid.set_block(1, 1, [['P', 'Q'],
+                      ['R', 'S']])
+print()
+print(grid)
+grid.set_headings(['A', 'B', 'C'])
+print()
+print(grid.get_index('C'), grid.get_cell('C', 'B'))
+print()
+
+# Correct answer:
+#     [3, 4, 5]
+#     [2, 5, 8]
+#     2 R
+
+print('Reachability index -----------------------------------------------------')
+
+# Example: A->B, B->D, D->C and C->B
+
+a_graph = Matrix(['Node A', 'Node B', 'Node C', 'Node D'])
+a_graph.fill([0, 1, 0, 0,
+              0, 0, 0, 1,
+              0, 1, 0, 0,
+              0, 0, 1, 0])
+
+index = a_graph.get_reachability()
+print()
+print('Reachable from A:', index.reachable_from('Node A'))
+print('Can reach A:', index.can_reach('Node A'))
+print('B reaches C:', index.reaches('Node B', 'Node C'))
+print('Strongly connected components:', index.components)
+print('Index reused:', a_graph.get_reachability() is index)
+a_graph.set_cell('Node C', 'Node A', 1)
+print('Index reused after change:', a_graph.get_reachability() is index)
+print('Can reach A:', a_graph.can_reach('Node A'))
+print()
+
+# Correct answer:
+#     Reachable from A: ['Node B', 'Node C', 'Node D']
+#     Can reach A: []
+#     B reaches C: True
+#     Strongly connected components: [[2, 3, 1], [0]]
+#     Index reused: True
+#     Index reused after change: False
+#     Can reach A: ['Node B', 'Node C', 'Node D']
+
+print('Incremental reachability -----------------------------------------------')
+
+# Example: the same digraph, with links then added and removed one at
+# a time while the index is maintained
+
+a_graph.set_cell('Node C', 'Node A', 0)
+a_graph.maintain_reachability()
+index = a_graph.get_reachability()
+print()
+a_graph.set_cell('Node C', 'Node A', 1)
+print('Can reach A after adding C->A:', a_graph.can_reach('Node A'))
+a_graph.set_cell('Node D', 'Node C', 0)
+print('Reachable from A after removing D->C:', a_graph.reachable_from('Node A'))
+print('Can reach A after removing D->C:', a_graph.can_reach('Node A'))
+print('Index maintained:', a_graph.get_reachability() is index)
+a_graph.maintain_reachability(False)
+print()
+
+# Correct answer:
+#     Can reach A after adding C->A: ['Node B', 'Node C', 'Node D']
+#     Reachable from A after removing D->C: ['Node B', 'Node D']
+#     Can reach A after removing D->C: ['Node C']
+#     Index maintained: True
+
+print('Closure with semirings -------------------------------------------------')
+
+# Example: A->B, B->D, D->A and D->C, with the bandwidth of each link
+
+bandwidths = Matrix(['Node A', 'Node B', 'Node C', 'Node D'], 0, 'int32')
+bandwidths.fill([0, 10,  0,  0,
+                 0,  0,  0,  2,
+                 0,  0,  0,  0,
+                 5,  0,  8,  0])
+
+hops = Matrix(bandwidths.get_headings(), float('inf'), 'float64')
+for row in hops.get_headings():
+    for column in hops.get_headings():
+        if bandwidths.get_cell(row, column):
+            hops.set_cell(row, column, 1)
+hops.closure(semiring = MIN_PLUS)
+print()
+print(hops)
+
+bandwidths.closure(semiring = MAX_MIN)
+print()
+print(bandwidths)
+print()
+
+# Correct answer:
+#     3.0, 1.0, 3.0, 2.0,
+#     2.0, 3.0, 2.0, 1.0,
+#     inf, inf, inf, inf,
+#     1.0, 2.0, 1.0, 3.0
+#
+#     2, 10, 2, 2,
+#     2,  2, 2, 2,
+#     0,  0, 0, 0,
+#     5,  5, 8, 2
+
+# Example: integer cells cannot hold MIN_PLUS's infinite zero, so hop
+# counts must be held in a float matrix
+
+try:
+    Matrix(bandwidths.get_headings(), 0, 'int32').closure(semiring = MIN_PLUS)
+except AssertionError as error:
+    print(error)
+print()
+
+# Correct answer:
+#     Semiring zero inf cannot be held in int32 cells in "closure"
+
+print('Closure by repeated squaring -------------------------------------------')
+
+# Example: the hop counts again, found by squaring the matrix
+
+inf = float('inf')
+links = Matrix(hops.get_headings(), inf, 'float64')
+links.fill([inf,   1, inf, inf,
+            inf, inf, inf,   1,
+            inf, inf, inf, inf,
+              1, inf,   1, inf])
+two_hops = links.copy()
+two_hops.multiply_matrices(links, semiring = MIN_PLUS)
+print()
+print('Two hops from A to D:', two_hops.get_cell('Node A', 'Node D'))
+links.closure(semiring = MIN_PLUS, method = 'squaring')
+print('Same as Warshall:', links.get_contents() == hops.get_contents())
+print()
+
+# Correct answer:
+#     Two hops from A to D: 2.0
+#     Same as Warshall: True
+
+print('Tiled multiplication with a zero value ---------------------------------')
+
+# Example: a product large enough to be calculated in several tiles,
+# whose zero value is counted once in each cell's sum
+
+size = 80
+chain = Matrix(list(range(size)), 0, 'int32')
+generic_chain = Matrix(list(range(size)))
+for node in range(size - 1):
+    chain.set_cell(node, node + 1, 1)
+    generic_chain.set_cell(node, node + 1, 1)
+chain.multiply_matrices(chain.copy(), add, mul, 5)
+generic_chain.multiply_matrices(generic_chain.copy(), add, mul, 5)
+print()
+print(chain.get_cell(0, 2), chain.get_cell(0, 1), chain.get_contents() == generic_chain.get_contents())
+print()
+
+# Correct answer:
+#     6 5 True
+
+print('Closure with protocol bitmasks -----------------------------------------')
+
+# Example: the more complex closure with strings, with each protocol
+# encoded as a bit
+
+a_graph = Matrix(['Node A', 'Node B', 'Node C', 'Node D'])
+a_graph.fill(['',  'w',  '', 'u',
+              '',   '',  '', 'x',
+              '',   '',  '',  '',
+              'y',  '', 'z',  ''])
+
+registry = ProtocolRegistry()
+encoded = registry.encode_matrix(a_graph)
+print()
+print('Paths from A to D:', sorted(encoded.get_cell('Node A', 'Node D')))
+encoded.closure(semiring = PROTOCOL_PATH_MASKS)
+print('Paths from A to D:', registry.decode_paths(encoded.get_cell('Node A', 'Node D')))
+print('Paths from D to B:', registry.decode_paths(encoded.get_cell('Node D', 'Node B')))
+print()
+print(registry.decode_matrix(encoded))
+print()
+
+# Correct answer:
+#     Paths from A to D: [2]
+#     Paths from A to D: u&u,w,x,y&u,y&w,x&w,x,y
+#     Paths from D to B: u,w,y&w,x,y&w,y
+
+print('Closure with compact path sets -----------------------------------------')
+
+# Example: the same closure, keeping only the minimal protocol sets,
+# and then with at most two paths in each cell
+
+for semiring in [compact_protocol_paths(), compact_protocol_paths(False, 2)]:
+    encoded = registry.encode_matrix(a_graph)
+    encoded.closure(semiring = semiring)
+    print()
+    print('Paths from A to D:', registry.decode_paths(encoded.get_cell('Node A', 'Node D')))
+    print('Paths from D to B:', registry.decode_paths(encoded.get_cell('Node D', 'Node B')))
+print()
+
+# Correct answer:
+#     Paths from A to D: u&w,x
+#     Paths from D to B: w,y
+#
+#     Paths from A to D: u&u,w,x,y
+#     Paths from D to B: u,w,x,y&w,y
+
+print('Writing windows and sparse output -------------------------------------')
+
+# Example: part of a matrix with narrow columns, then only its
+# populated cells, written straight to the output
+
+import sys
+
+a_graph = Matrix(['Node A', 'Node B', 'Node C', 'Node D'])
+a_graph.fill([0, 1, 0, 1,
+              0, 0, 0, 1,
+              0, 0, 0, 0,
+              1, 0, 1, 0])
+print()
+a_graph.write(sys.stdout, range(2, 4), [0, 2], 6)
+print()
+a_graph.write(sys.stdout, sparse = True, column_width = None)
+print()
+
+# Correct answer:
+#           |Node A|Node C|
+#     Node C|     0|     0|
+#     Node D|     1|     1|
+#
+#     Node A|Node B|1|
+#     Node A|Node D|1|
+#     Node B|Node D|1|
+#     Node D|Node A|1|
+#     Node D|Node C|1|
+
+print('Copy-on-write copies and reused results --------------------------------')
+
+# Example: a copy shares the original's cells until one of them is
+# changed, and an observer analysis can overwrite an existing matrix
+
+a_graph = Matrix(['Node A', 'Node B', 'Node C', 'Node D'])
+a_graph.fill([0, 1, 0, 0,
+              0, 0, 0, 1,
+              0, 0, 0, 0,
+              1, 0, 1, 0])
+snapshot = a_graph.copy()
+print()
+print('Shared before changing:', snapshot.contents is a_graph.contents)
+a_graph.set_cell('Node C', 'Node A', 1)
+print('Shared after changing:', snapshot.contents is a_graph.contents)
+print('Snapshot unchanged:', snapshot.get_cell('Node C', 'Node A'))
+snapshot.closure()
+print('Original unclosed:', a_graph.get_cell('Node A', 'Node C'))
+print()
+
+visible = Matrix(['Node A', 'Node B', 'Node C', 'Node D'], 0, 'int8')
+for observer in ['Node A', 'Node C']:
+    result = a_graph.may_see([observer], out = visible)
+    print('What', observer, 'may see:', result is visible, visible.get_contents() == a_graph.may_see([observer]).get_contents())
+print()
+
+# Correct answer:
+#     Shared before changing: True
+#     Shared after changing: False
+#     Snapshot unchanged: 0
+#     Original unclosed: 0
+#
+#     What Node A may see: True True
+#     What Node C may see: True True
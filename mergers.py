@@ -59,3 +59,170 @@ def conjoin_paths(paths1, paths2, protocol_separator = ',', path_separator = '&'
     joined_paths = list(set(joined_paths))
     # Rejoin to form the new set of paths
     return path_separator.join(joined_paths)   
+
+#
+# Bitmask encoding of protocols
+#
+# Splitting, sorting and rejoining strings on every merge is slow, so
+# the functions below work on an encoded form instead.  A
+# ProtocolRegistry gives each protocol name its own bit, a path is then
+# the integer bitmask of its protocols and a set of paths is a
+# frozenset of such bitmasks, so merging is done with bitwise
+# operations.  The registry converts to and from the string form for
+# display.
+#
+
+# Constants
+EMPTY_PATH_MASKS = frozenset()
+
+# Merge two paths given as protocol bitmasks
+def protocol_mask_union(protocols1, protocols2):
+    return protocols1 | protocols2
+
+# Merge two sets of paths given as frozensets of protocol bitmasks
+def path_mask_union(paths1, paths2):
+    return paths1 | paths2
+
+# Given two sets of paths, as frozensets of protocol bitmasks, join them
+# end-to-end in all combinations
+def conjoin_path_masks(paths1, paths2):
+    return frozenset([path1 | path2 for path1 in paths1 for path2 in paths2])
+
+class ProtocolRegistry:
+
+    # Constructor - optionally registers an initial list of protocol names
+    def __init__(self, protocols = []):
+        # The bit given to each protocol name, and the names in bit order
+        self.bits = {}
+        self.protocols = []
+        for protocol in protocols:
+            self.intern(protocol)
+
+    # Return the bit for a protocol name, giving it the next free bit if
+    # it has not been seen before
+    def intern(self, protocol):
+        if not protocol in self.bits:
+            self.bits[protocol] = 1 << len(self.protocols)
+            self.protocols.append(protocol)
+        return self.bits[protocol]
+
+    # Convert a path string, e.g., "a,b", to a protocol bitmask
+    def encode_path(self, path, protocol_separator = ','):
+        mask = 0
+        for protocol in path.split(protocol_separator):
+            if protocol:
+                mask |= self.intern(protocol)
+        return mask
+
+    # Convert a protocol bitmask to a path string, with the protocols sorted
+    def decode_path(self, mask, protocol_separator = ','):
+        protocols = [protocol for position, protocol in enumerate(self.protocols) if mask >> position & 1]
+        protocols.sort()
+        return protocol_separator.join(protocols)
+
+    # Convert a string of paths, e.g., "a,b&c", to a frozenset of protocol
+    # bitmasks (EMPTY_PATHS gives the empty set)
+    def encode_paths(self, paths, protocol_separator = ',', path_separator = '&'):
+        if paths == EMPTY_PATHS:
+            return EMPTY_PATH_MASKS
+        return frozenset([self.encode_path(path, protocol_separator) for path in paths.split(path_separator)])
+
+    # Convert a frozenset of protocol bitmasks to a string of paths, with
+    # the paths sorted
+    def decode_paths(self, paths, protocol_separator = ',', path_separator = '&'):
+        decoded = [self.decode_path(path, protocol_separator) for path in paths]
+        decoded.sort()
+        return path_separator.join(decoded)
+
+    # Return a new matrix of the same kind with every cell of a matrix of
+    # path strings encoded (empty cells become EMPTY_PATH_MASKS)
+    def encode_matrix(self, matrix, protocol_separator = ',', path_separator = '&'):
+        encoded = matrix.__class__(matrix.get_headings(), EMPTY_PATH_MASKS)
+        for index in range(matrix.get_size()):
+            encoded.set_row(index, [self.encode_paths(cell, protocol_separator, path_separator)
+                                    for cell in matrix.get_row(index)])
+        return encoded
+
+    # Return a new matrix of the same kind with every cell of a matrix of
+    # encoded paths decoded back to strings
+    def decode_matrix(self, matrix, protocol_separator = ',', path_separator = '&'):
+        decoded = matrix.__class__(matrix.get_headings(), EMPTY_PATHS)
+        for index in range(matrix.get_size()):
+            decoded.set_row(index, [self.decode_paths(cell, protocol_separator, path_separator)
+                                    for cell in matrix.get_row(index)])
+        return decoded
+
+#
+# Compact sets of paths
+#
+# On meshy topologies the number of paths between two nodes grows
+# combinatorially, and so do the cells of a closure.  A PathSets object
+# keeps encoded path sets (frozensets of protocol bitmasks) compact in
+# three ways: identical sets are stored once and shared between cells
+# (and the results of joining them are remembered); optionally, any path
+# whose protocols include all those of another path is dropped, leaving
+# only the minimal protocol sets; and optionally, a set that grows beyond
+# a maximum number of paths has its longest paths merged into a single
+# path holding all their protocols, which over-states the protocols
+# those paths need but never loses a connection.
+#
+
+class PathSets:
+
+    # Constructor - "prune" drops paths whose protocols are a superset
+    # of another path's, and "max_paths" (if given) caps the size of
+    # each set
+    def __init__(self, prune = True, max_paths = None, cache_limit = 100000):
+        assert max_paths is None or max_paths >= 1, "At least one path must be allowed in 'PathSets'"
+        self.prune = prune
+        self.max_paths = max_paths
+        self.cache_limit = cache_limit
+        # The single shared copy of each set, keyed by itself
+        self.interned = {}
+        # The results of joining pairs of sets end-to-end
+        self.conjoined = {}
+
+    # Return the shared copy of a set of paths
+    def intern(self, paths):
+        if len(self.interned) >= self.cache_limit:
+            self.interned = {}
+        return self.interned.setdefault(paths, paths)
+
+    # Return the shared copy of a set of paths, after dropping the
+    # redundant paths and merging any beyond the cap
+    def normalise(self, paths):
+        if self.prune or (self.max_paths is not None and len(paths) > self.max_paths):
+            # Consider the paths with the fewest protocols first
+            ordered = sorted(paths, key = lambda path: (path.bit_count(), path))
+            if self.prune:
+                minimal = []
+                for path in ordered:
+                    for shorter in minimal:
+                        if shorter & ~path == 0:
+                            break
+                    else:
+                        minimal.append(path)
+                ordered = minimal
+            if self.max_paths is not None and len(ordered) > self.max_paths:
+                merged = 0
+                for path in ordered[self.max_paths - 1:]:
+                    merged |= path
+                ordered = ordered[:self.max_paths - 1] + [merged]
+            paths = frozenset(ordered)
+        return self.intern(paths)
+
+    # Merge two sets of paths (for use in place of path_mask_union)
+    def union(self, paths1, paths2):
+        if paths1 is paths2:
+            return paths1
+        return self.normalise(paths1 | paths2)
+
+    # Join two sets of paths end-to-end in all combinations (for use in
+    # place of conjoin_path_masks)
+    def conjoin(self, paths1, paths2):
+        key = (paths1, paths2)
+        if not key in self.conjoined:
+            if len(self.conjoined) >= self.cache_limit:
+                self.conjoined = {}
+            self.conjoined[key] = self.normalise(frozenset([path1 | path2 for path1 in paths1 for path2 in paths2]))
+        return self.conjoined[key]
@@ -0,0 +1,93 @@
+#
+# Parallel closure of typed matrices (see Matrix.closure)
+#
+# The closure is calculated by the blocked Floyd-Warshall algorithm.
+# The nodes are divided into blocks and, for each block of intermediate
+# nodes in turn, (1) the paths within the diagonal block are closed, (2)
+# each block of the block's row is extended by those paths, and (3)
+# every other strip of rows is extended by the paths via the block.
+# The blocks in steps (2) and (3) are independent of each other, so are
+# handed out to a pool of worker processes.  The array is held in shared
+# memory, which the workers attach to when they start, so each task only
+# passes a few block numbers.
+#
+# Combining the paths in this order gives the same result as Warshall's
+# algorithm only if going round a cycle never gives a better path, so
+# only "absorbing" semirings (see Semiring) are closed in parallel.
+#
+
+import numpy
+from multiprocessing import Pool, shared_memory
+
+# Matrices with fewer nodes than this are closed serially, since
+# starting the workers would take longer than the closure itself
+PARALLEL_THRESHOLD = 1024
+
+# The number of nodes in each block
+BLOCK_SIZE = 256
+
+# The shared array and semiring, as seen by each worker process
+worker_state = {}
+
+# Return True if a closure with the given number of workers should be
+# calculated in parallel
+def use_parallel(contents, semiring, workers):
+    return workers is not None and workers > 1 and semiring.absorbing and \
+           len(contents) >= PARALLEL_THRESHOLD
+
+# Worker initialiser - attaches to the shared array
+def attach(name, shape, dtype, semiring):
+    memory = shared_memory.SharedMemory(name = name)
+    worker_state['memory'] = memory
+    worker_state['array'] = numpy.ndarray(shape, dtype = dtype, buffer = memory.buf)
+    worker_state['semiring'] = semiring
+
+# Extend the block of the numbered block's row starting at the given
+# column by the paths within the block (step 2)
+def extend_row_block(arguments):
+    block_start, block_end, column_start, column_end = arguments
+    array = worker_state['array']
+    semiring = worker_state['semiring']
+    diagonal = array[block_start:block_end, block_start:block_end]
+    target = array[block_start:block_end, column_start:column_end]
+    target[...] = semiring.merge_arrays(target, semiring.multiply_arrays(diagonal, target, True))
+
+# Extend a strip of rows outside the numbered block by the paths via the
+# block, having first extended their paths into the block by the paths
+# within it (step 3)
+def extend_row_strip(arguments):
+    block_start, block_end, row_start, row_end = arguments
+    array = worker_state['array']
+    semiring = worker_state['semiring']
+    diagonal = array[block_start:block_end, block_start:block_end]
+    into_block = array[row_start:row_end, block_start:block_end]
+    into_block[...] = semiring.merge_arrays(into_block, semiring.multiply_arrays(into_block, diagonal, True))
+    strip = array[row_start:row_end]
+    strip[...] = semiring.merge_arrays(strip, semiring.multiply_arrays(into_block, array[block_start:block_end], True))
+
+# Return the closure of a square array using the given number of worker
+# processes
+def parallel_close(contents, semiring, workers, block_size = None):
+    if block_size is None:
+        block_size = BLOCK_SIZE
+    size = len(contents)
+    memory = shared_memory.SharedMemory(create = True, size = max(contents.nbytes, 1))
+    try:
+        array = numpy.ndarray(contents.shape, dtype = contents.dtype, buffer = memory.buf)
+        array[...] = contents
+        blocks = [(start, min(start + block_size, size)) for start in range(0, size, block_size)]
+        with Pool(workers, attach, (memory.name, contents.shape, contents.dtype, semiring)) as pool:
+            for block_start, block_end in blocks:
+                # Step 1 is small, so is done here
+                array[block_start:block_end, block_start:block_end] = \
+                    semiring.close_array(array[block_start:block_end, block_start:block_end])
+                others = [(block_start, block_end, start, end) for start, end in blocks if start != block_start]
+                pool.map(extend_row_block, others)
+                pool.map(extend_row_strip, others)
+        result = array.copy()
+        # (The shared memory cannot be released while the array uses it)
+        del array
+        return result
+    finally:
+        memory.close()
+        memory.unlink()
@@ -0,0 +1,35 @@
+# Tests of the parallel closure
+
+import parallel
+from matrix import Matrix
+from semirings import MIN_PLUS
+
+# (The worker processes may import this module, so the tests only run
+# in the main process)
+if __name__ == '__main__':
+    # Use tiny blocks so that even a small matrix is closed in parallel
+    parallel.PARALLEL_THRESHOLD = 4
+    parallel.BLOCK_SIZE = 2
+
+    inf = float('inf')
+    ring = Matrix(['A', 'B', 'C', 'D', 'E'], inf, 'float64')
+    ring.fill([inf,   1, inf, inf, inf,
+               inf, inf,   1, inf, inf,
+               inf, inf, inf,   1, inf,
+               inf, inf, inf, inf,   1,
+                 1, inf, inf, inf, inf])
+    serial = ring.copy()
+
+    print('Hop counts around a ring, closed by two workers:')
+    ring.closure(semiring = MIN_PLUS, workers = 2)
+    print(ring)
+    print('')
+
+    serial.closure(semiring = MIN_PLUS)
+    print('Same as the serial closure:', ring.get_contents() == serial.get_contents())
+    print('')
+
+# Correct answer:
+#     5.0 on the diagonal, with 1.0, 2.0, 3.0 and 4.0 in turn to its
+#     right (wrapping round at the end of each row)
+#     Same as the serial closure: True
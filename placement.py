@@ -0,0 +1,141 @@
+# Observer placement - Choose where to put passive observers so that
+# they see as much of the logical topology as possible.
+#
+# The logical topology that a set of observers may (or should) see is
+# the union of what each observer sees on its own, so the number of
+# logical links seen is a submodular function of the set: adding an
+# observer never helps more than it would have done earlier.  This
+# allows observers to be chosen by the "lazy greedy" method: each
+# candidate's most recent gain is an upper bound on its current gain,
+# so only candidates at the top of a priority queue ever need to have
+# their gain recalculated after each choice.
+
+from heapq import heapify, heappush, heappop
+
+# Analyses whose results are unions of single-observer results
+UNION_ANALYSES = ['may_see', 'should_see']
+
+# Return the logical links that each of the candidate observers sees on
+# its own in the given analysis of the physical topology.  Each is a list
+# of (row numbers, bitmask) pairs, meaning that every one of the rows
+# holds the bitmask's links.  Cells on the diagonal may be included; they
+# are never counted, because nodes are not taken to send to themselves.
+def observer_coverages(topology, candidates, analysis = 'may_see', empty_cell = 0):
+    assert analysis in UNION_ANALYSES, 'Analysis ' + str(analysis) + ' is not supported in "observer_coverages"'
+    reachability = topology.get_reachability(empty_cell)
+    candidate_indices = [topology.get_index(candidate) for candidate in candidates]
+    # Every node that can reach an observer sees the observer and, in
+    # "may see", everything beyond it; the observer sees everything
+    # beyond it
+    coverages = []
+    for observer in candidate_indices:
+        destinations = reachability.get_reachable_mask(observer)
+        if analysis == 'may_see':
+            sources_see = destinations | (1 << observer)
+        else:
+            sources_see = 1 << observer
+        coverages.append([(reachability.can_reach_indices(observer), sources_see),
+                          ([observer], destinations)])
+    # In "should see", each node also sees the nodes that it can only
+    # reach via the observer
+    if analysis == 'should_see':
+        positions = dict([(observer, position) for position, observer in enumerate(candidate_indices)])
+        for source, dominance in reachability.observer_dominance(candidate_indices):
+            for observer, dominated in dominance.items():
+                if dominated:
+                    coverages[positions[observer]].append(([source], dominated))
+    return coverages
+
+# Return the number of links in a coverage not yet in the covered rows
+def coverage_gain(coverage, covered):
+    gain = 0
+    for row_indices, mask in coverage:
+        for row_index in row_indices:
+            gain += (mask & ~covered[row_index]).bit_count()
+    return gain
+
+# Return an upper bound on the gain of a coverage, which is quick to
+# calculate because the covered rows are not consulted
+def coverage_bound(coverage):
+    return sum([len(row_indices) * mask.bit_count() for row_indices, mask in coverage])
+
+# Choose observers one at a time, each time taking the candidate with the
+# greatest gain (or, if "per_cost" is True, the greatest gain per unit of
+# cost) that can still be afforded, until "k" observers have been chosen,
+# the budget is exhausted or no candidate adds anything.  Returns the
+# positions of the chosen candidates and the coverage curve.
+def lazy_greedy(size, coverages, costs, k, budget, per_cost):
+    # Nodes never send to themselves, so the diagonal starts "covered"
+    covered = [1 << node for node in range(size)]
+    # Each queue entry holds the negated priority, the candidate's
+    # position (to break ties in the original order), its gain and the
+    # number of observers that had been chosen when the gain was
+    # calculated.  The queue starts with upper bounds on the gains, which
+    # are marked as out of date.
+    queue = []
+    for position, coverage in enumerate(coverages):
+        gain = coverage_bound(coverage)
+        queue.append((-priority(gain, costs[position], per_cost), position, gain, -1))
+    heapify(queue)
+    chosen = []
+    curve = []
+    total = 0
+    spent = 0
+    while queue and (k is None or len(chosen) < k):
+        negated_priority, position, gain, evaluated = heappop(queue)
+        if budget is not None and spent + costs[position] > budget:
+            # Unaffordable now, so unaffordable for the rest of the search
+            continue
+        if evaluated < len(chosen):
+            # The gain is out of date, so recalculate it and requeue
+            gain = coverage_gain(coverages[position], covered)
+            heappush(queue, (-priority(gain, costs[position], per_cost), position, gain, len(chosen)))
+            continue
+        # The gain is up to date, so no other candidate can beat it
+        if gain == 0:
+            break
+        for row_indices, mask in coverages[position]:
+            for row_index in row_indices:
+                covered[row_index] |= mask
+        total += gain
+        spent += costs[position]
+        chosen.append(position)
+        curve.append(total)
+    return chosen, curve
+
+# The priority of a candidate in the lazy greedy search
+def priority(gain, cost, per_cost):
+    if per_cost:
+        return float(gain) / cost
+    return gain
+
+# Given a matrix representing the physical topology of a network, choose
+# up to "k" observers that between them see as many logical links as
+# possible in the given analysis ('may_see' or 'should_see').  Candidates
+# default to every node.  If costs (a dictionary from candidate to cost)
+# and/or a budget are given, the total cost of the chosen observers is
+# kept within the budget; both the plain and the cost-weighted greedy
+# choices are then made, and the better of the two is returned.  The
+# result is the list of chosen observers, in the order chosen, and the
+# "coverage curve": the number of logical links seen by the first one,
+# two, three, etc., observers.
+def place_observers(topology, k = None, analysis = 'may_see', candidates = None,
+                    costs = None, budget = None, empty_cell = 0):
+    assert k is not None or budget is not None, 'Either k or a budget is needed in "place_observers"'
+    if candidates is None:
+        candidates = topology.get_headings()
+    for candidate in candidates:
+        assert candidate in topology.index, 'Candidate ' + str(candidate) + ' nonexistent in "place_observers"'
+    candidate_costs = [1] * len(candidates)
+    if costs is not None:
+        candidate_costs = [costs[candidate] for candidate in candidates]
+        for cost in candidate_costs:
+            assert cost > 0, 'Costs must be positive in "place_observers"'
+    # Each candidate's coverage is calculated once
+    coverages = observer_coverages(topology, candidates, analysis, empty_cell)
+    chosen, curve = lazy_greedy(topology.get_size(), coverages, candidate_costs, k, budget, False)
+    if costs is not None:
+        weighted_chosen, weighted_curve = lazy_greedy(topology.get_size(), coverages, candidate_costs, k, budget, True)
+        if weighted_curve and (not curve or weighted_curve[-1] > curve[-1]):
+            chosen, curve = weighted_chosen, weighted_curve
+    return [candidates[position] for position in chosen], curve
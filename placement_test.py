@@ -0,0 +1,40 @@
+# Tests of observer placement
+
+from matrix import Matrix
+from placement import place_observers
+
+# This is the PHYSICAL topology
+cul_de_sacs = Matrix(['A', 'B', 'C', 'D', 'E'])
+cul_de_sacs.fill([0, 0, 0, 0, 0,
+                  1, 0, 1, 1, 0,
+                  0, 1, 0, 0, 0,
+                  0, 0, 0, 0, 1,
+                  0, 0, 0, 1, 0])
+
+print('Physical topology:')
+print(cul_de_sacs)
+print('')
+
+print('Best two observers for "may see", and the links they see:')
+print(place_observers(cul_de_sacs, 2))
+print('')
+
+print('Best observers for "should see" within a budget of 3:')
+print(place_observers(cul_de_sacs, analysis = 'should_see', budget = 3,
+                      costs = {'A': 1, 'B': 3, 'C': 1, 'D': 2, 'E': 1}))
+print('')
+
+print('Best observers chosen from A, D and E only:')
+print(place_observers(cul_de_sacs, 3, candidates = ['A', 'D', 'E']))
+print('')
+
+# Correct answer:
+#     (The third topology in visibility_test.py)
+#
+#     (B and C tie for the first choice, as do D and E for the second)
+#     (['B', 'D'], [8, 10])
+#
+#     (['C', 'E', 'A'], [5, 8, 9])
+#
+#     (E adds nothing once D has been chosen)
+#     (['D', 'A'], [6, 8])
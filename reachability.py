@@ -0,0 +1,398 @@
+# ReachabilityIndex - Records which nodes of a digraph, represented by
+# a Matrix, can reach which others, either directly or indirectly.
+# The transitive closure is calculated once when the index is created,
+# after which reachability questions are answered by lookup.  A Matrix
+# keeps its index until one of its cells or headings is changed (see
+# Matrix.get_reachability).
+#
+# The set of nodes reachable from each node is held as an integer
+# bitmask in which bit i corresponds to the node with row/column
+# number i, so set operations are done on whole words at a time.  The
+# closure is found by collapsing strongly connected components, which
+# takes time proportional to N + E plus the cost of the bitmask unions.
+#
+# A DynamicReachabilityIndex is instead kept up to date as individual
+# links are added and removed (see Matrix.maintain_reachability), so
+# that a flapping link does not force the whole closure to be redone.
+
+import numpy
+from dominators import immediate_dominators, dominator_children, dominated_by
+
+# Return the row/column numbers present in a bitmask, in ascending order
+# (the bits are searched as a string, which takes linear time even for
+# very long masks)
+def mask_members(mask):
+    binary = bin(mask)[:1:-1]
+    members = []
+    position = binary.find('1')
+    while position >= 0:
+        members.append(position)
+        position = binary.find('1', position + 1)
+    return members
+
+# Return a bitmask containing the given row/column numbers
+def members_mask(members):
+    mask = 0
+    for member in members:
+        mask |= 1 << member
+    return mask
+
+# Return a bitmask as a list of 0/1 values, one for each row/column number
+def mask_row(mask, size):
+    return [int(bit) for bit in bin(mask)[:1:-1].ljust(size, '0')[:size]]
+
+# Return a list of row bitmasks as a two-dimensional boolean array
+def masks_array(masks, size):
+    width = (size + 7) // 8
+    packed = numpy.frombuffer(b''.join([mask.to_bytes(width, 'little') for mask in masks]), dtype = numpy.uint8)
+    bits = numpy.unpackbits(packed.reshape(len(masks), width), axis = 1, bitorder = 'little')
+    return bits[:, :size].astype(bool)
+
+# Given the list of successors of each node in a digraph, return the
+# list of predecessors of each node
+def reverse_links(successors):
+    predecessors = [[] for node in successors]
+    for node, node_successors in enumerate(successors):
+        for successor in node_successors:
+            predecessors[successor].append(node)
+    return predecessors
+
+# Find the strongly connected components of a digraph, given the list
+# of successors of each node, using Tarjan's algorithm (with an explicit
+# stack, so that long chains do not exhaust Python's recursion limit).
+# The components are returned in reverse topological order, i.e., any
+# component appears after all the components it has links to.  If a
+# list of node numbers is given only the subgraph they induce is
+# searched, and links to other nodes are ignored.
+def strongly_connected_components(successors, nodes = None):
+    size = len(successors)
+    if nodes is None:
+        order = [None] * size
+        nodes = range(size)
+    else:
+        # Nodes outside the subgraph look as if they have already been
+        # visited and assigned to a component, so are never entered
+        order = [-1] * size
+        for node in nodes:
+            order[node] = None
+    lowest = [0] * size
+    on_stack = [False] * size
+    stack = []
+    components = []
+    counter = 0
+    for root in nodes:
+        if order[root] is not None:
+            continue
+        # Each entry is a node and the position of the next successor to visit
+        to_visit = [(root, 0)]
+        order[root] = lowest[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        while to_visit:
+            node, position = to_visit[-1]
+            node_successors = successors[node]
+            if position < len(node_successors):
+                to_visit[-1] = (node, position + 1)
+                successor = node_successors[position]
+                if order[successor] is None:
+                    order[successor] = lowest[successor] = counter
+                    counter += 1
+                    stack.append(successor)
+                    on_stack[successor] = True
+                    to_visit.append((successor, 0))
+                elif on_stack[successor]:
+                    lowest[node] = min(lowest[node], order[successor])
+                continue
+            # All successors visited, so close off this node
+            to_visit.pop()
+            if to_visit:
+                parent = to_visit[-1][0]
+                lowest[parent] = min(lowest[parent], lowest[node])
+            if lowest[node] == order[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+    return components
+
+# Return the bitmasks of the nodes reachable from each node of a digraph,
+# given its strongly connected components in reverse topological order.
+# Every node in a component reaches the same nodes, so the components
+# are collapsed and reachability is propagated once per component
+# through the resulting acyclic graph, rather than once per node.  If
+# the components only cover part of the digraph, the bitmasks already
+# known for the other nodes must be given, and are used as they stand.
+def propagate_reachability(successors, components, known = None):
+    component_of = [None] * len(successors)
+    if known is None:
+        reachable = [0] * len(successors)
+    else:
+        reachable = list(known)
+    for component_number, component in enumerate(components):
+        for node in component:
+            component_of[node] = component_number
+        # Nodes reachable from the component, via links leaving it (the
+        # components it links to have already been done)
+        mask = 0
+        cyclic = len(component) > 1
+        for node in component:
+            for successor in successors[node]:
+                if component_of[successor] != component_number:
+                    mask |= reachable[successor] | (1 << successor)
+                elif successor == node:
+                    cyclic = True
+        # The members of a cyclic component also reach each other
+        if cyclic:
+            mask |= members_mask(component)
+        for node in component:
+            reachable[node] = mask
+    return reachable
+
+class ReachabilityIndex:
+
+    # The index is discarded whenever the matrix changes
+    incremental = False
+
+    # Constructor - calculates the transitive closure of the digraph in
+    # which any cell not equal to the "empty" value is a link
+    def __init__(self, matrix, empty_cell = 0):
+        self.headings = matrix.get_headings()
+        self.index = dict(matrix.index)
+        self.empty_cell = empty_cell
+        self.calculate(matrix.get_successors(empty_cell))
+
+    # Calculate the transitive closure of the digraph given by the list of
+    # successors of each node
+    def calculate(self, successors):
+        self.successors = successors
+        self.components = strongly_connected_components(self.successors)
+        # Nodes reachable from each node in one or more hops (a node only
+        # reaches itself if it lies on a cycle)
+        self.reachable = propagate_reachability(self.successors, self.components)
+        # Nodes that can reach each node in one or more hops (the reversed
+        # digraph has the same components, in the opposite order)
+        self.predecessors = reverse_links(self.successors)
+        self.reaching = propagate_reachability(self.predecessors, self.components[::-1])
+        # The other nodes that can reach each observer, found when needed
+        self.observer_sources = {}
+
+    # Return a new index for the same digraph with the numbered nodes
+    # removed (i.e., with all their links deleted)
+    def without(self, node_indices):
+        removed = members_mask(node_indices)
+        reduced = ReachabilityIndex.__new__(ReachabilityIndex)
+        reduced.headings = self.headings
+        reduced.index = self.index
+        reduced.empty_cell = self.empty_cell
+        reduced.calculate([[] if removed >> node & 1 else
+                           [successor for successor in node_successors if not removed >> successor & 1]
+                           for node, node_successors in enumerate(self.successors)])
+        return reduced
+
+    # Getter - returns the bitmask of nodes reachable from the numbered node
+    def get_reachable_mask(self, source_index):
+        return self.reachable[source_index]
+
+    # Getter - returns the bitmask of nodes that can reach the numbered node
+    def get_reaching_mask(self, destination_index):
+        return self.reaching[destination_index]
+
+    # Return True if there is a path of one or more hops from the source
+    # node to the destination node
+    def reaches(self, source, destination):
+        return bool(self.reachable[self.index[source]] >> self.index[destination] & 1)
+
+    # Return a list of all other nodes reachable from the given one
+    def reachable_from(self, source):
+        source_index = self.index[source]
+        return [self.headings[member] for member in mask_members(self.reachable[source_index])
+                if member != source_index]
+
+    # Return a list of all other nodes that can reach the given one
+    def can_reach(self, destination):
+        destination_index = self.index[destination]
+        return [self.headings[member] for member in mask_members(self.reaching[destination_index])
+                if member != destination_index]
+
+    # Return a list of the numbers of all other nodes that can reach the
+    # numbered one (remembered, since observers are queried repeatedly)
+    def can_reach_indices(self, destination_index):
+        if not destination_index in self.observer_sources:
+            self.observer_sources[destination_index] = \
+                mask_members(self.reaching[destination_index] & ~(1 << destination_index))
+        return self.observer_sources[destination_index]
+
+    # Return the bitmasks of the rows of the logical topology that the
+    # numbered observers may see (see Matrix.may_see).  Each observer
+    # contributes the union of two outer products: every other node that
+    # can reach it sends to it and, via it, to everything it can reach;
+    # and it sends to everything it can reach itself.  No node is taken
+    # to send to itself.  The cost is proportional to the number of
+    # rows written rather than to the square of the matrix's size.
+    def may_see_masks(self, observer_indices):
+        rows = [0] * len(self.headings)
+        written = set()
+        for observer in observer_indices:
+            observer_bit = 1 << observer
+            sources = self.can_reach_indices(observer)
+            reachable = self.get_reachable_mask(observer)
+            destinations = reachable | observer_bit
+            for source in sources:
+                rows[source] |= destinations
+            rows[observer] |= reachable
+            written.update(sources)
+            written.add(observer)
+        for node in written:
+            rows[node] &= ~(1 << node)
+        return rows
+
+    # For each node that can reach at least one of the numbered observers,
+    # yield the node and a dictionary giving, for each observer it can
+    # reach (other than itself), the bitmask of the nodes it can only
+    # reach via that observer.  These are the observer's descendants in
+    # the dominator tree rooted at the node, so a single tree per node
+    # answers the question for every observer at once.
+    def observer_dominance(self, observer_indices):
+        observer_indices = sorted(set(observer_indices))
+        sources = 0
+        for observer in observer_indices:
+            sources |= self.reaching[observer]
+        for source in mask_members(sources):
+            children = dominator_children(immediate_dominators(self.successors, self.predecessors, source))
+            dominance = {}
+            for observer in observer_indices:
+                if observer != source and self.reachable[source] >> observer & 1:
+                    dominance[observer] = members_mask(dominated_by(children, observer))
+            yield source, dominance
+
+    # Return the bitmasks of the rows of the logical topology that the
+    # numbered observers should see (see Matrix.should_see): every other
+    # node that can reach an observer sends to it, it sends to everything
+    # it can reach, and each node sends via it to the nodes that it
+    # dominates in the dominator tree rooted at that node.
+    def should_see_masks(self, observer_indices):
+        rows = [0] * len(self.headings)
+        for observer in observer_indices:
+            observer_bit = 1 << observer
+            for source in self.can_reach_indices(observer):
+                rows[source] |= observer_bit
+            rows[observer] |= self.get_reachable_mask(observer) & ~observer_bit
+        for source, dominance in self.observer_dominance(observer_indices):
+            for dominated in dominance.values():
+                rows[source] |= dominated
+        return rows
+
+    # Return the bitmasks of the rows of the logical topology that the
+    # numbered observers must see (see Matrix.must_see).  A flow must be
+    # seen if every path it can take goes via at least one observer,
+    # which is the case exactly when its destination is reachable from
+    # its source in the digraph, but not once the observers have been
+    # removed.  (This includes all flows to and from the observers.)
+    # The observers are therefore considered jointly, and the whole
+    # result takes just one more closure calculation.
+    def must_see_masks(self, observer_indices):
+        reduced = self.without(observer_indices)
+        return [self.reachable[node] & ~reduced.reachable[node] & ~(1 << node)
+                for node in range(len(self.headings))]
+
+class DynamicReachabilityIndex(ReachabilityIndex):
+
+    # The index is updated as links are added and removed, rather than
+    # being discarded
+    incremental = True
+
+    # Calculate the transitive closure from scratch (see ReachabilityIndex)
+    def calculate(self, successors):
+        ReachabilityIndex.calculate(self, successors)
+        # The "may see" results already found, keyed by the set of
+        # observer numbers, with the bitmask of the observers
+        self.may_see_results = {}
+
+    # Record that the numbered cell has become (or stopped being) a link
+    def set_link(self, source_index, destination_index, linked):
+        if linked:
+            self.insert_link(source_index, destination_index)
+        else:
+            self.delete_link(source_index, destination_index)
+
+    # Add a link to the digraph.  Only the nodes that can reach the source
+    # (and the source itself) can gain anything: each gains whatever it
+    # could not already reach of the destination and the nodes beyond it,
+    # as in Italiano's algorithm, but with whole bitmasks propagated at
+    # once.  Nodes gaining the same bitmask are grouped, so that each node
+    # whose predecessors change is only updated once per group.
+    def insert_link(self, source_index, destination_index):
+        if destination_index in self.successors[source_index]:
+            return
+        self.successors[source_index].append(destination_index)
+        self.predecessors[destination_index].append(source_index)
+        if self.reachable[source_index] >> destination_index & 1:
+            # The destination was already reachable, so nothing changes
+            return
+        beyond = self.reachable[destination_index] | (1 << destination_index)
+        gainers = {}
+        for node in mask_members(self.reaching[source_index] | (1 << source_index)):
+            gained = beyond & ~self.reachable[node]
+            if gained:
+                self.reachable[node] |= gained
+                gainers[gained] = gainers.get(gained, 0) | (1 << node)
+        changed = 0
+        for gained, nodes in gainers.items():
+            for member in mask_members(gained):
+                self.reaching[member] |= nodes
+            changed |= gained | nodes
+        self.forget(changed)
+
+    # Remove a link from the digraph.  Only the nodes that could reach the
+    # source (and the source itself) can lose anything, so the closure is
+    # recalculated for the subgraph they induce, taking the nodes reachable
+    # from every other node as given, and the nodes that can reach each
+    # node are then corrected for whatever was lost.
+    def delete_link(self, source_index, destination_index):
+        if not destination_index in self.successors[source_index]:
+            return
+        self.successors[source_index].remove(destination_index)
+        self.predecessors[destination_index].remove(source_index)
+        affected = mask_members(self.reaching[source_index] | (1 << source_index))
+        components = strongly_connected_components(self.successors, affected)
+        reachable = propagate_reachability(self.successors, components, self.reachable)
+        losers = {}
+        for node in affected:
+            lost = self.reachable[node] & ~reachable[node]
+            if lost:
+                losers[lost] = losers.get(lost, 0) | (1 << node)
+        self.reachable = reachable
+        changed = 0
+        for lost, nodes in losers.items():
+            for member in mask_members(lost):
+                self.reaching[member] &= ~nodes
+            changed |= lost | nodes
+        self.forget(changed)
+
+    # Discard the remembered results that depend on the nodes in the
+    # bitmask, whose rows or columns of the closure have changed (the
+    # strongly connected components are no longer maintained)
+    def forget(self, changed):
+        self.components = None
+        if not changed:
+            return
+        for node in mask_members(changed):
+            self.observer_sources.pop(node, None)
+        for observers, (observer_mask, rows) in list(self.may_see_results.items()):
+            if observer_mask & changed:
+                del self.may_see_results[observers]
+
+    # Return the bitmasks of the rows of the logical topology that the
+    # numbered observers may see (see ReachabilityIndex), remembering
+    # them until the closure changes around one of the observers
+    def may_see_masks(self, observer_indices):
+        observers = frozenset(observer_indices)
+        if not observers in self.may_see_results:
+            self.may_see_results[observers] = (members_mask(observers),
+                                               ReachabilityIndex.may_see_masks(self, observers))
+        return list(self.may_see_results[observers][1])
@@ -0,0 +1,222 @@
+#
+# Semirings for use with the Matrix class
+#
+# "closure" and "multiply_matrices" combine cells with two operators:
+# an "addition" that merges alternative paths and a "multiplication"
+# that joins consecutive hops, together with a "zero" value marking an
+# empty cell.  A Semiring bundles the three together, so the same
+# calculation can find reachability, hop counts, bottleneck bandwidths
+# or the protocols available between nodes just by changing semiring.
+#
+# When both operators have NumPy equivalents, typed matrices are
+# processed a whole row and column at a time rather than cell by cell
+# (see Matrix.semiring_array).  Any other operators are applied to one
+# cell at a time, as before.
+#
+
+import numpy
+from operator import add, mul
+from mergers import path_union, conjoin_paths, EMPTY_PATHS
+from mergers import path_mask_union, conjoin_path_masks, EMPTY_PATH_MASKS, PathSets
+
+# NumPy equivalents of binary cell operations, used to process typed
+# matrices in a single step rather than cell by cell
+VECTORISED_OPERATIONS = {add: numpy.add, mul: numpy.multiply,
+                         max: numpy.maximum, min: numpy.minimum}
+
+# Operations that always return one of their arguments, so can never
+# produce a value that was not already in the matrix
+SELECTIVE_OPERATIONS = [max, min]
+
+# The number of cells in the intermediate products of each tile of a
+# vectorised multiplication (see Semiring.multiply_arrays)
+BLOCK_CELLS = 1 << 18
+
+class Semiring:
+
+    # Constructor - records the operators and the zero (empty) value.
+    # "absorbing" should be True if going round a cycle never gives a
+    # better path (adding x * y to x always gives x), in which case the
+    # closure is the same whatever order the paths are combined in; this
+    # is known to hold when the operators are max and min.
+    def __init__(self, addition = max, multiplication = max, zero = 0, name = None, absorbing = False):
+        self.addition = addition
+        self.multiplication = multiplication
+        self.zero = zero
+        self.name = name
+        self.absorbing = absorbing or (addition, multiplication) in [(max, min), (min, max)]
+        # NumPy equivalents of the operators, if there are any
+        self.addition_ufunc = VECTORISED_OPERATIONS.get(addition)
+        self.multiplication_ufunc = VECTORISED_OPERATIONS.get(multiplication)
+        self.vectorised = self.addition_ufunc is not None and self.multiplication_ufunc is not None
+        self.selective = addition in SELECTIVE_OPERATIONS and multiplication in SELECTIVE_OPERATIONS
+
+    # Return the transitive closure of a square array (see Matrix.closure
+    # for the algorithm).  For each intermediate node k, only the block of
+    # cells whose row has a path to k and whose column has a path from k
+    # is updated, in a single vectorised step.  If "in_place" is True the
+    # array itself is closed, rather than a copy.
+    def close_array(self, contents, in_place = False):
+        result = contents if in_place else contents.copy()
+        for k in range(len(result)):
+            column_k = result[:, k]
+            row_k = result[k]
+            sources = numpy.flatnonzero(column_k != self.zero)
+            destinations = numpy.flatnonzero(row_k != self.zero)
+            if len(sources) == 0 or len(destinations) == 0:
+                continue
+            block_index = numpy.ix_(sources, destinations)
+            via_k = self.multiplication_ufunc.outer(column_k[sources], row_k[destinations])
+            block = result[block_index]
+            result[block_index] = numpy.where(block != self.zero,
+                                              self.addition_ufunc(block, via_k), via_k)
+        return result
+
+    # Return the "sum" of two equal-shaped arrays, cell by cell, where a
+    # zero cell contributes nothing
+    def merge_arrays(self, array1, array2):
+        return numpy.where(array1 == self.zero, array2,
+                           numpy.where(array2 == self.zero, array1, self.addition_ufunc(array1, array2)))
+
+    # Return the product of two arrays (see Matrix.multiply_matrices).
+    # The result is built a tile at a time, from a block of the
+    # multiplicand's rows and a block of its columns (and the multiplier's
+    # corresponding rows), so the intermediate products stay small enough
+    # to remain in cache.  Ordinary arithmetic and boolean products are
+    # handed to NumPy's (BLAS) matrix product instead.  If "skip_zeros" is
+    # True, products involving a zero cell are left out, as in a closure.
+    def multiply_arrays(self, multiplicand, multiplier, skip_zeros = False):
+        dtype = numpy.result_type(multiplicand, multiplier)
+        if self.addition is add and self.multiplication is mul and self.zero == 0:
+            return numpy.dot(multiplicand.astype(dtype), multiplier.astype(dtype))
+        if self.boolean_products(dtype, skip_zeros):
+            return numpy.dot(multiplicand.astype(numpy.float32), multiplier.astype(numpy.float32)) > 0
+        rows_count, middle = multiplicand.shape
+        columns = multiplier.shape[1]
+        step = max(1, int((BLOCK_CELLS // max(columns, 1)) ** 0.5))
+        result = numpy.empty((rows_count, columns), dtype = dtype)
+        for row_start in range(0, rows_count, step):
+            rows = multiplicand[row_start:row_start + step]
+            tile = None
+            for middle_start in range(0, middle, step):
+                left = rows[:, middle_start:middle_start + step]
+                right = multiplier[middle_start:middle_start + step]
+                products = self.multiplication_ufunc(left[:, :, None], right[None, :, :])
+                if skip_zeros:
+                    products = numpy.where((left != self.zero)[:, :, None] & (right != self.zero)[None, :, :],
+                                           products, self.zero)
+                # (The zero starts each cell's sum, so is only added once,
+                # in the first tile)
+                if tile is None:
+                    tile = self.addition_ufunc.reduce(products, axis = 1, initial = self.zero)
+                else:
+                    tile = self.addition_ufunc(tile, self.addition_ufunc.reduce(products, axis = 1))
+            if tile is None:
+                tile = numpy.full((len(rows), columns), self.zero, dtype = dtype)
+            result[row_start:row_start + step] = tile
+        return result
+
+    # Return True if products of arrays of the given type are boolean
+    # matrix products, which can be calculated as ordinary matrix products
+    # of 0/1 values.  (When zeros are skipped, the product of two
+    # non-zero booleans is True whichever selective operator is used.)
+    def boolean_products(self, dtype, skip_zeros = False):
+        if dtype.kind != 'b' or self.addition is not max or self.zero != 0:
+            return False
+        return self.multiplication is min or (skip_zeros and self.multiplication is max)
+
+    # Return True if repeated squaring is the quicker way to calculate the
+    # closure of an array (see closure_benchmark.py), which is only the
+    # case when its products are boolean and can be handed to BLAS
+    def prefers_squaring(self, contents):
+        return self.boolean_products(contents.dtype, True)
+
+    # Return the product of two square matrices given as lists of rows,
+    # applying the operators one cell at a time.  If "skip_zeros" is True,
+    # products involving a zero cell are left out, so only the populated
+    # cells of each row of the multiplicand and of the corresponding
+    # rows of the multiplier are visited.
+    def multiply_lists(self, multiplicand, multiplier, skip_zeros = False):
+        if skip_zeros:
+            result = []
+            for row in multiplicand:
+                result_row = [self.zero] * len(row)
+                for cell, multiplier_row in zip(row, multiplier):
+                    if cell == self.zero:
+                        continue
+                    for column_index, multiplier_cell in enumerate(multiplier_row):
+                        if multiplier_cell == self.zero:
+                            continue
+                        product = self.multiplication(cell, multiplier_cell)
+                        if result_row[column_index] == self.zero:
+                            result_row[column_index] = product
+                        else:
+                            result_row[column_index] = self.addition(result_row[column_index], product)
+                result.append(result_row)
+            return result
+        columns = list(zip(*multiplier))
+        result = []
+        for row in multiplicand:
+            result_row = []
+            for column in columns:
+                cell = self.zero
+                for cell_a, cell_b in zip(row, column):
+                    cell = self.addition(cell, self.multiplication(cell_a, cell_b))
+                result_row.append(cell)
+            result.append(result_row)
+        return result
+
+    # Return the transitive closure of a square array or list of rows by
+    # repeated squaring: adding the square of the paths found so far to
+    # them doubles the length of the paths covered, so about log2(N)
+    # multiplications cover every path without repeated nodes.  This
+    # gives the same result as Warshall's algorithm (see close_array)
+    # when going round a cycle never gives a better path, as with the
+    # boolean, min-plus (for non-negative distances) and max-min
+    # semirings, and stops early once nothing changes.
+    def close_by_squaring(self, contents):
+        size = len(contents)
+        if isinstance(contents, numpy.ndarray):
+            result = contents.copy()
+            for step in range(size.bit_length() + 1):
+                merged = self.merge_arrays(result, self.multiply_arrays(result, result, True))
+                if numpy.array_equal(merged, result):
+                    break
+                result = merged.astype(result.dtype)
+            return result
+        result = [list(row) for row in contents]
+        for step in range(size.bit_length() + 1):
+            product = self.multiply_lists(result, result, True)
+            merged = [[cell if other == self.zero else other if cell == self.zero else self.addition(cell, other)
+                       for cell, other in zip(row, product_row)]
+                      for row, product_row in zip(result, product)]
+            if merged == result:
+                break
+            result = merged
+        return result
+
+# Reachability in 0/1 matrices: a cell is 1 if there is any path
+BOOLEAN = Semiring(max, min, 0, 'boolean')
+
+# Shortest paths (the "tropical" semiring): cells hold distances, such
+# as hop counts, and empty cells are infinitely far apart (distances
+# must not be negative).  Typed matrices therefore need a float dtype,
+# with infinity in their empty cells.
+MIN_PLUS = Semiring(min, add, float('inf'), 'min-plus', True)
+
+# Widest paths: cells hold capacities, such as bandwidths, and a path's
+# capacity is that of its narrowest link
+MAX_MIN = Semiring(max, min, 0, 'max-min')
+
+# Protocols available between nodes, as sets of paths (see mergers.py)
+PROTOCOL_PATHS = Semiring(path_union, conjoin_paths, EMPTY_PATHS, 'protocol paths')
+
+# The same, with paths encoded as protocol bitmasks (see ProtocolRegistry)
+PROTOCOL_PATH_MASKS = Semiring(path_mask_union, conjoin_path_masks, EMPTY_PATH_MASKS, 'protocol path masks')
+
+# Return a semiring like PROTOCOL_PATH_MASKS whose path sets are kept
+# compact (see mergers.PathSets): by default only the minimal protocol
+# sets are kept, and "max_paths" caps the number of paths in each cell
+def compact_protocol_paths(prune = True, max_paths = None):
+    path_sets = PathSets(prune, max_paths)
+    return Semiring(path_sets.union, path_sets.conjoin, EMPTY_PATH_MASKS, 'compact protocol path masks', prune)
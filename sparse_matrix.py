@@ -0,0 +1,335 @@
+# SparseMatrix - A variant of the Matrix class for large, sparsely
+# connected topologies.  Only the cells that differ from the default
+# content are stored, as a dictionary of adjacency dictionaries keyed
+# by heading, so a topology with N nodes and E links needs space
+# proportional to N + E rather than N^2.  The same interface as the
+# Matrix class is supported, and reachability questions are answered
+# by graph traversals instead of calculating the transitive closure.
+
+from matrix import Matrix, index_headings
+from operator import add
+
+class SparseMatrix(Matrix):
+
+    # Constructor - creates the matrix with all cells holding a default
+    # value (which is not stored)
+    def __init__(self, headings = ['default'], default_content = 0):
+        # Check uniqueness of headings and map headings to indices
+        self.index = index_headings(headings)
+        self.headings = headings
+        self.reachability = None
+        self.incremental = False
+        self.shared = False
+        self.dtype = None
+        self.default_content = default_content
+        # Populated cells, keyed by row and then by column
+        self.links = dict([(heading, {}) for heading in headings])
+        # The rows holding a populated cell, keyed by column
+        self.sources = dict([(heading, set()) for heading in headings])
+
+    # Setter - populates the matrix from a single-dimension list of contents
+    def fill(self, contents):
+        # Confirm that sufficient contents have been provided
+        assert len(contents) == len(self.headings) ** 2, "Number of cells does not match matrix size in 'fill'"
+        # Copy the populated cells into the matrix
+        self.clear()
+        position = 0
+        for row in self.headings:
+            for column in self.headings:
+                if contents[position] != self.default_content:
+                    self.links[row][column] = contents[position]
+                    self.sources[column].add(row)
+                position += 1
+
+    # Setter - returns every cell to the default value
+    def clear(self):
+        self.reachability = None
+        for heading in self.headings:
+            self.links[heading] = {}
+            self.sources[heading] = set()
+
+    # Setter - updates a particular cell
+    def set_cell(self, row = 'default', column = 'default', content = 0):
+        assert row in self.index and column in self.index, "Nonexistent heading in 'set_cell'"
+        if self.incremental and self.reachability is not None:
+            self.reachability.set_link(self.index[row], self.index[column], content != self.reachability.empty_cell)
+        else:
+            self.reachability = None
+        if content != self.default_content:
+            self.links[row][column] = content
+            self.sources[column].add(row)
+        elif column in self.links[row]:
+            del self.links[row][column]
+            self.sources[column].discard(row)
+
+    # Getter - returns a particular cell's contents
+    def get_cell(self, row = 'default', column = 'default'):
+        assert column in self.index, "Nonexistent heading in 'get_cell'"
+        return self.links[row].get(column, self.default_content)
+
+    # Setter - replaces the row/column headings with an equal number of
+    # new (unique) headings, leaving the cells unchanged
+    def set_headings(self, headings):
+        assert len(headings) == len(self.headings), "Number of headings does not match matrix size in 'set_headings'"
+        renaming = dict(zip(self.headings, headings))
+        self.index = index_headings(headings)
+        self.headings = headings
+        self.reachability = None
+        self.links = dict([(renaming[row], dict([(renaming[column], content) for column, content in cells.items()]))
+                           for row, cells in self.links.items()])
+        self.sources = dict([(renaming[column], set([renaming[row] for row in rows]))
+                             for column, rows in self.sources.items()])
+
+    # Getter - returns a copy of the numbered row as a list
+    def get_row(self, row_index):
+        cells = self.links[self.headings[row_index]]
+        return [cells.get(column, self.default_content) for column in self.headings]
+
+    # Setter - replaces the numbered row with a list of contents
+    def set_row(self, row_index, contents):
+        assert len(contents) == len(self.headings), "Number of cells does not match matrix size in 'set_row'"
+        self.reachability = None
+        row = self.headings[row_index]
+        for column in self.links[row]:
+            self.sources[column].discard(row)
+        self.links[row] = {}
+        for column, content in zip(self.headings, contents):
+            if content != self.default_content:
+                self.links[row][column] = content
+                self.sources[column].add(row)
+
+    # Getter - returns a copy of the numbered column as a list
+    def get_column(self, column_index):
+        column = self.headings[column_index]
+        return [self.links[row].get(column, self.default_content) for row in self.headings]
+
+    # Setter - overwrites a rectangular block of cells, given as a list
+    # of rows, whose top left-hand corner is at the numbered row and column
+    def set_block(self, row_index, column_index, block):
+        assert row_index + len(block) <= len(self.headings), "Block does not fit in the matrix in 'set_block'"
+        for offset, contents in enumerate(block):
+            assert column_index + len(contents) <= len(self.headings), "Block does not fit in the matrix in 'set_block'"
+            row = self.headings[row_index + offset]
+            for column, content in zip(self.headings[column_index:], contents):
+                self.set_cell(row, column, content)
+
+    # Getter - returns a copy of the matrix's contents as a single-dimension list
+    def get_contents(self):
+        return [self.links[row].get(column, self.default_content)
+                for row in self.headings for column in self.headings]
+
+    # Getter - returns, for each row, a list of the numbers of the columns
+    # whose cells are not equal to the "empty" value (every cell of each
+    # row must be looked at if that is not the default content)
+    def get_successors(self, empty_cell = 0):
+        if empty_cell != self.default_content:
+            return [[column_index for column_index, cell in enumerate(self.get_row(row_index)) if cell != empty_cell]
+                    for row_index in range(len(self.headings))]
+        return [sorted([self.index[column] for column in self.links[row]]) for row in self.headings]
+
+    # Getter - returns the numbers and contents of the cells in the
+    # numbered row that are not equal to the "empty" value
+    def get_populated(self, row_index, empty_cell = 0):
+        if empty_cell != self.default_content:
+            return [(column_index, cell) for column_index, cell in enumerate(self.get_row(row_index))
+                    if cell != empty_cell]
+        return sorted([(self.index[column], content)
+                       for column, content in self.links[self.headings[row_index]].items()])
+
+    # The cells are never gathered into an array (see Matrix), since
+    # sparse operations visit only the populated cells
+    def semiring_array(self, semiring):
+        return None
+
+    # Getter - returns the number of populated (non-default) cells
+    def get_link_count(self):
+        return sum([len(cells) for cells in self.links.values()])
+
+    # Create a copy of the current matrix
+    def copy(self):
+        new_copy = SparseMatrix([], self.default_content)
+        new_copy.headings = self.get_headings()
+        new_copy.index = dict(self.index)
+        new_copy.links = dict([(row, dict(cells)) for row, cells in self.links.items()])
+        new_copy.sources = dict([(column, set(rows)) for column, rows in self.sources.items()])
+        return new_copy
+
+    # Create a sparse copy of the current matrix
+    def to_sparse(self, empty_cell = 0):
+        if empty_cell == self.default_content:
+            return self.copy()
+        return Matrix.to_sparse(self, empty_cell)
+
+    # Create a dense Matrix holding the same cells as this one
+    def to_dense(self, dtype = None):
+        dense = Matrix(self.get_headings(), self.default_content, dtype)
+        for row, cells in self.links.items():
+            for column, content in cells.items():
+                dense.set_cell(row, column, content)
+        return dense
+
+    # "Join" this matrix to another to create a larger matrix, assuming the
+    # headings of the two matrices are disjoint (see Matrix)
+    def join_disjoint_matrices(self, other_matrix, default = 0):
+        # Check type correctness of parameter
+        assert isinstance(other_matrix, Matrix), "Parameter is not a matrix in 'join_disjoint_matrices'"
+        for heading in self.headings:
+            assert not (heading in other_matrix.index), "Headings must be disjoint in 'join_disjoint_matrices'"
+        self.join_matrices(other_matrix, add, default)
+
+    # "Join" this matrix to another to create a larger matrix, merging
+    # the cells that appear in both matrices (see Matrix).  Only the
+    # populated cells need to be visited unless the defaults involved
+    # would populate otherwise empty cells.
+    def join_matrices(self, other_matrix, merger = add, default = 0):
+        # Check type correctness of parameter
+        assert isinstance(other_matrix, Matrix), "Parameter is not a matrix in 'join_matrices'"
+        other_matrix = other_matrix.to_sparse(self.default_content)
+        # Extend the heading list, preserving the original order of the
+        # headings
+        new_headings = self.get_headings()
+        for heading in other_matrix.headings:
+            if not heading in self.index:
+                new_headings += [heading]
+                self.links[heading] = {}
+                self.sources[heading] = set()
+        own_index = self.index
+        self.index = index_headings(new_headings)
+        self.headings = new_headings
+        self.reachability = None
+        # Merge the cells that appear in both matrices
+        shared = [heading for heading in other_matrix.headings if heading in own_index]
+        if merger(self.default_content, self.default_content) != self.default_content:
+            for row in shared:
+                for column in shared:
+                    self.set_cell(row, column, merger(self.get_cell(row, column), other_matrix.get_cell(row, column)))
+        else:
+            for row in shared:
+                for column, content in other_matrix.links[row].items():
+                    if column in own_index:
+                        self.set_cell(row, column, merger(self.get_cell(row, column), content))
+                for column in list(self.links[row]):
+                    if column in other_matrix.index and not column in other_matrix.links[row]:
+                        self.set_cell(row, column, merger(self.get_cell(row, column), self.default_content))
+        # Insert the cells that only appear in the other matrix
+        for row, cells in other_matrix.links.items():
+            for column, content in cells.items():
+                if not (row in own_index and column in own_index):
+                    self.set_cell(row, column, content)
+        # Newly-created cells that belong to neither matrix are filled
+        # with the default value
+        if default != self.default_content:
+            for row in new_headings:
+                for column in new_headings:
+                    if not (row in own_index and column in own_index) and \
+                       not (row in other_matrix.index and column in other_matrix.index):
+                        self.set_cell(row, column, default)
+
+    # "Join" this matrix to each of a list of others in turn (see Matrix),
+    # extending the headings only once.  Only the populated cells need to
+    # be visited unless the defaults involved would populate otherwise
+    # empty cells, in which case the matrices are joined one at a time.
+    def join_many(self, matrices, merger = add, default = 0):
+        matrices = list(matrices)
+        for matrix in matrices:
+            assert isinstance(matrix, Matrix), "Parameter is not a matrix in 'join_many'"
+        if default != self.default_content or \
+           merger(self.default_content, self.default_content) != self.default_content:
+            for matrix in matrices:
+                self.join_matrices(matrix, merger, default)
+            return
+        matrices = [matrix.to_sparse(self.default_content) for matrix in matrices]
+        # Number the matrices (this one being 0), find the one in which
+        # each heading first appears and extend the heading list
+        first = dict([(heading, 0) for heading in self.headings])
+        new_headings = self.get_headings()
+        for number, matrix in enumerate(matrices, 1):
+            for heading in matrix.headings:
+                if not heading in first:
+                    first[heading] = number
+                    new_headings.append(heading)
+                    self.links[heading] = {}
+                    self.sources[heading] = set()
+        self.index = index_headings(new_headings)
+        self.headings = new_headings
+        self.reachability = None
+        # Copy each cell from the first matrix in which both its row and
+        # column have appeared, and merge it with those in later matrices
+        for number, matrix in enumerate(matrices, 1):
+            for row, cells in matrix.links.items():
+                for column, content in cells.items():
+                    if max(first[row], first[column]) == number:
+                        self.set_cell(row, column, content)
+                    else:
+                        self.set_cell(row, column, merger(self.get_cell(row, column), content))
+                if first[row] < number:
+                    for column in list(self.links[row]):
+                        if column in matrix.index and not column in cells and first[column] < number:
+                            self.set_cell(row, column, merger(self.links[row][column], self.default_content))
+
+    # Return the headings of all nodes linked to or from the given ones,
+    # either directly or indirectly, by a breadth-first traversal of
+    # the populated cells
+    def traverse(self, starts, forwards = True):
+        reached = set()
+        frontier = list(starts)
+        while frontier:
+            heading = frontier.pop()
+            if forwards:
+                neighbours = self.links[heading]
+            else:
+                neighbours = self.sources[heading]
+            for neighbour in neighbours:
+                if not neighbour in reached:
+                    reached.add(neighbour)
+                    frontier.append(neighbour)
+        return reached
+
+    # Return a list of all other nodes reachable from the given one
+    # (see Matrix), found by a traversal in O(N + E) time
+    def reachable_from(self, source, empty_cell = 0):
+        if empty_cell != self.default_content:
+            return Matrix.reachable_from(self, source, empty_cell)
+        # Confirm that the source node exists
+        assert source in self.index, 'Node ' + str(source) + 'does not exist in method "reachable_from"'
+        reached = self.traverse([source])
+        return [destination for destination in self.headings
+                if destination in reached and destination != source]
+
+    # Return a list of all other nodes that can reach the given one
+    # (see Matrix), found by a traversal in O(N + E) time
+    def can_reach(self, destination, empty_cell = 0):
+        if empty_cell != self.default_content:
+            return Matrix.can_reach(self, destination, empty_cell)
+        # Confirm that the destination node exists
+        assert destination in self.index, 'Node ' + str(destination) + 'does not exist in method "reachable_from"'
+        reached = self.traverse([destination], False)
+        return [source for source in self.headings
+                if source in reached and source != destination]
+
+    # Calculate the transitive closure of this matrix (see Matrix).  The
+    # same adaptation of Warshall's algorithm is used, but for each
+    # intermediate node k only the populated cells in row and column k
+    # are visited, so sparse topologies are closed far more quickly.
+    def closure(self, add_alt_path = max, join_hops = max, empty_cell = 0, semiring = None, method = 'auto',
+                workers = None):
+        if semiring is not None:
+            add_alt_path = semiring.addition
+            join_hops = semiring.multiplication
+            empty_cell = semiring.zero
+        if empty_cell != self.default_content or method == 'squaring':
+            return Matrix.closure(self, add_alt_path, join_hops, empty_cell, method = method)
+        for k in self.headings:
+            # The paths into and out of k found by the previous hop
+            previous_row_k = dict(self.links[k])
+            previous_column_k = [(i, self.links[i][k]) for i in self.sources[k]]
+            # Add indirect paths from i to j via k
+            for i, previous_ik in previous_column_k:
+                next_i = self.links[i]
+                for j, previous_kj in previous_row_k.items():
+                    if j in next_i:
+                        # There is more than one path between i and j
+                        self.set_cell(i, j, add_alt_path(next_i[j], join_hops(previous_ik, previous_kj)))
+                    else:
+                        # This is the first path found between i and j
+                        self.set_cell(i, j, join_hops(previous_ik, previous_kj))
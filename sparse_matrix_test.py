@@ -0,0 +1,123 @@
+# Some tests of the SparseMatrix class
+
+import sys
+from matrix import Matrix
+from sparse_matrix import SparseMatrix
+from mergers import *
+
+print('Filling and converting ---------------------------------------------------')
+
+sparse = SparseMatrix(['a', 'b', 'c'], 'O')
+sparse.set_cell('a', 'b', 'X')
+sparse.set_cell('c', 'a', 'Y')
+print('')
+print(sparse)
+print('')
+print(sparse.get_link_count())
+print('')
+print(sparse.to_dense())
+print('')
+
+dense = Matrix(['A', 'B', 'C'])
+dense.fill([0, 1, 0,
+            0, 0, 2,
+            0, 0, 0])
+print(dense.to_sparse().get_link_count())
+print('')
+
+# Correct answer:
+#     2
+#     2
+
+print('Joining overlapping matrices ---------------------------------------------')
+
+sparse_one = SparseMatrix(['AA', 'BB', 'CC'], '')
+sparse_one.set_cell('AA', 'CC', 'x')
+sparse_one.set_cell('CC', 'CC', 'y')
+sparse_two = SparseMatrix(['CC', 'DD'], '')
+sparse_two.set_cell('CC', 'CC', 'z')
+sparse_two.set_cell('DD', 'CC', 'w')
+sparse_one.join_matrices(sparse_two, protocol_union, '.')
+print('')
+print(sparse_one)
+print('')
+
+print('Closure with strings -----------------------------------------------------')
+
+#   A -w-> B
+#    ^     |
+#     \    x
+#      y   |
+#       \  |
+#        \ v
+#   C <-z- D
+
+a_graph = SparseMatrix(['Node A', 'Node B', 'Node C', 'Node D'], '')
+a_graph.set_cell('Node A', 'Node B', 'w')
+a_graph.set_cell('Node B', 'Node D', 'x')
+a_graph.set_cell('Node D', 'Node A', 'y')
+a_graph.set_cell('Node D', 'Node C', 'z')
+
+a_graph.closure(add_alt_path = path_union,
+                join_hops = conjoin_paths,
+                empty_cell = '')
+
+print('')
+print(a_graph)
+print('')
+
+print('Reachability -------------------------------------------------------------')
+
+# Example: K->J, K->M, L->N, M->N, M->L
+
+a_graph = SparseMatrix(['K', 'J', 'L', 'M', 'N'], 'O')
+a_graph.set_cell('K', 'J', 'X')
+a_graph.set_cell('K', 'M', 'X')
+a_graph.set_cell('L', 'N', 'X')
+a_graph.set_cell('M', 'N', 'X')
+a_graph.set_cell('M', 'L', 'X')
+
+print('')
+print('Reachable from K: ' + str(a_graph.reachable_from('K', 'O')))
+print('Reachable from M: ' + str(a_graph.reachable_from('M', 'O')))
+print('Can reach N: ' + str(a_graph.can_reach('N', 'O')))
+print('Can reach K: ' + str(a_graph.can_reach('K', 'O')))
+
+# Correct answer:
+#     Reachable from K: ['J', 'L', 'M', 'N']
+#     Reachable from M: ['L', 'N']
+#     Can reach N: ['K', 'L', 'M']
+#     Can reach K: []
+
+# Example: the same matrix with the default "empty" value, 0, which no
+# cell holds, so every node is linked to every node
+
+print('')
+print('Reachable from J: ' + str(a_graph.reachable_from('J')))
+print('Can reach K: ' + str(a_graph.can_reach('K')))
+print(a_graph.may_see(['J']).get_contents() == [0 if row == column else 1
+                                                 for row in range(5) for column in range(5)])
+print('')
+
+# Correct answer:
+#     Reachable from J: ['K', 'L', 'M', 'N']
+#     Can reach K: ['J', 'L', 'M', 'N']
+#     True
+
+print('Writing populated cells ---------------------------------------------------')
+
+# Example: the cells of L's and M's rows that are not 'X', written one
+# per line (every cell not linked, since 'X' marks the links)
+
+print('')
+a_graph.write(sys.stdout, rows = range(2, 4), sparse = True, empty_cell = 'X')
+print('')
+
+# Correct answer:
+#                L|           K|           O|
+#                L|           J|           O|
+#                L|           L|           O|
+#                L|           M|           O|
+#                M|           K|           O|
+#                M|           J|           O|
+#                M|           M|           O|
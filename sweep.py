@@ -0,0 +1,191 @@
+#
+# Sweeps - exhaustive observability studies over many topologies
+#
+# A sweep evaluates one or more analyses ('may_see', 'should_see' or
+# 'must_see') for each of a list of observer sets in each digraph of a
+# sequence of adjacency bitmasks (see digraphs.py).  The digraphs are
+# divided into numbered chunks, which are evaluated by a pool of worker
+# processes, and the results of each chunk are written to its own
+# "shard" file in the sweep's directory, as NumPy arrays with one entry
+# per digraph and observer set:
+#
+#     graph            the digraph's position in the sequence
+#     observer_set     the observer set's position in the list
+#     adjacency        the digraph's cells, packed into bits
+#     <analysis>       the logical topology's cells, packed into bits
+#     <analysis>_links the number of logical links
+#
+# A shard is only given its final name once it is complete, so after an
+# interruption the sweep can be run again with the same arguments and it
+# carries on from where it left off, skipping the chunks already done
+# (the sequence of digraphs must be the same each time).  The sweep's
+# settings and progress are also recorded in a checkpoint file.
+#
+
+import os
+import json
+import time
+import numpy
+from itertools import islice
+from multiprocessing import Pool
+from digraphs import digraph_matrix
+
+# The analyses a sweep can perform
+SWEEP_ANALYSES = ['may_see', 'should_see', 'must_see']
+
+# The name of the checkpoint file in a sweep's directory
+CHECKPOINT_FILE = 'checkpoint.json'
+
+# Return the name of the numbered chunk's shard file
+def shard_path(directory, chunk_number):
+    return os.path.join(directory, 'shard_%08d.npz' % chunk_number)
+
+# Write a file so that it either appears complete or not at all
+def write_atomically(path, write):
+    temporary = path + '.partial'
+    with open(temporary, 'wb') as output:
+        write(output)
+    os.replace(temporary, path)
+
+# Return the cells of a matrix packed into bits (any non-zero cell is a 1)
+def packed_cells(matrix):
+    return numpy.packbits(numpy.asarray(matrix.get_contents()) != 0)
+
+# Evaluate the analyses for every observer set in every digraph of a
+# chunk, and write the chunk's shard.  Returns the chunk number and the
+# number of digraphs evaluated.
+def evaluate_chunk(arguments):
+    directory, chunk_number, first_graph, masks, headings, observer_sets, analyses = arguments
+    columns = dict([(name, []) for name in ['graph', 'observer_set', 'adjacency']])
+    for analysis in analyses:
+        columns[analysis] = []
+        columns[analysis + '_links'] = []
+    for offset, mask in enumerate(masks):
+        topology = digraph_matrix(mask, headings)
+        adjacency = packed_cells(topology)
+        for set_number, observers in enumerate(observer_sets):
+            columns['graph'].append(first_graph + offset)
+            columns['observer_set'].append(set_number)
+            columns['adjacency'].append(adjacency)
+            for analysis in analyses:
+                visible = getattr(topology, analysis)(observers)
+                cells = packed_cells(visible)
+                columns[analysis].append(cells)
+                columns[analysis + '_links'].append(int(numpy.unpackbits(cells).sum()))
+    width = (len(headings) ** 2 + 7) // 8
+    arrays = {}
+    for name, values in columns.items():
+        if name == 'adjacency' or name in analyses:
+            arrays[name] = numpy.array(values, dtype = numpy.uint8).reshape(len(values), width)
+        else:
+            arrays[name] = numpy.array(values, dtype = numpy.int64)
+    write_atomically(shard_path(directory, chunk_number), lambda output: numpy.savez(output, **arrays))
+    return chunk_number, len(masks)
+
+# Generate the chunks of a sequence of digraphs as (chunk number, number
+# of the first digraph, list of masks)
+def chunked(masks, chunk_size):
+    chunk = []
+    chunk_number = 0
+    for mask in masks:
+        chunk.append(mask)
+        if len(chunk) == chunk_size:
+            yield chunk_number, chunk_number * chunk_size, chunk
+            chunk_number += 1
+            chunk = []
+    if chunk:
+        yield chunk_number, chunk_number * chunk_size, chunk
+
+# Report a sweep's progress on the standard output
+def print_progress(progress):
+    line = '%d graphs in %.1fs (%.1f graphs/s)' % (progress['graphs_done'], progress['elapsed'], progress['rate'])
+    if progress['eta'] is not None:
+        line += ', about %.0fs to go' % progress['eta']
+    print(line)
+
+# Run a sweep (see above) of the digraphs with the given adjacency
+# bitmasks, whose nodes have the given headings, writing the results to
+# the given directory.  "workers" is the number of worker processes (by
+# default, one per processor; with one worker, everything is done in
+# this process).  After each chunk, "report" (if given) is called with a
+# dictionary giving the number of chunks and digraphs done so far, the
+# elapsed time, the rate in digraphs per second and, if the total number
+# of digraphs is given, the estimated time remaining.  Returns the
+# number of digraphs evaluated by this run.
+def run_sweep(masks, headings, observer_sets, directory, analyses = ['may_see'], workers = None,
+              chunk_size = 1000, total = None, report = None):
+    for analysis in analyses:
+        assert analysis in SWEEP_ANALYSES, 'Analysis ' + str(analysis) + ' is not supported in "run_sweep"'
+    for observers in observer_sets:
+        for observer in observers:
+            assert observer in headings, 'Observer ' + str(observer) + ' nonexistent in "run_sweep"'
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    # Check that a sweep being resumed has the same settings
+    settings = {'headings': [str(heading) for heading in headings],
+                'observer_sets': [[str(observer) for observer in observers] for observers in observer_sets],
+                'analyses': list(analyses), 'chunk_size': chunk_size}
+    checkpoint_path = os.path.join(directory, CHECKPOINT_FILE)
+    if os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as previous:
+            assert json.load(previous)['settings'] == settings, 'Settings differ from the interrupted sweep in "run_sweep"'
+    # Chunks are taken from the sequence a few at a time, so the whole
+    # sequence is never held in memory, and those already done are skipped
+    state = {'chunks_done': 0, 'graphs_done': 0, 'evaluated': 0}
+    start = time.time()
+
+    def pending_chunks():
+        for chunk_number, first_graph, chunk in chunked(masks, chunk_size):
+            if os.path.exists(shard_path(directory, chunk_number)):
+                state['chunks_done'] += 1
+                state['graphs_done'] += len(chunk)
+            else:
+                yield (directory, chunk_number, first_graph, chunk, headings, observer_sets, analyses)
+
+    # Record the progress so far in the checkpoint file
+    def checkpoint():
+        progress = {'settings': settings, 'chunks_done': state['chunks_done'], 'graphs_done': state['graphs_done']}
+        write_atomically(checkpoint_path, lambda output: output.write(json.dumps(progress).encode()))
+
+    # Record and report progress after each chunk
+    def finished(count):
+        state['chunks_done'] += 1
+        state['graphs_done'] += count
+        state['evaluated'] += count
+        elapsed = time.time() - start
+        progress = {'chunks_done': state['chunks_done'], 'graphs_done': state['graphs_done'],
+                    'elapsed': elapsed, 'rate': state['evaluated'] / max(elapsed, 1e-9), 'eta': None}
+        if total is not None:
+            progress['eta'] = max(total - state['graphs_done'], 0) / progress['rate']
+        checkpoint()
+        if report is not None:
+            report(progress)
+
+    tasks = pending_chunks()
+    if workers == 1:
+        for task in tasks:
+            chunk_number, count = evaluate_chunk(task)
+            finished(count)
+    else:
+        with Pool(workers) as pool:
+            while True:
+                wave = list(islice(tasks, workers * 4))
+                if not wave:
+                    break
+                for chunk_number, count in pool.imap_unordered(evaluate_chunk, wave):
+                    finished(count)
+    checkpoint()
+    return state['evaluated']
+
+# Return the results of a sweep as a dictionary of arrays (see above),
+# concatenating its shards in order
+def load_sweep(directory):
+    shards = sorted([name for name in os.listdir(directory) if name.startswith('shard_') and name.endswith('.npz')])
+    columns = {}
+    for name in shards:
+        with numpy.load(os.path.join(directory, name)) as shard:
+            for column in shard.files:
+                columns.setdefault(column, []).append(shard[column])
+    return dict([(column, numpy.concatenate(arrays)) for column, arrays in columns.items()])
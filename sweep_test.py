@@ -0,0 +1,43 @@
+# Tests of the sweep runner
+
+import os
+import shutil
+import tempfile
+from sweep import run_sweep, load_sweep, shard_path
+from digraphs import unlabelled_digraphs
+
+# (The worker processes may import this module, so the tests only run
+# in the main process)
+if __name__ == '__main__':
+    directory = tempfile.mkdtemp()
+    headings = ['A', 'B', 'C']
+    observer_sets = [['A'], ['A', 'B']]
+
+    print('Sweep of the 16 unlabelled 3-node digraphs, in chunks of 5:')
+    print(run_sweep(unlabelled_digraphs(3), headings, observer_sets, directory,
+                    ['may_see', 'must_see'], workers = 2, chunk_size = 5))
+    results = load_sweep(directory)
+    print(sorted(results.keys()))
+    print(results['may_see_links'].tolist())
+    print(results['must_see_links'].tolist())
+    print('')
+
+    print('Resumed after losing the second chunk:')
+    os.remove(shard_path(directory, 1))
+    print(run_sweep(unlabelled_digraphs(3), headings, observer_sets, directory,
+                    ['may_see', 'must_see'], workers = 1, chunk_size = 5))
+    print(list(load_sweep(directory)['may_see_links']) == list(results['may_see_links']))
+    print('')
+    shutil.rmtree(directory)
+
+# Correct answer:
+#     16
+#     ['adjacency', 'graph', 'may_see', 'may_see_links', 'must_see',
+#      'must_see_links', 'observer_set']
+#     [0, 0, 1, 1, 2, 2, 4, 4, 6, 6, 6, 6, 6, 6, 4, 4,
+#      6, 6, 4, 4, 4, 4, 2, 2, 2, 3, 3, 3, 6, 6, 1, 2]
+#     [0, 0, 1, 1, 2, 2, 4, 4, 6, 6, 5, 6, 4, 6, 3, 4,
+#      5, 6, 4, 4, 3, 4, 2, 2, 2, 3, 3, 3, 5, 6, 1, 2]
+#
+#     5
+#     True
@@ -0,0 +1,107 @@
+#
+# Synthetic topologies resembling those of cyber-physical systems, for
+# benchmarks and experiments
+#
+# Each generator returns the links of a topology with the given number
+# of nodes, numbered from 0, as a list of (node, node) pairs.  The links
+# are undirected, so topology_matrix fills in both directions of each.
+#
+#     ring           each node linked to the next, the last to the first
+#     star           every node linked to a central node 0
+#     tree           a balanced tree, each node linked to its parent
+#     grid           a square mesh, each node linked to its right-hand
+#                    and lower neighbours
+#     fieldbus_chain a backbone chain of gateways, each heading a
+#                    daisy-chained fieldbus segment of devices
+#     scale_free     preferential attachment (Barabasi-Albert), giving a
+#                    few highly connected hubs
+#
+
+import random
+from ingest import ingest_links
+
+# The protocols given to links in matrices of paths (see topology_matrix)
+LINK_PROTOCOLS = ['eth', 'bus']
+
+# Return the links of a ring
+def ring_links(size):
+    if size < 2:
+        return []
+    return [(node, (node + 1) % size) for node in range(size)]
+
+# Return the links of a star centred on node 0
+def star_links(size):
+    return [(0, node) for node in range(1, size)]
+
+# Return the links of a balanced tree, with the given number of
+# children for each node
+def tree_links(size, branching = 2):
+    return [((node - 1) // branching, node) for node in range(1, size)]
+
+# Return the links of the smallest square grid holding the nodes, row
+# by row (the last row may be incomplete)
+def grid_links(size):
+    width = 1
+    while width * width < size:
+        width += 1
+    links = []
+    for node in range(size):
+        if (node + 1) % width != 0 and node + 1 < size:
+            links.append((node, node + 1))
+        if node + width < size:
+            links.append((node, node + width))
+    return links
+
+# Return the links of a chain of gateways, every "segment" nodes, each
+# followed by the devices on its fieldbus segment
+def fieldbus_chain_links(size, segment = 8):
+    links = []
+    for node in range(1, size):
+        if node % segment == 0:
+            # A gateway, linked to the previous gateway
+            links.append((node - segment, node))
+        else:
+            # A device, linked to the previous node on its segment
+            links.append((node - 1, node))
+    return links
+
+# Return the links of a scale-free network, in which each node after
+# the first few is linked to "attachments" earlier nodes, chosen with
+# probability proportional to their number of links
+def scale_free_links(size, attachments = 2, seed = 0):
+    generator = random.Random(seed)
+    links = []
+    # Each node appears once for each of its links, so choosing from the
+    # list favours the best-connected nodes
+    weighted = list(range(min(attachments, size)))
+    for node in range(attachments, size):
+        targets = set()
+        while len(targets) < attachments:
+            targets.add(generator.choice(weighted))
+        for target in sorted(targets):
+            links.append((target, node))
+        weighted.extend(sorted(targets))
+        weighted.extend([node] * attachments)
+    return links
+
+# The generators, by name
+TOPOLOGIES = {'ring': ring_links, 'star': star_links, 'tree': tree_links, 'grid': grid_links,
+              'fieldbus_chain': fieldbus_chain_links, 'scale_free': scale_free_links}
+
+# Return a matrix holding the named kind of topology with the given
+# number of nodes, whose headings are the node numbers.  Each link's
+# cells hold 1 unless "paths" is True, when they hold the link's
+# protocol (alternately those in LINK_PROTOCOLS), as used by the
+# closure with mergers.path_union and conjoin_paths.  The dtype and
+# "sparse" options are as for ingest.ingest_links.
+def topology_matrix(kind, size, dtype = None, sparse = False, paths = False):
+    assert kind in TOPOLOGIES, 'Unknown topology ' + str(kind) + ' in "topology_matrix"'
+    links = TOPOLOGIES[kind](size)
+    if paths:
+        links = [(source, destination, LINK_PROTOCOLS[number % len(LINK_PROTOCOLS)])
+                 for number, (source, destination) in enumerate(links)]
+        default = ''
+    else:
+        links = [(source, destination, None) for source, destination in links]
+        default = 0
+    return ingest_links(lambda: iter(links), list(range(size)), sparse, dtype, default, symmetric = True)
@@ -0,0 +1,60 @@
+# Tests of the synthetic topologies and the benchmark suite
+
+from topologies import TOPOLOGIES, topology_matrix
+from benchmark_suite import run_benchmarks, compare_results
+
+print('Numbers of links in each kind of topology with 16 nodes:')
+for kind in sorted(TOPOLOGIES):
+    print(kind, len(TOPOLOGIES[kind](16)), topology_matrix(kind, 16, sparse = True).get_link_count())
+print('')
+
+print('A fieldbus chain of two segments:')
+print(topology_matrix('fieldbus_chain', 10, 'int8'))
+print('')
+
+print('What node 2 should see in a tree:')
+print(topology_matrix('tree', 7).should_see([2]))
+print('')
+
+print('Benchmark cases, and those slower than a baseline:')
+results = run_benchmarks([10, 100], ['star'], ['fill', 'may_see'], memory = False)
+print(sorted(results))
+baseline = {'fill/star/10': {'seconds': 0.5}, 'may_see/star/100': {'seconds': 0.0001},
+            'may_see/star/10000': {'seconds': 1.0}}
+results['may_see/star/100']['seconds'] = 0.2
+print(compare_results(results, baseline))
+print('')
+
+# Correct answer:
+#     fieldbus_chain 15 30
+#     grid 24 48
+#     ring 16 32
+#     scale_free 28 56
+#     star 15 30
+#     tree 15 30
+#
+#     (Gateways 0 and 8, each followed by the devices on its segment)
+#                 |           0|           1|           2|           3|           4|           5|           6|           7|           8|           9|
+#                0|           0|           1|           0|           0|           0|           0|           0|           0|           1|           0|
+#                1|           1|           0|           1|           0|           0|           0|           0|           0|           0|           0|
+#                2|           0|           1|           0|           1|           0|           0|           0|           0|           0|           0|
+#                3|           0|           0|           1|           0|           1|           0|           0|           0|           0|           0|
+#                4|           0|           0|           0|           1|           0|           1|           0|           0|           0|           0|
+#                5|           0|           0|           0|           0|           1|           0|           1|           0|           0|           0|
+#                6|           0|           0|           0|           0|           0|           1|           0|           1|           0|           0|
+#                7|           0|           0|           0|           0|           0|           0|           1|           0|           0|           0|
+#                8|           1|           0|           0|           0|           0|           0|           0|           0|           0|           1|
+#                9|           0|           0|           0|           0|           0|           0|           0|           0|           1|           0|
+#
+#     (Flows between node 2's subtree and the rest of the tree)
+#                 |           0|           1|           2|           3|           4|           5|           6|
+#                0|           0|           0|           1|           0|           0|           1|           1|
+#                1|           0|           0|           1|           0|           0|           1|           1|
+#                2|           1|           1|           0|           1|           1|           1|           1|
+#                3|           0|           0|           1|           0|           0|           1|           1|
+#                4|           0|           0|           1|           0|           0|           1|           1|
+#                5|           1|           1|           1|           1|           1|           0|           1|
+#                6|           1|           1|           1|           1|           1|           1|           0|
+#
+#     ['fill/star/10', 'fill/star/100', 'may_see/star/10', 'may_see/star/100']
+#     [('may_see/star/100', 0.0001, 0.2)]
@@ -12,29 +12,55 @@ flux_capacitor.fill([0, 0, 1, 0,
                      1, 1, 0, 1,
                      0, 0, 1, 0])
 
-print 'Physical topology:'
-print flux_capacitor
-print
+print('Physical topology:')
+print(flux_capacitor)
+print()
 
 # Find LOGICAL topology visible to observer A
-print 'What A may see:'
-print flux_capacitor.may_see(['A'])
-print
+print('What A may see:')
+print(flux_capacitor.may_see(['A']))
+print()
 
 # Find LOGICAL topology visible to observer B
-print 'What B may see:'
-print flux_capacitor.may_see(['B'])
-print
+print('What B may see:')
+print(flux_capacitor.may_see(['B']))
+print()
 
 # Find LOGICAL topology visible to both observers A and B
-print 'What A and B may see:'
-print flux_capacitor.may_see(['A', 'B'])
-print
+print('What A and B may see:')
+print(flux_capacitor.may_see(['A', 'B']))
+print()
 
 # Find LOGICAL topology visible to observer C
-print 'What C may see:'
-print flux_capacitor.may_see(['C'])
-print
+print('What C may see:')
+print(flux_capacitor.may_see(['C']))
+print()
+
+# Find LOGICAL topology that observers A and C should see
+print('What A and C should see:')
+print(flux_capacitor.should_see(['A', 'C']))
+print()
+
+# Correct answer:
+#     (C lies on every path, so every flow is seen)
+#                 |           A|           B|           C|           D|
+#                A|           0|           1|           1|           1|
+#                B|           1|           0|           1|           1|
+#                C|           1|           1|           0|           1|
+#                D|           1|           1|           1|           0|
+
+# Find LOGICAL topology that observers A and B must see
+print('What A and B must see:')
+print(flux_capacitor.must_see(['A', 'B']))
+print()
+
+# Correct answer:
+#     (Flows between C and D need not cross A or B)
+#                 |           A|           B|           C|           D|
+#                A|           0|           1|           1|           1|
+#                B|           1|           0|           1|           1|
+#                C|           1|           1|           0|           0|
+#                D|           1|           1|           0|           0|
 
 # This is the PHYSICAL topology
 box = Matrix(['W', 'X', 'Y', 'Z'])
@@ -43,17 +69,29 @@ box.fill([0, 1, 1, 0,
           1, 0, 0, 1,
           0, 1, 1, 0])
 
-print 'Physical topology:'
-print box
-print
+print('Physical topology:')
+print(box)
+print()
+
+print('What W may see:')
+print(box.may_see(['W']))
+print()
 
-print 'What W may see:'
-print box.may_see(['W'])
-print
+print('What W and Z may see:')
+print(box.may_see(['W', 'Z']))
+print()
 
-print 'What W and Z may see:'
-print box.may_see(['W', 'Z'])
-print
+print('What W and Z must see:')
+print(box.must_see(['W', 'Z']))
+print()
+
+# Correct answer:
+#     (Both routes between X and Y cross an observer)
+#                 |           W|           X|           Y|           Z|
+#                W|           0|           1|           1|           1|
+#                X|           1|           0|           1|           1|
+#                Y|           1|           1|           0|           1|
+#                Z|           1|           1|           1|           0|
 
 # This is the PHYSICAL topology
 cul_de_sacs = Matrix(['A', 'B', 'C', 'D', 'E'])
@@ -63,11 +101,56 @@ cul_de_sacs.fill([0, 0, 0, 0, 0,
                   0, 0, 0, 0, 1,
                   0, 0, 0, 1, 0])
 
-print 'Physical topology:'
-print cul_de_sacs
-print
+print('Physical topology:')
+print(cul_de_sacs)
+print()
 
 # Find LOGICAL topology visible to observer C
-print 'What C may see:'
-print cul_de_sacs.may_see(['C'])
-print
+print('What C may see:')
+print(cul_de_sacs.may_see(['C']))
+print()
+
+# Find LOGICAL topology that observer C should see
+print('What C should see:')
+print(cul_de_sacs.should_see(['C']))
+print()
+
+# Correct answer:
+#     (Only B sends anything to C, and it reaches the rest directly)
+#                 |           A|           B|           C|           D|           E|
+#                A|           0|           0|           0|           0|           0|
+#                B|           0|           0|           1|           0|           0|
+#                C|           1|           1|           0|           1|           1|
+#                D|           0|           0|           0|           0|           0|
+#                E|           0|           0|           0|           0|           0|
+
+# Evaluate several sets of observers in one batch
+print('What A, B, and A and B together may see (as a batch):')
+for visible in flux_capacitor.may_see_many([['A'], ['B'], ['A', 'B']]):
+    print(visible)
+    print()
+print('As a stacked array:')
+print(flux_capacitor.may_see_many([['A'], ['B'], ['A', 'B']], stacked = True).shape)
+print()
+
+# Correct answer:
+#     (Each the same as what A may see above)
+#                 |           A|           B|           C|           D|
+#                A|           0|           1|           1|           1|
+#                B|           1|           0|           1|           1|
+#                C|           1|           1|           0|           1|
+#                D|           1|           1|           1|           0|
+#
+#                 |           A|           B|           C|           D|
+#                A|           0|           1|           1|           1|
+#                B|           1|           0|           1|           1|
+#                C|           1|           1|           0|           1|
+#                D|           1|           1|           1|           0|
+#
+#                 |           A|           B|           C|           D|
+#                A|           0|           1|           1|           1|
+#                B|           1|           0|           1|           1|
+#                C|           1|           1|           0|           1|
+#                D|           1|           1|           1|           0|
+#
+#     (3, 4, 4)